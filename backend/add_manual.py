@@ -12,7 +12,6 @@ The script will ask you for:
   - Optionally, a car image (place it in manuel/voiture/)
 """
 import sys
-import json
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
@@ -22,7 +21,7 @@ from index_manuals import (
     MANUALS_DIR,
     IMAGES_DIR,
 )
-from src.guide_manager import GUIDES_DIR, slugify
+from src.guide_manager import read_manifest, slugify, write_manifest
 
 
 def main():
@@ -72,28 +71,23 @@ def main():
                 except (ValueError, IndexError):
                     print("Invalid image selection, skipping.")
 
-    # Index
+    # Index (an existing entry with the same slug keeps its options)
+    slug = slugify(name)
+    manifest = read_manifest()
+    options = next((m for m in manifest if m["slug"] == slug), {}).get("options")
     print(f"\nIndexing '{name}' from {pdf_path.name}...")
-    result = index_single_manual(pdf_path, name, image)
+    result = index_single_manual(pdf_path, name, image, options)
 
     if not result:
         print("\nIndexing failed.")
         sys.exit(1)
 
     # Update manifest
-    manifest_path = GUIDES_DIR / "manifest.json"
-    manifest = []
-    if manifest_path.exists():
-        with open(manifest_path, "r", encoding="utf-8") as f:
-            manifest = json.load(f)
-
-    # Remove existing entry with same slug
-    slug = slugify(name)
+    if options is not None:
+        result["options"] = options
     manifest = [m for m in manifest if m["slug"] != slug]
     manifest.append(result)
-
-    with open(manifest_path, "w", encoding="utf-8") as f:
-        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    write_manifest(manifest)
 
     print(f"\n{'='*50}")
     print(f"  Done! '{name}' is now available.")
@@ -1,17 +1,50 @@
 """
 API Flask for the pre-indexed vehicle guide chatbot.
 """
+import hmac
+import json
+import math
 import os
 import sys
+import threading
+import time
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent))
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
-
-from src.guide_manager import guide_manager
-from src.guide_chatbot import get_guide_chatbot, clear_guide_chatbot_cache
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.utils import secure_filename
+
+# Only light modules here: the chatbot stack (google.genai, langchain, faiss)
+# is imported by the endpoints that need it, or by the background warm-up.
+from src.guide_manager import MAIN_DOCUMENT, derive_guide_name, guide_manager, slugify
+from src.config import (
+    TOP_K_RESULTS, BATCH_MAX_CONCURRENCY, BATCH_MAX_ITEMS, ADMIN_TOKEN, UPLOAD_MAX_MB, UPLOADS_ENABLED,
+    TRUSTED_PROXY_HOPS, BATCH_SYNC_MAX_ITEMS, CONVERSATION_TTL_DAYS, SEARCH_MAX_GUIDES,
+)
+from src.startup import start_warmup, warmup_status
+from src.coalescing import chat_flights
+from src.admission import Overloaded, chat_rate_limiter, llm_admission
+from src.guide_registry import guide_registry
+from src.request_profiler import call_tree, collapsed_text, request_profiler
+from src.memory_accounting import peak_rss_bytes, rss_monitor
+from src.conversation_store import get_conversations, new_session_id, session_id
+from src.query_log import query_log
+from src.retrieval_client import retrieval_client
+from src.answer_warming import SUGGESTIONS
+from src.batch_jobs import batch_jobs, read_job as read_batch_job, read_results as read_batch_results
+from src.indexing_jobs import (
+    IMAGE_EXTENSIONS,
+    IMAGES_DIR as UPLOAD_IMAGES_DIR,
+    MANUALS_DIR,
+    PDF_MAGIC,
+    indexing_jobs,
+    list_jobs,
+    read_job,
+    save_upload,
+)
 
 BACKEND_DIR = Path(__file__).parent
 PROJECT_ROOT = BACKEND_DIR.parent
@@ -20,6 +53,10 @@ FRONTEND_DIST_DIR = Path(
 )
 
 app = Flask(__name__)
+app.config["MAX_CONTENT_LENGTH"] = int(UPLOAD_MAX_MB * 1024 * 1024)
+if TRUSTED_PROXY_HOPS > 0:
+    # remote_addr = address seen by the outermost trusted proxy, not a client-supplied entry
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS)
 
 CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
 
@@ -27,6 +64,37 @@ CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
 IMAGES_DIR = PROJECT_ROOT / "manuel" / "voiture"
 
 
+# ============================================
+# REQUEST PROFILING
+# ============================================
+
+@app.before_request
+def start_profile():
+    """Sample PROFILE_SAMPLE_RATE of the API requests, or admin requests sent with X-Profile: 1."""
+    if not request.path.startswith('/api/') or request.path.startswith('/api/debug/'):
+        return
+    requested = request.headers.get('X-Profile') == '1' and is_admin()
+    if request_profiler.should_profile(requested):
+        g.profile = request_profiler.begin(request.method, request.path, "header" if requested else "sampled")
+
+
+@app.after_request
+def tag_profile(response):
+    profile = g.get('profile')
+    if profile is not None:
+        g.profile_status = response.status_code
+        response.headers['X-Profile-Id'] = profile['id']
+    return response
+
+
+@app.teardown_request
+def finish_profile(exc):
+    # Runs after the body is sent, so streamed responses are profiled to the end
+    profile = g.pop('profile', None)
+    if profile is not None:
+        request_profiler.end(profile, g.get('profile_status', 500 if exc else None))
+
+
 # ============================================
 # GUIDE ENDPOINTS
 # ============================================
@@ -57,13 +125,231 @@ def get_guide(slug):
     })
 
 
+def client_id() -> str:
+    """Client address; behind TRUSTED_PROXY_HOPS proxies, ProxyFix has resolved it."""
+    return request.remote_addr or "unknown"
+
+
+def too_many_requests(message: str, retry_after: int):
+    response = jsonify({
+        "success": False,
+        "error": message,
+        "retry_after": retry_after,
+    })
+    response.headers["Retry-After"] = str(retry_after)
+    return response, 429
+
+
+def is_admin() -> bool:
+    """X-Admin-Token matches ADMIN_TOKEN; admin endpoints are closed when it is unset."""
+    token = request.headers.get("X-Admin-Token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+@app.route('/api/guides', methods=['POST'])
+def upload_guide():
+    """Upload a PDF manual and index it in the background (202 + job id)."""
+    if not UPLOADS_ENABLED:
+        return jsonify({
+            "success": False,
+            "error": "Upload desactive (UPLOADS_ENABLED=1)"
+        }), 403
+    if not is_admin():
+        return jsonify({
+            "success": False,
+            "error": "Acces refuse"
+        }), 403
+
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({
+            "success": False,
+            "error": "Fichier PDF requis (champ 'file')"
+        }), 400
+
+    filename = secure_filename(upload.filename)
+    if not filename.lower().endswith('.pdf'):
+        return jsonify({
+            "success": False,
+            "error": "Seuls les fichiers PDF sont acceptes"
+        }), 400
+
+    name = (request.form.get('name') or '').strip() or derive_guide_name(filename)
+    slug = slugify(name)
+    if not slug:
+        return jsonify({
+            "success": False,
+            "error": "Nom de guide invalide"
+        }), 400
+
+    # document=<id>: add or rebuild one document (shard) of a multi-document guide
+    document = None
+    if request.form.get('document') is not None:
+        document = slugify(request.form.get('document'))
+        if not document or document == MAIN_DOCUMENT:
+            return jsonify({
+                "success": False,
+                "error": "Identifiant de document invalide"
+            }), 400
+
+    existing = guide_manager.get_guide(slug)
+    replace = request.form.get('replace') in ('1', 'true')
+    if document and existing:
+        name = existing.name
+        if any(d["id"] == document for d in existing.documents) and not replace:
+            return jsonify({
+                "success": False,
+                "error": f"Le document '{document}' du guide '{slug}' existe deja (replace=1 pour le reindexer)"
+            }), 409
+    elif existing and not replace:
+        return jsonify({
+            "success": False,
+            "error": f"Le guide '{slug}' existe deja (replace=1 pour le reindexer)"
+        }), 409
+
+    try:
+        indexing_jobs.check_capacity(slug)
+    except Overloaded as e:
+        return too_many_requests(str(e), e.retry_after)
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 409
+
+    image = None
+    image_upload = request.files.get('image')
+    try:
+        if image_upload is not None and image_upload.filename:
+            image = secure_filename(image_upload.filename)
+            if not image.lower().endswith(IMAGE_EXTENSIONS):
+                raise ValueError("Image: formats acceptes " + ", ".join(IMAGE_EXTENSIONS))
+            save_upload(image_upload, UPLOAD_IMAGES_DIR, image)
+        if document:
+            # manuel/<slug>/<document>.pdf, the layout index_manuals reads for multi-document guides
+            pdf_path = save_upload(upload, MANUALS_DIR / slug, f"{document}.pdf", magic=PDF_MAGIC)
+        else:
+            pdf_path = save_upload(upload, MANUALS_DIR, filename, magic=PDF_MAGIC)
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+    try:
+        job = indexing_jobs.submit(pdf_path, name, slug, image, document)
+    except Overloaded as e:
+        return too_many_requests(str(e), e.retry_after)
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 409
+
+    return jsonify({
+        "success": True,
+        "job": job,
+        "status_url": f"/api/jobs/{job['id']}",
+        "events_url": f"/api/jobs/{job['id']}/events",
+    }), 202
+
+
+# ============================================
+# INDEXING JOB ENDPOINTS
+# ============================================
+
+JOB_EVENTS_POLL_S = 0.5
+JOB_EVENTS_HEARTBEAT_S = 15.0
+JOB_EVENTS_MAX_S = 120.0  # the client reconnects to follow longer jobs
+JOB_EVENTS_MAX_STREAMS = 4  # open event streams per worker (each holds a gunicorn thread)
+job_event_streams = threading.BoundedSemaphore(JOB_EVENTS_MAX_STREAMS)
+
+
+@app.route('/api/jobs', methods=['GET'])
+def get_jobs():
+    """Most recent indexing jobs of every worker (admin)."""
+    if not is_admin():
+        return jsonify({
+            "success": False,
+            "error": "Acces refuse"
+        }), 403
+    return jsonify({
+        "success": True,
+        "jobs": list_jobs(),
+        "indexing": indexing_jobs.metrics(),
+    })
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status and per-stage progress of one indexing job (admin)."""
+    if not is_admin():
+        return jsonify({
+            "success": False,
+            "error": "Acces refuse"
+        }), 403
+    job = read_job(job_id)
+    if not job:
+        return jsonify({
+            "success": False,
+            "error": "Job introuvable"
+        }), 404
+    return jsonify({"success": True, "job": job})
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-sent events (admin): one 'data:' message per progress update until the job ends."""
+    if not is_admin():
+        return jsonify({
+            "success": False,
+            "error": "Acces refuse"
+        }), 403
+    if not read_job(job_id):
+        return jsonify({
+            "success": False,
+            "error": "Job introuvable"
+        }), 404
+    if not job_event_streams.acquire(blocking=False):
+        return too_many_requests("Trop de flux de progression ouverts, utilisez /api/jobs/<id>", 5)
+
+    def stream():
+        last, last_sent = None, time.monotonic()
+        stop_at = time.monotonic() + JOB_EVENTS_MAX_S
+        while time.monotonic() < stop_at:
+            job = read_job(job_id)
+            if job != last:
+                last, last_sent = job, time.monotonic()
+                yield f"data: {json.dumps(job, ensure_ascii=False)}\n\n"
+                if job is None or job["status"] not in ("queued", "running"):
+                    return
+            elif time.monotonic() - last_sent >= JOB_EVENTS_HEARTBEAT_S:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            time.sleep(JOB_EVENTS_POLL_S)
+
+    response = Response(
+        stream_with_context(stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Also runs when the client goes away before the first event
+    response.call_on_close(job_event_streams.release)
+    return response
+
+
 # ============================================
 # CHAT ENDPOINTS
 # ============================================
 
+
 @app.route('/api/guides/<slug>/chat', methods=['POST'])
 def chat(slug):
     """Chat with a specific guide's chatbot."""
+    allowed, wait_s = chat_rate_limiter.allow(client_id())
+    if not allowed:
+        return too_many_requests("Trop de requetes, veuillez patienter", max(1, math.ceil(wait_s)))
+
     guide = guide_manager.get_guide(slug)
     if not guide or not guide.is_indexed:
         return jsonify({
@@ -88,17 +374,30 @@ def chat(slug):
     lang = data.get('lang') or None
     if lang and lang not in ('fr', 'en', 'ko'):
         lang = None
+    session = request_session(data)
 
     try:
+        from src.guide_chatbot import get_guide_chatbot
+
         chatbot = get_guide_chatbot(slug)
-        response = chatbot.chat(question, lang=lang)
+        start = time.perf_counter()
+        result = chatbot.respond(question, lang=lang, session=session)
+        query_log.record(
+            slug, question, result["lang"], result["answer_path"], (time.perf_counter() - start) * 1000
+        )
 
         return jsonify({
             "success": True,
-            "response": response,
+            "response": result["response"],
+            "answer_path": result["answer_path"],
+            "coalesced": result.get("coalesced", False),
+            "degraded": result.get("degraded", []),
+            "session_id": session,
             "vehicle_name": guide.name,
         })
 
+    except Overloaded as e:
+        return too_many_requests(str(e), e.retry_after)
     except Exception as e:
         return jsonify({
             "success": False,
@@ -106,9 +405,49 @@ def chat(slug):
         }), 500
 
 
+SESSION_COOKIE = "auris_session"
+
+
+def request_session(data: dict = None) -> str:
+    """
+    Conversation session: "session_id" in the body or query string,
+    X-Session-Id or the session cookie; a new id (set as cookie) without one.
+    """
+    value = (
+        (data or {}).get('session_id')
+        or request.args.get('session_id')
+        or request.headers.get('X-Session-Id')
+        or request.cookies.get(SESSION_COOKIE)
+    )
+    session = session_id(value)
+    if session is None:
+        session = g.issued_session = new_session_id()
+    return session
+
+
+@app.after_request
+def set_session_cookie(response):
+    session = g.get('issued_session')
+    if session is not None:
+        # Cross-site frontend (Render): the cookie is only sent back with SameSite=None over HTTPS
+        response.set_cookie(
+            SESSION_COOKIE,
+            session,
+            max_age=int(CONVERSATION_TTL_DAYS * 86400),
+            httponly=True,
+            secure=request.is_secure,
+            samesite="None" if request.is_secure else "Lax",
+        )
+    return response
+
+
 @app.route('/api/guides/<slug>/history', methods=['GET'])
 def get_history(slug):
-    """Get conversation history for a guide chatbot."""
+    """
+    Conversation history of a session, one page at a time (oldest first):
+    ?limit=50, then ?before=<next_before> for the older messages.
+    Served from the shared store: the guide does not need to be loaded.
+    """
     guide = guide_manager.get_guide(slug)
     if not guide or not guide.is_indexed:
         return jsonify({
@@ -117,10 +456,23 @@ def get_history(slug):
         }), 404
 
     try:
-        chatbot = get_guide_chatbot(slug)
+        limit = int(request.args.get('limit', 50))
+        before = request.args.get('before')
+        before = int(before) if before else None
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "error": "Parametres de pagination invalides"
+        }), 400
+
+    session = request_session()
+    try:
+        page = get_conversations().history(slug, session, limit=limit, before=before)
         return jsonify({
             "success": True,
-            "history": chatbot.get_history(),
+            "history": page["messages"],
+            "next_before": page["next_before"],
+            "session_id": session,
             "vehicle_name": guide.name,
         })
     except Exception as e:
@@ -132,14 +484,145 @@ def get_history(slug):
 
 @app.route('/api/guides/<slug>/reset', methods=['POST'])
 def reset_chat(slug):
-    """Reset conversation history for a guide."""
-    clear_guide_chatbot_cache(slug)
+    """Reset the conversation history of a session."""
+    get_conversations().clear(slug, request_session(request.get_json(silent=True)))
     return jsonify({
         "success": True,
         "message": "Conversation reinitialisee"
     })
 
 
+# ============================================
+# SEARCH & BATCH ENDPOINTS
+# ============================================
+
+@app.route('/api/search', methods=['POST'])
+def search():
+    """Search passages across several guides without calling the LLM."""
+    allowed, wait_s = chat_rate_limiter.allow(client_id())
+    if not allowed:
+        return too_many_requests("Trop de requetes, veuillez patienter", max(1, math.ceil(wait_s)))
+
+    data = request.get_json(silent=True) or {}
+    query = (data.get('query') or '').strip()
+    if not query:
+        return jsonify({
+            "success": False,
+            "error": "Requete requise"
+        }), 400
+
+    slugs = data.get('guides') or None
+    if slugs is not None and (not isinstance(slugs, list) or not all(isinstance(s, str) for s in slugs)):
+        return jsonify({
+            "success": False,
+            "error": "'guides' doit etre une liste de slugs"
+        }), 400
+    if slugs is None:
+        slugs = [g["slug"] for g in guide_manager.list_guides()]
+    slugs = list(dict.fromkeys(slugs))
+    if len(slugs) > SEARCH_MAX_GUIDES:
+        return jsonify({
+            "success": False,
+            "error": f"Maximum {SEARCH_MAX_GUIDES} guides par recherche (champ 'guides')"
+        }), 400
+    unknown = [s for s in slugs if guide_manager.get_guide(s) is None]
+    if unknown:
+        return jsonify({
+            "success": False,
+            "error": f"Guide introuvable: {', '.join(unknown)}"
+        }), 404
+
+    try:
+        k = max(1, min(int(data.get('k', TOP_K_RESULTS)), 20))
+    except (TypeError, ValueError):
+        k = TOP_K_RESULTS
+
+    try:
+        from src.guide_search import SEARCH_ADMISSION_KEY, federated_search
+
+        # The query embedding is a paid upstream call: searches share the admission limits
+        with llm_admission.slot(SEARCH_ADMISSION_KEY):
+            result = federated_search(query, slugs=slugs, k=k)
+        return jsonify({"success": True, **result})
+    except Overloaded as e:
+        return too_many_requests(str(e), e.retry_after)
+    except Exception as e:
+        print(f"Federated search failed: {e}")
+        return jsonify({
+            "success": False,
+            "error": "Erreur interne lors de la recherche"
+        }), 500
+
+
+@app.route('/api/batch', methods=['POST'])
+def batch_answer():
+    """Answer many (guide, question, lang) items: inline when few, else as a background job (202 + id)."""
+    if not is_admin():
+        return jsonify({
+            "success": False,
+            "error": "Acces refuse"
+        }), 403
+
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({
+            "success": False,
+            "error": "'items' doit etre une liste non vide"
+        }), 400
+
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({
+            "success": False,
+            "error": f"Maximum {BATCH_MAX_ITEMS} elements par requete"
+        }), 413
+
+    try:
+        concurrency = max(1, min(int(data.get('concurrency', BATCH_MAX_CONCURRENCY)), BATCH_MAX_CONCURRENCY))
+    except (TypeError, ValueError):
+        concurrency = BATCH_MAX_CONCURRENCY
+
+    items = [i for i in items if isinstance(i, dict)]
+    if len(items) > BATCH_SYNC_MAX_ITEMS:
+        try:
+            job = batch_jobs.submit(items, concurrency)
+        except Overloaded as e:
+            return too_many_requests(str(e), e.retry_after)
+        return jsonify({
+            "success": True,
+            "job": job,
+            "status_url": f"/api/batch/{job['id']}",
+        }), 202
+
+    try:
+        from src.batch_qa import run_batch
+
+        report = run_batch(items, concurrency=concurrency)
+        return jsonify({"success": True, **report})
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@app.route('/api/batch/<job_id>', methods=['GET'])
+def get_batch_job(job_id):
+    """Status of a batch job and the results answered so far."""
+    if not is_admin():
+        return jsonify({
+            "success": False,
+            "error": "Acces refuse"
+        }), 403
+    job = read_batch_job(job_id)
+    if not job:
+        return jsonify({
+            "success": False,
+            "error": "Job introuvable"
+        }), 404
+    return jsonify({"success": True, "job": job, "results": read_batch_results(job_id)})
+
+
 # ============================================
 # IMAGE SERVING
 # ============================================
@@ -158,28 +641,110 @@ def serve_image(filename):
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({
+    payload = {
         "status": "ok",
         "message": "API Vehicle Guide Chatbot",
         "version": "3.0.0",
         "guides": len(guide_manager.list_guides()),
+        "warmup": warmup_status()["status"],
+    }
+    # Upstream client metrics, only once the chatbot stack is loaded
+    if "src.llm_client" in sys.modules:
+        payload["upstream"] = sys.modules["src.llm_client"].llm_status()
+    # With RETRIEVAL_SOCKET, no answer without the retrieval service: report unhealthy
+    if retrieval_client.enabled and not retrieval_client.ping():
+        payload.update(status="degraded", retrieval="unavailable")
+        return jsonify(payload), 503
+    return jsonify(payload)
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Per-worker serving counters (coalescing, LLM queue depth, resident guides)."""
+    return jsonify({
+        "success": True,
+        "pid": os.getpid(),
+        "coalescing": chat_flights.metrics(),
+        "admission": llm_admission.metrics(),
+        "rate_limit": chat_rate_limiter.metrics(),
+        "guides": guide_registry.report(),
+        "indexing": indexing_jobs.metrics(),
+        "batch": batch_jobs.metrics(),
+        "conversations": get_conversations().metrics(),
+        "query_log": query_log.metrics(),
+        "retrieval": retrieval_client.metrics(),
+    })
+
+
+@app.route('/api/debug/profiles', methods=['GET'])
+def list_profiles():
+    """Buffered request profiles of this worker (?format=collapsed: all stacks, flamegraph input)."""
+    if not is_admin():
+        return jsonify({
+            "success": False,
+            "error": "Acces refuse"
+        }), 403
+    if request.args.get('format') == 'collapsed':
+        return Response(collapsed_text(request_profiler.all_stacks()), mimetype='text/plain')
+    return jsonify({
+        "success": True,
+        "pid": os.getpid(),
+        "profiler": request_profiler.metrics(),
+        "profiles": request_profiler.summaries(),
+    })
+
+
+@app.route('/api/debug/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """One profile as a call tree (?format=collapsed: collapsed stacks)."""
+    if not is_admin():
+        return jsonify({
+            "success": False,
+            "error": "Acces refuse"
+        }), 403
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        return jsonify({
+            "success": False,
+            "error": "Profil introuvable (autre worker ou sorti du tampon)"
+        }), 404
+    if request.args.get('format') == 'collapsed':
+        return Response(collapsed_text(profile["stacks"]), mimetype='text/plain')
+    summary = {k: v for k, v in profile.items() if k != "stacks"}
+    return jsonify({
+        "success": True,
+        "profile": dict(summary, tree=call_tree(profile["stacks"])),
+    })
+
+
+@app.route('/api/debug/memory', methods=['GET'])
+def memory_report():
+    """Per-guide, per-component memory of this worker and its RSS history."""
+    if not is_admin():
+        return jsonify({
+            "success": False,
+            "error": "Acces refuse"
+        }), 403
+    guides = guide_registry.memory_report()
+    return jsonify({
+        "success": True,
+        "pid": os.getpid(),
+        "rss_bytes": rss_monitor.sample()["rss_bytes"],
+        "peak_rss_bytes": peak_rss_bytes(),
+        "guides_bytes": sum(g["indexes"]["total"] for g in guides),
+        "sessions_bytes": sum(sum(g["sessions"].values()) for g in guides),
+        "memory_budget_bytes": guide_registry.memory_budget,
+        "guides": sorted(guides, key=lambda g: g["indexes"]["total"], reverse=True),
+        "rss_history": list(rss_monitor.history),
     })
 
 
 @app.route('/api/suggestions', methods=['GET'])
 def get_suggestions():
-    suggestions = [
-        {"id": 1, "text": "Comment fonctionne le systeme de freinage ?", "category": "mecanique"},
-        {"id": 2, "text": "Quelle est la pression recommandee des pneus ?", "category": "entretien"},
-        {"id": 3, "text": "Que signifie le voyant moteur allume ?", "category": "diagnostic"},
-        {"id": 4, "text": "Comment faire une vidange ?", "category": "entretien"},
-        {"id": 5, "text": "Quelle est la capacite du reservoir ?", "category": "caracteristiques"},
-        {"id": 6, "text": "Comment connecter mon telephone en Bluetooth ?", "category": "multimedia"},
-    ]
-
+    # Precomputed for every guide by python -m warm_answers
     return jsonify({
         "success": True,
-        "suggestions": suggestions
+        "suggestions": SUGGESTIONS
     })
 
 
@@ -206,6 +771,17 @@ def serve_frontend(path):
     return jsonify({"error": "Frontend build not found"}), 404
 
 
+if __name__ == '__main__' and "--profile-startup" in sys.argv[1:]:
+    from src.startup import profile_startup
+
+    profile_startup()
+    sys.exit(0)
+
+# Import the chatbot stack (and optionally load guides) in a background thread
+start_warmup()
+rss_monitor.start()
+
+
 if __name__ == '__main__':
     api_key = os.getenv("GOOGLE_API_KEY", "")
     if not api_key or api_key == "your_google_api_key_here":
@@ -0,0 +1,80 @@
+"""
+Pre-generate answers for a list of questions (FAQ, QA regression sets).
+Reads a JSONL file of {"guide": slug, "question": ..., "lang": ...} items
+and appends one JSON result per line to the output file. Re-running with the
+same output file resumes where the previous run stopped.
+
+Usage:
+    cd backend
+    python -m batch_answer questions.jsonl -o answers.jsonl [--concurrency 4] [--retries 3]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.config import TOP_K_RESULTS, BATCH_MAX_CONCURRENCY, BATCH_MAX_RETRIES
+from src.batch_qa import run_batch
+
+
+def read_items(path: Path):
+    items = []
+    with path.open("r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                print(f"  Skipping line {line_no}: {e}")
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch question answering over guides")
+    parser.add_argument("input", type=Path, help="JSONL file of items")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="JSONL results file")
+    parser.add_argument("--concurrency", type=int, default=BATCH_MAX_CONCURRENCY)
+    parser.add_argument("--retries", type=int, default=BATCH_MAX_RETRIES)
+    parser.add_argument("-k", type=int, default=TOP_K_RESULTS)
+    args = parser.parse_args()
+
+    if not args.input.exists():
+        print(f"ERROR: input file not found: {args.input}")
+        sys.exit(1)
+
+    items = read_items(args.input)
+    print(f"\n{len(items)} item(s) read from {args.input}")
+
+    def progress(record):
+        status = "ok " if record["status"] == "ok" else "ERR"
+        print(f"  [{status}] {record['guide']}: {record['question'][:60]}")
+
+    report = run_batch(
+        items,
+        output_path=args.output,
+        concurrency=args.concurrency,
+        retries=args.retries,
+        k=args.k,
+        on_result=progress,
+    )
+
+    for rejected in report["rejected"]:
+        print(f"  Rejected line {rejected['position'] + 1}: {rejected['error']} ({rejected['guide']})")
+
+    summary = report["summary"]
+    print(f"\n{'='*50}")
+    print(f"  Answered: {summary['answered']}  Failed: {summary['failed']}")
+    print(f"  Skipped (already done): {summary['skipped']}  Rejected: {summary['rejected']}")
+    print(f"  Took {summary['took_s']}s, results in {args.output}")
+    print(f"{'='*50}\n")
+
+    if summary["failed"]:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Compare the PDF text extractors on the manuals: pages/s per backend and how
+much their text differs from pypdf (the historical extractor).
+
+Usage:
+    cd backend
+    python -m benchmark_extractors                    # every PDF in manuel/
+    python -m benchmark_extractors path/to/manual.pdf --backends pdfium,pypdf
+"""
+import argparse
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.pdf_extract import available_extractors, extract_pages
+
+MANUALS_DIR = Path(__file__).parent.parent / "manuel"
+REFERENCE = "pypdf"
+DIFF_THRESHOLD = 0.9  # pages below this token overlap with the reference are counted as different
+
+
+def _tokens(text: str) -> Counter:
+    return Counter(re.findall(r"[a-zà-ÿ0-9]{2,}", text.lower()))
+
+
+def token_overlap(a: str, b: str) -> float:
+    """F1 of the word multisets: 1.0 = same words, whatever the line breaks or spacing."""
+    ta, tb = _tokens(a), _tokens(b)
+    if not ta and not tb:
+        return 1.0
+    common = sum((ta & tb).values())
+    return 2 * common / (sum(ta.values()) + sum(tb.values()))
+
+
+def compare(reference: dict, pages: dict) -> dict:
+    scores = [token_overlap(reference.get(no, ""), pages.get(no, "")) for no in reference]
+    empty_ref = sum(1 for no in reference if not reference[no].strip())
+    empty = sum(1 for no in reference if not pages.get(no, "").strip())
+    return {
+        "mean_overlap": sum(scores) / len(scores) if scores else 1.0,
+        "min_overlap": min(scores) if scores else 1.0,
+        "pages_different": sum(1 for s in scores if s < DIFF_THRESHOLD),
+        "empty_pages": empty,
+        "empty_pages_reference": empty_ref,
+    }
+
+
+def benchmark(pdf_path: Path, backends):
+    print(f"\n{pdf_path.name}")
+    texts, rows = {}, []
+    for backend in backends:
+        pages, stats = extract_pages(pdf_path, backend, fallback=False)
+        texts[backend] = dict(pages)
+        rows.append((backend, stats, sum(len(t) for _, t in pages)))
+
+    print(f"  {'backend':<10} {'pages':>6} {'seconds':>8} {'pages/s':>8} {'chars':>9}   vs {REFERENCE}")
+    reference = texts.get(REFERENCE)
+    for backend, stats, chars in rows:
+        line = (
+            f"  {backend:<10} {stats['pages']:>6} {stats['seconds']:>8.2f}"
+            f" {stats['pages_per_s'] or 0:>8.1f} {chars:>9}"
+        )
+        if reference is not None and backend != REFERENCE:
+            diff = compare(reference, texts[backend])
+            line += (
+                f"   overlap mean {diff['mean_overlap']:.3f} min {diff['min_overlap']:.3f},"
+                f" {diff['pages_different']} page(s) < {DIFF_THRESHOLD},"
+                f" empty {diff['empty_pages']} (ref {diff['empty_pages_reference']})"
+            )
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF extractor benchmark")
+    parser.add_argument("pdfs", nargs="*", type=Path, help="PDF files (default: manuel/*.pdf)")
+    parser.add_argument("--backends", default=",".join(available_extractors()))
+    args = parser.parse_args()
+
+    installed = available_extractors()
+    backends = [b for b in args.backends.split(",") if b in installed]
+    missing = [b for b in args.backends.split(",") if b and b not in installed]
+    if missing:
+        print(f"Not installed, skipped: {', '.join(missing)}")
+
+    pdfs = args.pdfs or sorted(p for p in MANUALS_DIR.glob("*") if p.suffix.lower() == ".pdf")
+    if not pdfs:
+        print(f"No PDF files found in {MANUALS_DIR}")
+        sys.exit(1)
+
+    for pdf_path in pdfs:
+        benchmark(pdf_path, backends)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Memory footprint of the guides, for capacity planning: per guide and per
+component (FAISS, BM25, chunk store, specs) the deep-size estimate used by the
+registry's memory budget, the bytes tracemalloc saw allocated while loading,
+and the process RSS growth. Optionally replays lexical searches to see how
+RSS moves under traffic.
+
+Usage:
+    cd backend
+    python -m benchmark_memory                          # every indexed guide
+    python -m benchmark_memory clio-4 --queries 500 [--no-trace] [--json memory.json]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.guide_manager import guide_manager
+from src.memory_accounting import index_sizes, peak_rss_bytes, rss_bytes, tracing
+
+COMPONENTS = ("faiss", "bm25", "chunks", "specs")
+QUESTIONS = [
+    "Quelle est la pression des pneus ?",
+    "Comment faire une vidange ?",
+    "Que signifie le voyant moteur allume ?",
+    "Comment regler l'heure ?",
+    "Quelle est la capacite du reservoir ?",
+    "Comment connecter mon telephone en Bluetooth ?",
+    "Comment activer le regulateur de vitesse ?",
+    "Comment changer une roue ?",
+]
+
+
+def _mb(value) -> str:
+    return "-" if value is None else f"{value / (1024 * 1024):.1f}"
+
+
+def measure_load(guide, trace: bool) -> tuple:
+    from contextlib import nullcontext
+
+    from src.guide_chatbot import GuideChatbot
+
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+    with tracing() if trace else nullcontext():
+        chatbot = GuideChatbot(guide)
+    load_s = time.perf_counter() - start
+    traced = {}
+    for shard in chatbot.shards:
+        for component, size in shard.load_bytes.items():
+            traced[component] = traced.get(component, 0) + size
+    return chatbot, {
+        "slug": guide.slug,
+        "shards": len(chatbot.shards),
+        "chunks": sum(len(shard.chunks) for shard in chatbot.shards),
+        "load_s": round(load_s, 3),
+        "rss_delta": rss_bytes() - rss_before if rss_before is not None else None,
+        "estimate": index_sizes(chatbot),
+        "traced": traced if trace else None,
+    }
+
+
+def replay(chatbots: dict, queries: int) -> list:
+    """Lexical searches round-robin over the guides; RSS sampled every 10%."""
+    timeline = [{"queries": 0, "rss_bytes": rss_bytes()}]
+    slugs = list(chatbots)
+    step = max(1, queries // 10)
+    for i in range(queries):
+        chatbot = chatbots[slugs[i % len(slugs)]]
+        chatbot.search(QUESTIONS[i % len(QUESTIONS)], semantic=False)
+        if (i + 1) % step == 0 or i + 1 == queries:
+            timeline.append({"queries": i + 1, "rss_bytes": rss_bytes()})
+    return timeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Guide memory footprint")
+    parser.add_argument("slugs", nargs="*", help="guides to load (default: all indexed)")
+    parser.add_argument("--queries", type=int, default=0, help="lexical searches to replay after loading")
+    parser.add_argument("--no-trace", action="store_true", help="skip tracemalloc (faster loads)")
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args()
+
+    slugs = args.slugs or [g["slug"] for g in guide_manager.list_guides()]
+    guides = [guide_manager.get_guide(slug) for slug in slugs]
+    missing = [slug for slug, guide in zip(slugs, guides) if guide is None or not guide.is_indexed]
+    if missing:
+        print(f"ERROR: unknown or unindexed guide(s): {', '.join(missing)}")
+        sys.exit(1)
+
+    # Import the chatbot stack first so its cost is not charged to the first guide
+    import src.guide_chatbot  # noqa: F401
+
+    baseline = rss_bytes()
+    print(f"\nBaseline RSS (chatbot stack imported): {_mb(baseline)} MB")
+
+    chatbots, rows = {}, []
+    for guide in guides:
+        chatbot, row = measure_load(guide, trace=not args.no_trace)
+        chatbots[guide.slug] = chatbot
+        rows.append(row)
+
+    header = f"  {'guide':<28} {'chunks':>7} {'load s':>7} " + "".join(f"{c + ' MB':>10}" for c in COMPONENTS)
+    print(f"\nEstimated resident size (deep size, MB)\n{header}{'total MB':>10}{'RSS +MB':>9}")
+    for row in rows:
+        sizes = row["estimate"]
+        print(
+            f"  {row['slug']:<28} {row['chunks']:>7} {row['load_s']:>7.2f} "
+            + "".join(f"{_mb(sizes[c]):>10}" for c in COMPONENTS)
+            + f"{_mb(sizes['total']):>10}{_mb(row['rss_delta']):>9}"
+        )
+    if not args.no_trace:
+        print(f"\nAllocated while loading (tracemalloc, MB)\n  {'guide':<28}" + "".join(f"{c:>10}" for c in COMPONENTS))
+        for row in rows:
+            print(f"  {row['slug']:<28}" + "".join(f"{_mb(row['traced'].get(c, 0)):>10}" for c in COMPONENTS))
+
+    loaded = rss_bytes()
+    estimated = sum(row["estimate"]["total"] for row in rows)
+    print(
+        f"\nRSS after loading {len(rows)} guide(s): {_mb(loaded)} MB "
+        f"(+{_mb(loaded - baseline)} MB, estimates {_mb(estimated)} MB)"
+    )
+
+    timeline = []
+    if args.queries > 0:
+        timeline = replay(chatbots, args.queries)
+        print(f"\nRSS during {args.queries} lexical searches")
+        for point in timeline:
+            print(f"  {point['queries']:>7} queries  {_mb(point['rss_bytes'])} MB")
+    print(f"\nPeak RSS: {_mb(peak_rss_bytes())} MB\n")
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            "baseline_rss_bytes": baseline,
+            "loaded_rss_bytes": loaded,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "guides": rows,
+            "timeline": timeline,
+        }, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+#!/bin/sh
+# Container entry point: with RETRIEVAL_SOCKET, supervisord runs the retrieval
+# service and the API (supervisord.conf); otherwise gunicorn alone.
+set -e
+if [ -n "$RETRIEVAL_SOCKET" ]; then
+    exec supervisord -c /app/backend/supervisord.conf
+fi
+exec gunicorn api:app --bind "0.0.0.0:${PORT:-5002}" --workers 2 --threads 2 --timeout 120
@@ -0,0 +1,190 @@
+"""
+Choose the stored embedding dimension per guide.
+`eval` compares truncation (Matryoshka) and PCA at several dimensions against
+the full-width FAISS index: recall@k of the exact neighbours, index size and
+query latency. `apply` rewrites a guide's index at the chosen dimension from
+its stored vectors (no re-embedding) and records the choice in the manifest
+options so the next reindex keeps it.
+
+Usage:
+    cd backend
+    python -m embedding_dims eval clio-4 [--dims 128,256,512,768] [--method truncate,pca]
+                                         [--k 5,10] [--queries questions.jsonl] [--sample 200]
+    python -m embedding_dims apply clio-4 --method truncate --dim 768
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from src.guide_manager import BUNDLE_FILENAME, GUIDES_DIR, read_manifest, write_manifest
+from src.guide_bundle import pack_guide
+from src.vector_index import EmbeddingReducer, VectorIndex, faiss_available, write_vector_index
+
+
+def load_full_vectors(slug: str):
+    """(vectors, row -> chunk id) of a guide indexed at full width."""
+    index = VectorIndex.load(GUIDES_DIR / slug / "vector_store", use_mmap=False)
+    if index is None:
+        print(f"ERROR: {slug} has no FAISS index")
+        sys.exit(1)
+    if index.reducer.method != "none":
+        print(
+            f"ERROR: {slug} is stored reduced ({index.reducer.method}, {index.dim} dims); "
+            "reindex it at full width (EMBEDDING_REDUCTION=none) first"
+        )
+        sys.exit(1)
+    return index.index.reconstruct_n(0, index.ntotal), np.asarray(index.row_to_chunk)
+
+
+def load_queries(path: Path, slug: str, vectors: np.ndarray, sample: int):
+    """
+    Query vectors plus the row each query came from (-1 for real questions).
+    Real questions come from a batch_answer-style JSONL file; otherwise a sample
+    of the chunk vectors themselves is used, their own row being excluded.
+    """
+    if path:
+        from src.vector_store import embed_queries
+
+        with path.open("r", encoding="utf-8") as f:
+            items = [json.loads(line) for line in f if line.strip()]
+        questions = [i["question"] for i in items if i.get("guide", slug) == slug]
+        if not questions:
+            print(f"ERROR: no question for {slug} in {path}")
+            sys.exit(1)
+        matrix = np.asarray(embed_queries(questions), dtype=np.float32)
+        return matrix, np.full(len(matrix), -1)
+
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(vectors), size=min(sample, len(vectors)), replace=False)
+    return vectors[rows], rows
+
+
+def _neighbours(index, queries: np.ndarray, own_rows: np.ndarray, k: int) -> list:
+    _, rows = index.search(np.ascontiguousarray(queries), k + 1)
+    return [[r for r in found if r != own and r != -1][:k] for found, own in zip(rows, own_rows)]
+
+
+def _latency_ms(index, reducer: EmbeddingReducer, queries: np.ndarray, k: int):
+    """Per-query search time (reduction included), one query at a time like the API."""
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(reducer.apply(query), k)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return float(np.mean(timings)), timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+
+
+def evaluate(slug: str, methods, dims, ks, queries_path: Path = None, sample: int = 200) -> list:
+    import faiss
+
+    vectors, _ = load_full_vectors(slug)
+    queries, own_rows = load_queries(queries_path, slug, vectors, sample)
+    full_dim = vectors.shape[1]
+    k_max = max(ks)
+
+    exact = faiss.IndexFlatL2(full_dim)
+    exact.add(vectors)
+    truth = _neighbours(exact, queries, own_rows, k_max)
+
+    print(f"\n{slug}: {len(vectors)} vectors x {full_dim} dims, {len(queries)} queries")
+    configs = [("none", full_dim)] + [(m, d) for m in methods for d in dims if d < full_dim]
+    skipped = [d for m, d in configs if m == "pca" and d > len(vectors)]
+    if skipped:
+        print(f"  pca skipped for {skipped} (more dimensions than the {len(vectors)} vectors)")
+        configs = [(m, d) for m, d in configs if not (m == "pca" and d > len(vectors))]
+    results = []
+    for method, dim in configs:
+        reducer = EmbeddingReducer.fit(vectors, method, dim)
+        index = faiss.IndexFlatL2(reducer.dim)
+        index.add(reducer.apply(vectors))
+        found = _neighbours(index, reducer.apply(queries), own_rows, k_max)
+        recall = {
+            k: float(np.mean([len(set(f[:k]) & set(t[:k])) / max(1, len(t[:k])) for f, t in zip(found, truth)]))
+            for k in ks
+        }
+        mean_ms, p95_ms = _latency_ms(index, reducer, queries, k_max)
+        results.append({
+            "method": method,
+            "dim": reducer.dim,
+            "recall": recall,
+            "index_bytes": len(faiss.serialize_index(index)) + reducer.nbytes,
+            "latency_ms": round(mean_ms, 3),
+            "latency_p95_ms": round(p95_ms, 3),
+        })
+
+    header = "  method     dim  " + "".join(f"R@{k:<6}" for k in ks) + "   index KB   mean ms   p95 ms"
+    print(header)
+    for r in results:
+        recalls = "".join(f"{r['recall'][k]:<8.3f}" for k in ks)
+        print(
+            f"  {r['method']:<9}{r['dim']:>5}  {recalls} {r['index_bytes'] // 1024:>9}"
+            f" {r['latency_ms']:>9.3f} {r['latency_p95_ms']:>8.3f}"
+        )
+    print()
+    return results
+
+
+def apply(slug: str, method: str, dim: int):
+    """Rewrite the guide's index at ``dim`` dimensions and remember the choice."""
+    vectors, row_to_chunk = load_full_vectors(slug)
+    vs_dir = GUIDES_DIR / slug / "vector_store"
+    write_vector_index(vectors, vs_dir, chunk_ids=row_to_chunk, reduction=method, dim=dim)
+
+    manifest = read_manifest()
+    for entry in manifest:
+        if entry["slug"] == slug:
+            options = entry.setdefault("options", {})
+            options["embedding_reduction"] = method
+            options["embedding_dim"] = dim
+            bundle_path = GUIDES_DIR / slug / BUNDLE_FILENAME
+            if bundle_path.exists():
+                pack_guide(vs_dir, bundle_path, meta=entry)
+    write_manifest(manifest)
+    print(f"{slug}: FAISS index rewritten ({method}, {vectors.shape[1]} -> {dim} dims)")
+
+
+def _int_list(value: str):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding dimensionality per guide")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ev = sub.add_parser("eval", help="recall@k, index size and latency per dimension")
+    ev.add_argument("slug")
+    ev.add_argument("--dims", type=_int_list, default=[128, 256, 512, 768, 1536])
+    ev.add_argument("--method", default="truncate,pca", help="truncate, pca or both (comma separated)")
+    ev.add_argument("--k", type=_int_list, default=[5, 10])
+    ev.add_argument("--queries", type=Path, help="JSONL of {guide, question} (default: sampled chunks)")
+    ev.add_argument("--sample", type=int, default=200, help="chunk vectors used as queries")
+    ev.add_argument("--json", type=Path, help="also write the results to this file")
+
+    ap = sub.add_parser("apply", help="store a guide's vectors at a reduced dimension")
+    ap.add_argument("slug")
+    ap.add_argument("--method", choices=["none", "truncate", "pca"], required=True)
+    ap.add_argument("--dim", type=int, default=0)
+
+    args = parser.parse_args()
+    if not faiss_available():
+        print("ERROR: faiss is not installed")
+        sys.exit(1)
+
+    if args.command == "eval":
+        methods = [m.strip() for m in args.method.split(",") if m.strip() in ("truncate", "pca")]
+        results = evaluate(args.slug, methods, sorted(args.dims), sorted(args.k), args.queries, args.sample)
+        if args.json:
+            args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    else:
+        apply(args.slug, args.method, args.dim)
+
+
+if __name__ == "__main__":
+    main()
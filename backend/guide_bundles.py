@@ -0,0 +1,111 @@
+"""
+Pack, inspect and verify single-file guide bundles (data/guides/<slug>/guide.bundle,
+and shards/<document>/guide.bundle for the documents of multi-document guides).
+The server loads a guide from its bundle when present, otherwise from the
+loose files in vector_store/.
+
+Usage:
+    cd backend
+    python -m guide_bundles pack [slug ...]      # build guide.bundle from vector_store/
+    python -m guide_bundles inspect <slug|slug/document|path>  # header, metadata and section sizes
+    python -m guide_bundles verify [slug ...]    # checksum every section (exit 1 on error)
+"""
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.guide_manager import BUNDLE_FILENAME, GUIDES_DIR, SHARDS_DIRNAME, manifest_shards, read_manifest
+from src.guide_bundle import BundleError, GuideBundle, pack_guide
+
+
+def _entries(wanted):
+    entries = read_manifest()
+    if wanted:
+        entries = [e for e in entries if e["slug"] in wanted]
+        missing = set(wanted) - {e["slug"] for e in entries}
+        for slug in sorted(missing):
+            print(f"  {slug}: not in manifest, skipped")
+    return entries
+
+
+def _bundle_path(target: str) -> Path:
+    path = Path(target)
+    if path.suffix == ".bundle" or path.is_file():
+        return path
+    slug, _, document = target.partition("/")
+    if document:
+        return GUIDES_DIR / slug / SHARDS_DIRNAME / document / BUNDLE_FILENAME
+    return GUIDES_DIR / target / BUNDLE_FILENAME
+
+
+def pack(wanted):
+    entries = _entries(wanted)
+    print(f"\nPacking {len(entries)} guide(s)")
+    for entry in entries:
+        for label, shard, meta in manifest_shards(entry):
+            try:
+                sizes = pack_guide(shard.vector_store_dir, shard.bundle_path, meta=meta)
+            except BundleError as exc:
+                print(f"  {label}: {exc}")
+                continue
+            print(f"  {label}: {sum(sizes.values()) // 1024} KB ({', '.join(sizes)})")
+    print()
+
+
+def inspect(target: str):
+    path = _bundle_path(target)
+    try:
+        bundle = GuideBundle(path)
+    except (OSError, BundleError) as exc:
+        print(f"ERROR: {path}: {exc}")
+        sys.exit(1)
+
+    info = bundle.info()
+    print(f"\n{info['path']}  ({info['bytes'] // 1024} KB, format v{info['version']})")
+    print(f"  meta: {json.dumps(info['meta'], ensure_ascii=False)}")
+    print(f"  {'section':<16} {'offset':>10} {'bytes':>12}  crc32")
+    for name, section in info["sections"].items():
+        print(f"  {name:<16} {section['offset']:>10} {section['bytes']:>12}  {section['crc32']}")
+    print()
+
+
+def verify(wanted) -> int:
+    problems = 0
+    for entry in _entries(wanted):
+        for label, shard, _ in manifest_shards(entry):
+            if not shard.has_bundle:
+                print(f"  {label}: no bundle")
+                continue
+            try:
+                errors = GuideBundle(shard.bundle_path).verify()
+            except (OSError, BundleError) as exc:
+                errors = [str(exc)]
+            for error in errors:
+                print(f"  {label}: {error}")
+            if not errors:
+                print(f"  {label}: OK")
+            problems += len(errors)
+    return problems
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("pack", "inspect", "verify"):
+        print(__doc__)
+        sys.exit(1)
+
+    command, args = sys.argv[1], sys.argv[2:]
+    if command == "pack":
+        pack(args)
+    elif command == "inspect":
+        if len(args) != 1:
+            print(__doc__)
+            sys.exit(1)
+        inspect(args[0])
+    elif verify(args):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
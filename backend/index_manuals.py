@@ -2,50 +2,89 @@
 Index vehicle manuals into FAISS + BM25 for the guide system.
 Reads PDFs from the manuel/ folder, processes them,
 and stores indexes under backend/data/guides/<slug>/.
+A sub-folder manuel/<guide name>/ holds the PDFs of a multi-document guide:
+each one gets its own index shard under data/guides/<slug>/shards/<document>/.
 
 Usage:
     cd backend
     python -m index_manuals
+    python -m index_manuals --document clio-4 "manuel/clio 4/multimedia.pdf"
+                                            # add or rebuild one document shard only
+    python -m index_manuals --specs-only   # rebuild specs.json from the PDFs in manuel/
+    python -m index_manuals --dedup-report # near-duplicate savings on the stored chunks
 """
-import json
 import sys
+import time
 import traceback
 from pathlib import Path
 
 # Ensure backend src is importable
 sys.path.insert(0, str(Path(__file__).parent))
 
-from src.config import CHUNK_SIZE, CHUNK_OVERLAP
-from src.guide_manager import GUIDES_DIR, slugify
+from src.config import (
+    CHUNK_OVERLAP,
+    CHUNK_SIZE,
+    DEDUP_ENABLED,
+    EMBEDDING_DIM,
+    EMBEDDING_REDUCTION,
+    PDF_EXTRACTOR,
+)
+from src.guide_manager import (
+    BUNDLE_FILENAME,
+    GUIDES_DIR,
+    derive_guide_name,
+    MAIN_DOCUMENT,
+    SHARDS_DIRNAME,
+    manifest_shards,
+    read_manifest,
+    slugify,
+    upsert_manifest_document,
+    write_manifest,
+)
+from src.guide_bundle import pack_guide
 from src.vector_store import get_embeddings
 from src.text_chunker import split_documents as split_document_chunks, is_junk_page
+from src.spec_tables import extract_specs, save_spec_index
+from src.chunk_store import write_chunk_store, load_chunks
+from src.vector_index import faiss_available, write_vector_index
+from src.pdf_extract import extract_pages
+from src.near_dup import dedup_chunks
 
 MANUALS_DIR = Path(__file__).parent.parent / "manuel"
 IMAGES_DIR = MANUALS_DIR / "voiture"
 
+# Stages reported to the ``progress(stage, fraction, message)`` callback
+INDEX_STAGES = ("extract", "chunk", "embed", "bm25", "specs", "bundle")
+
 
 def _tokenize(text: str):
     import re
     return re.findall(r"[a-zà-ÿ0-9]{2,}", text.lower())
 
 
-def extract_pdf(pdf_path: Path):
-    """Extract text pages from a PDF."""
-    from pypdf import PdfReader
+def extract_pdf(pdf_path: Path, backend: str = PDF_EXTRACTOR):
+    """Extract text pages from a PDF (see src/pdf_extract.py for the backends)."""
     from langchain_core.documents import Document
 
-    documents = []
-    reader = PdfReader(str(pdf_path))
+    pages, stats = extract_pages(pdf_path, backend)
+    print(
+        f"         {stats['backend']}: {stats['pages']} pages in {stats['seconds']}s"
+        f" ({stats['pages_per_s']} pages/s)"
+    )
+    if stats["fallback_pages"]:
+        print(f"         fallback used for pages {sorted(stats['fallback_pages'])}")
+    if stats["failed_pages"]:
+        print(f"         unreadable pages skipped: {stats['failed_pages']}")
 
-    for i, page in enumerate(reader.pages):
-        text = page.extract_text()
+    documents = []
+    for page_no, text in pages:
         if text and text.strip():
             documents.append(Document(
                 page_content=text,
                 metadata={
                     "source_file": pdf_path.name,
-                    "page": i + 1,
-                    "total_pages": len(reader.pages),
+                    "page": page_no,
+                    "total_pages": stats["pages"],
                 },
             ))
 
@@ -53,15 +92,33 @@ def extract_pdf(pdf_path: Path):
     return documents
 
 
-def index_single_manual(pdf_path: Path, guide_name: str, image_filename: str = None):
-    """Process and index a single PDF manual."""
-    import importlib.util
-    from langchain_community.vectorstores import FAISS
+def index_single_manual(
+    pdf_path: Path,
+    guide_name: str,
+    image_filename: str = None,
+    options: dict = None,
+    progress=None,
+    document: str = None,
+):
+    """
+    Process and index a single PDF manual (``options``: the guide's manifest
+    options). ``progress(stage, fraction, message)`` is called as each stage of
+    INDEX_STAGES starts and, for the embeddings, after every batch.
+    With ``document``, the PDF is one document of a multi-document guide: only
+    its shard is (re)built and the result carries a "document" manifest item.
+    """
     from rank_bm25 import BM25Okapi
     import pickle
 
+    report = progress or (lambda stage, fraction, message: None)
+
+    options = options or {}
+    reduction = options.get("embedding_reduction", EMBEDDING_REDUCTION)
+    dim = int(options.get("embedding_dim", EMBEDDING_DIM))
     slug = slugify(guide_name)
     guide_dir = GUIDES_DIR / slug
+    if document and document != MAIN_DOCUMENT:
+        guide_dir = guide_dir / SHARDS_DIRNAME / document
     vs_dir = guide_dir / "vector_store"
     vs_dir.mkdir(parents=True, exist_ok=True)
 
@@ -69,74 +126,127 @@ def index_single_manual(pdf_path: Path, guide_name: str, image_filename: str = N
     print(f"Indexing: {guide_name}")
     print(f"  PDF: {pdf_path.name}")
     print(f"  Slug: {slug}")
+    if document:
+        print(f"  Document: {document}")
     print(f"  Output: {vs_dir}")
     print(f"{'='*60}")
 
     # 1. Extract
-    print("  [1/4] Extracting pages...")
+    print("  [1/6] Extracting pages...")
+    report("extract", 0.0, "Extracting pages")
     documents = extract_pdf(pdf_path)
     print(f"         {len(documents)} pages extracted")
 
     # 2. Chunk
-    print("  [2/4] Smart chunking...")
+    print("  [2/6] Smart chunking...")
+    report("chunk", 0.0, f"{len(documents)} pages extracted, chunking")
     chunks = split_document_chunks(
         documents=documents,
         chunk_size=CHUNK_SIZE,
         chunk_overlap=CHUNK_OVERLAP,
     )
     print(f"         {len(chunks)} chunks created")
+    if DEDUP_ENABLED and chunks:
+        chunks, dedup = dedup_chunks(chunks)
+        print(
+            f"         {dedup['embeddings_saved']} near-duplicate chunks merged into "
+            f"{dedup['clusters']} canonical copies ({dedup['text_bytes_saved'] // 1024} KB of text, "
+            f"{dedup['embeddings_saved']} embeddings saved)"
+        )
 
     if not chunks:
         print("  ERROR: No chunks produced, skipping.")
         return None
 
-    # 3. FAISS index
-    if importlib.util.find_spec("faiss") is not None:
-        print("  [3/4] Building FAISS index...")
+    # 3. FAISS index (rows are chunk ids, no LangChain docstore)
+    if faiss_available():
+        print("  [3/6] Building FAISS index...")
+        report("embed", 0.0, f"Embedding {len(chunks)} chunks")
         embeddings = get_embeddings()
         batch_size = 200
-        vector_store = None
+        vectors = []
 
         for i in range(0, len(chunks), batch_size):
             batch = chunks[i:i + batch_size]
             batch_num = i // batch_size + 1
             total_batches = (len(chunks) + batch_size - 1) // batch_size
             print(f"         Batch {batch_num}/{total_batches}...")
-
-            if vector_store is None:
-                vector_store = FAISS.from_documents(documents=batch, embedding=embeddings)
-            else:
-                vector_store.add_documents(batch)
-
-        vector_store.save_local(str(vs_dir))
-        print(f"         FAISS index saved")
+            vectors.extend(embeddings.embed_documents([c.page_content for c in batch]))
+            report("embed", batch_num / total_batches, f"Batch {batch_num}/{total_batches}")
+
+        write_vector_index(vectors, vs_dir, reduction=reduction, dim=dim)
+        if reduction != "none" and dim:
+            print(f"         FAISS index saved ({reduction} {len(vectors[0])} -> {dim} dims)")
+        else:
+            print(f"         FAISS index saved")
     else:
-        print("  [3/4] FAISS not available, skipping vector index")
+        print("  [3/6] FAISS not available, skipping vector index")
 
-    # 4. BM25 index
-    print("  [4/4] Building BM25 index...")
+    # 4. BM25 index + chunk store (chunk ids = FAISS rows = BM25 corpus positions)
+    print("  [4/6] Building BM25 index and chunk store...")
+    report("bm25", 0.0, "Building BM25 index and chunk store")
     corpus = [_tokenize(c.page_content) for c in chunks]
     bm25 = BM25Okapi(corpus)
 
     bm25_path = vs_dir / "bm25_index.pkl"
     with open(bm25_path, "wb") as f:
-        pickle.dump({"bm25": bm25, "chunks": chunks}, f)
+        pickle.dump({"bm25": bm25}, f)
     print(f"         BM25 index saved ({len(chunks)} docs)")
 
-    return {
+    stats = write_chunk_store(chunks, vs_dir)
+    print(
+        f"         Chunk store saved ({stats['codec']}, "
+        f"{stats['raw_bytes'] // 1024} KB -> {stats['stored_bytes'] // 1024} KB)"
+    )
+
+    # 5. Spec lookup table
+    print("  [5/6] Extracting spec tables...")
+    report("specs", 0.0, "Extracting spec tables")
+    specs = extract_specs(documents)
+    save_spec_index(specs, vs_dir)
+    print(f"         {len(specs)} spec entries saved")
+
+    # 6. Single-file bundle (what the server loads)
+    print("  [6/6] Packing guide bundle...")
+    report("bundle", 0.0, "Packing guide bundle")
+    meta = {"slug": slug, "name": guide_name, "source_pdf": pdf_path.name, "chunks": len(chunks)}
+    if document:
+        meta["document"] = document
+    sizes = pack_guide(vs_dir, guide_dir / BUNDLE_FILENAME, meta=meta)
+    print(f"         {BUNDLE_FILENAME} saved ({sum(sizes.values()) // 1024} KB, {len(sizes)} sections)")
+
+    indexed_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+    result = {
         "slug": slug,
         "name": guide_name,
         "image": image_filename,
     }
+    if document and document != MAIN_DOCUMENT:
+        result["document"] = {"id": document, "pdf": pdf_path.name, "indexed_at": indexed_at}
+    else:
+        result["indexed_at"] = indexed_at
+    return result
 
 
-def derive_guide_name(pdf_name: str) -> str:
-    """Derive a clean guide name from a PDF filename."""
-    name = pdf_name.replace(".pdf", "").replace(".PDF", "")
-    # Remove 'manuel' prefix
-    name = name.replace("manuel ", "").replace("Manuel ", "")
-    # Title case
-    return name.strip().title()
+def document_id(pdf_path: Path) -> str:
+    """Shard id of a document PDF: its slugified file name ("main" is reserved)."""
+    doc_id = slugify(Path(pdf_path).stem)
+    if not doc_id or doc_id == MAIN_DOCUMENT:
+        raise ValueError(f"Nom de document invalide: {Path(pdf_path).name}")
+    return doc_id
+
+
+def index_document(slug: str, pdf_path: Path, doc_id: str = None):
+    """Add or rebuild one document shard of a guide and record it in the manifest."""
+    previous = next((e for e in read_manifest() if e["slug"] == slug), {})
+    guide_name = previous.get("name") or derive_guide_name(slug.replace("-", " "))
+    doc_id = doc_id or document_id(pdf_path)
+    result = index_single_manual(
+        pdf_path, guide_name, previous.get("image"), previous.get("options"), document=doc_id
+    )
+    if result:
+        upsert_manifest_document(slug, guide_name, result["document"], result["image"])
+    return result
 
 
 def find_matching_image(guide_name: str) -> str | None:
@@ -153,7 +263,87 @@ def find_matching_image(guide_name: str) -> str | None:
     return None
 
 
+def _shard_pdf(shard) -> Path | None:
+    """The PDF a shard was indexed from, found under manuel/ (None when absent)."""
+    names = [shard.pdf] if shard.pdf else []
+    if shard.has_bundle:
+        from src.guide_bundle import GuideBundle
+
+        names.append(GuideBundle(shard.bundle_path).meta.get("source_pdf"))
+    chunks = load_chunks(shard.vector_store_dir, [])
+    if len(chunks):
+        names.append(chunks.metadata(0).get("source_file"))
+    for name in filter(None, names):
+        found = sorted(MANUALS_DIR.rglob(name))
+        if found:
+            return found[0]
+    return None
+
+
+def rebuild_spec_indexes():
+    """Re-extract spec tables from the page text of each guide's PDFs (not from its chunks)."""
+    manifest = read_manifest()
+    if not manifest:
+        print(f"\nERROR: manifest not found or empty in {GUIDES_DIR}")
+        sys.exit(1)
+
+    for entry in manifest:
+        for label, shard, meta in manifest_shards(entry):
+            vs_dir = shard.vector_store_dir
+            pdf_path = _shard_pdf(shard)
+            if pdf_path is None:
+                print(f"  {label}: PDF not found in {MANUALS_DIR}, skipped")
+                continue
+            specs = extract_specs(extract_pdf(pdf_path))
+            vs_dir.mkdir(parents=True, exist_ok=True)
+            save_spec_index(specs, vs_dir)
+            print(f"  {label}: {len(specs)} spec entries saved")
+            if shard.has_bundle:
+                pack_guide(vs_dir, shard.bundle_path, meta=meta)
+                print(f"  {label}: {BUNDLE_FILENAME} repacked")
+
+
+def dedup_report():
+    """What near-duplicate elimination would save on each guide's stored chunks."""
+    for entry in read_manifest():
+        for label, shard, _ in manifest_shards(entry):
+            chunks = list(load_chunks(shard.vector_store_dir, []).iter_documents())
+            if not chunks:
+                print(f"  {label}: no chunk store, skipped")
+                continue
+            _, stats = dedup_chunks(chunks)
+            print(
+                f"  {label}: {stats['chunks_in']} -> {stats['chunks_out']} chunks, "
+                f"{stats['clusters']} clusters, {stats['embeddings_saved']} embeddings and "
+                f"{stats['text_bytes_saved'] // 1024} KB of text saved"
+            )
+
+
+def _pdfs(directory: Path):
+    return sorted({p.resolve(): p for p in (list(directory.glob("*.pdf")) + list(directory.glob("*.PDF")))}.values())
+
+
+def _guide_folders():
+    """Sub-folders of manuel/ holding the PDFs of a multi-document guide."""
+    return sorted(d for d in MANUALS_DIR.iterdir() if d.is_dir() and d != IMAGES_DIR and _pdfs(d))
+
+
 def main():
+    if "--specs-only" in sys.argv[1:]:
+        rebuild_spec_indexes()
+        return
+    if "--dedup-report" in sys.argv[1:]:
+        dedup_report()
+        return
+    if "--document" in sys.argv[1:]:
+        args = sys.argv[sys.argv.index("--document") + 1:]
+        if len(args) < 2:
+            print("Usage: python -m index_manuals --document <slug> <pdf> [document id]")
+            sys.exit(1)
+        if not index_document(args[0], Path(args[1]), args[2] if len(args) > 2 else None):
+            sys.exit(1)
+        return
+
     print("\n" + "=" * 60)
     print("  Vehicle Manual Indexing")
     print("=" * 60)
@@ -163,32 +353,69 @@ def main():
         print("  Create a 'manuel/' folder at project root with your PDFs.")
         sys.exit(1)
 
-    pdf_files = list({p.resolve(): p for p in (list(MANUALS_DIR.glob("*.pdf")) + list(MANUALS_DIR.glob("*.PDF")))}.values())
-    if not pdf_files:
+    pdf_files = _pdfs(MANUALS_DIR)
+    folders = _guide_folders()
+    if not pdf_files and not folders:
         print(f"\nNo PDF files found in {MANUALS_DIR}")
         sys.exit(1)
 
     print(f"\nFound {len(pdf_files)} PDF(s):")
     for p in pdf_files:
         print(f"  - {p.name}")
+    for folder in folders:
+        print(f"  - {folder.name}/ ({len(_pdfs(folder))} documents)")
 
-    manifest = []
+    previous = {entry["slug"]: entry for entry in read_manifest()}
+    manifest = {}
 
     for pdf_path in pdf_files:
         try:
             guide_name = derive_guide_name(pdf_path.name)
             image = find_matching_image(guide_name)
-            result = index_single_manual(pdf_path, guide_name, image)
+            options = previous.get(slugify(guide_name), {}).get("options")
+            result = index_single_manual(pdf_path, guide_name, image, options)
             if result:
-                manifest.append(result)
+                if options is not None:
+                    result["options"] = options
+                manifest[result["slug"]] = result
         except Exception as e:
             print(f"\n  ERROR indexing {pdf_path.name}: {e}")
             traceback.print_exc()
 
-    # Write manifest
-    manifest_path = GUIDES_DIR / "manifest.json"
-    with open(manifest_path, "w", encoding="utf-8") as f:
-        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    for folder in folders:
+        slug = slugify(derive_guide_name(folder.name))
+        guide_name = previous.get(slug, {}).get("name") or derive_guide_name(folder.name)
+        entry = manifest.get(slug) or {
+            "slug": slug, "name": guide_name, "image": find_matching_image(guide_name),
+        }
+        options = previous.get(slug, {}).get("options")
+        if options is not None:
+            entry["options"] = options
+        documents = []
+        for pdf_path in _pdfs(folder):
+            try:
+                result = index_single_manual(
+                    pdf_path, guide_name, entry["image"], options, document=document_id(pdf_path)
+                )
+                if result:
+                    documents.append(result["document"])
+            except Exception as e:
+                print(f"\n  ERROR indexing {folder.name}/{pdf_path.name}: {e}")
+                traceback.print_exc()
+        if documents:
+            entry["documents"] = documents
+            manifest[slug] = entry
+
+    # Documents added one by one (--document, uploads) stay in their guide
+    for slug, entry in previous.items():
+        if not entry.get("documents"):
+            continue
+        if slug not in manifest:
+            manifest[slug] = entry
+        elif "documents" not in manifest[slug]:
+            manifest[slug]["documents"] = entry["documents"]
+
+    manifest_path = write_manifest(list(manifest.values()))
 
     print(f"\n{'='*60}")
     print(f"  Done! {len(manifest)} guide(s) indexed.")
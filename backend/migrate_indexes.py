@@ -0,0 +1,186 @@
+"""
+Migrate existing guide indexes to the current on-disk layout.
+- Moves the chunks kept inside bm25_index.pkl into the compressed chunk store
+  and rewrites the pickle with the BM25 model only.
+- Replaces LangChain's pickled FAISS docstore (index.pkl) with a NumPy
+  row -> chunk id array next to index.faiss.
+- Writes the chunk adjacency (prev/next/section links) of chunk stores
+  built before it was persisted.
+- Repacks guide.bundle when the guide has one.
+When a guide's FAISS rows cannot be matched to its chunks, the files of
+that guide are restored as they were and the command exits with status 1.
+
+Usage:
+    cd backend
+    python -m migrate_indexes [slug ...]
+"""
+import os
+import pickle
+import shutil
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.guide_manager import BUNDLE_FILENAME, GUIDES_DIR, read_manifest
+from src.guide_bundle import pack_guide
+from src.chunk_adjacency import ADJACENCY_FILENAME, SECTION, ChunkAdjacency, write_adjacency
+from src.chunk_store import BLOB_FILENAME, META_FILENAME, OFFSETS_FILENAME, ChunkStore, write_chunk_store
+from src.vector_index import (
+    INDEX_FILENAME,
+    IDS_FILENAME,
+    LEGACY_DOCSTORE_FILENAME,
+    write_row_ids,
+)
+
+# Files a migration may rewrite, saved first so a failed guide is restored
+MIGRATED_FILES = ("bm25_index.pkl", BLOB_FILENAME, OFFSETS_FILENAME, META_FILENAME, ADJACENCY_FILENAME)
+BACKUP_DIRNAME = ".migrate-backup"
+
+
+class MigrationError(Exception):
+    """The guide cannot be migrated as is; its files are restored."""
+
+
+def backup_files(vs_dir: Path) -> Path:
+    backup_dir = vs_dir / BACKUP_DIRNAME
+    shutil.rmtree(backup_dir, ignore_errors=True)
+    backup_dir.mkdir()
+    for name in MIGRATED_FILES:
+        if (vs_dir / name).exists():
+            shutil.copy2(vs_dir / name, backup_dir / name)
+    return backup_dir
+
+
+def restore_files(vs_dir: Path, backup_dir: Path):
+    """Put back the saved files and remove those the migration created."""
+    for name in MIGRATED_FILES:
+        saved = backup_dir / name
+        if saved.exists():
+            os.replace(saved, vs_dir / name)
+        elif (vs_dir / name).exists():
+            (vs_dir / name).unlink()
+    shutil.rmtree(backup_dir, ignore_errors=True)
+
+
+def migrate_chunk_store(vs_dir: Path) -> str:
+    bm25_path = vs_dir / "bm25_index.pkl"
+    if not bm25_path.exists():
+        return "no BM25 index"
+
+    with open(bm25_path, "rb") as f:
+        data = pickle.load(f)
+    chunks = data.get("chunks")
+    if not chunks:
+        if ChunkStore.load(vs_dir) is not None:
+            return "already migrated"
+        return "no chunks found"
+
+    stats = write_chunk_store(chunks, vs_dir)
+
+    tmp_path = bm25_path.with_suffix(".pkl.tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump({"bm25": data["bm25"]}, f)
+    before = bm25_path.stat().st_size
+    os.replace(tmp_path, bm25_path)
+    after = bm25_path.stat().st_size
+
+    return (
+        f"{stats['chunks']} chunks -> chunk store ({stats['codec']}, "
+        f"{stats['raw_bytes'] // 1024} KB text stored in {stats['stored_bytes'] // 1024} KB); "
+        f"bm25_index.pkl {before // 1024} KB -> {after // 1024} KB"
+    )
+
+
+def migrate_vector_index(vs_dir: Path) -> str:
+    if not (vs_dir / INDEX_FILENAME).exists():
+        return "no FAISS index"
+
+    legacy_path = vs_dir / LEGACY_DOCSTORE_FILENAME
+    if not legacy_path.exists():
+        if (vs_dir / IDS_FILENAME).exists():
+            return "already migrated"
+        return "no docstore, rows are used as chunk ids"
+
+    # One-time unpickle of a locally produced LangChain save
+    with open(legacy_path, "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    docs = [docstore.search(index_to_docstore_id[row]) for row in range(len(index_to_docstore_id))]
+
+    store = ChunkStore.load(vs_dir)
+    if store is None:
+        write_chunk_store(docs, vs_dir)
+        chunk_ids = range(len(docs))
+    else:
+        by_key = {}
+        for chunk_id in range(len(store)):
+            meta = store.metadata(chunk_id)
+            by_key[(meta["source_file"], meta["chunk_index"])] = chunk_id
+        chunk_ids = []
+        for doc in docs:
+            key = (doc.metadata.get("source_file"), doc.metadata.get("chunk_index"))
+            if key not in by_key:
+                raise MigrationError(f"FAISS row {key} has no matching chunk")
+            chunk_ids.append(by_key[key])
+
+    write_row_ids(vs_dir, chunk_ids)
+    return f"{len(docs)} rows mapped to chunk ids, index.pkl removed"
+
+
+def migrate_adjacency(vs_dir: Path) -> str:
+    store = ChunkStore.load(vs_dir)
+    if store is None:
+        return "no chunk store"
+    try:
+        existing = ChunkAdjacency.load(vs_dir)
+        if existing is not None and len(existing) == len(store):
+            return "already migrated"
+        adjacency = ChunkAdjacency.from_chunks(store)
+        write_adjacency(adjacency.array, vs_dir)
+    finally:
+        store.close()
+    sections = len(set(adjacency.array[SECTION].tolist()))
+    return f"{ADJACENCY_FILENAME} written ({len(adjacency)} chunks, {sections} sections)"
+
+
+def main():
+    manifest = {entry["slug"]: entry for entry in read_manifest()}
+    if not manifest:
+        print(f"\nERROR: manifest not found or empty in {GUIDES_DIR}")
+        sys.exit(1)
+    slugs = list(manifest)
+
+    wanted = sys.argv[1:]
+    if wanted:
+        slugs = [s for s in slugs if s in wanted]
+
+    print(f"\nMigrating {len(slugs)} guide(s)")
+    failed = []
+    for slug in slugs:
+        vs_dir = GUIDES_DIR / slug / "vector_store"
+        print(f"  {slug}:")
+        backup_dir = backup_files(vs_dir)
+        try:
+            print(f"    chunk store: {migrate_chunk_store(vs_dir)}")
+            print(f"    FAISS index: {migrate_vector_index(vs_dir)}")
+            print(f"    adjacency: {migrate_adjacency(vs_dir)}")
+        except Exception as exc:
+            restore_files(vs_dir, backup_dir)
+            if not isinstance(exc, MigrationError):
+                raise
+            print(f"    ERROR: {exc}; previous files restored, index.pkl kept")
+            failed.append(slug)
+            continue
+        shutil.rmtree(backup_dir, ignore_errors=True)
+        bundle_path = GUIDES_DIR / slug / BUNDLE_FILENAME
+        if bundle_path.exists():
+            pack_guide(vs_dir, bundle_path, meta=manifest[slug])
+            print(f"    bundle: {BUNDLE_FILENAME} repacked")
+    print()
+    if failed:
+        print(f"ERROR: {len(failed)} guide(s) not migrated: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
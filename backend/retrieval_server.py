@@ -0,0 +1,71 @@
+"""
+Shared retrieval service: one process loads the guide indexes (FAISS, BM25,
+chunk store) and serves the searches of every gunicorn worker over a UNIX
+socket. Start it before the API and give both the same RETRIEVAL_SOCKET;
+the workers then only keep the spec tables and answer caches of the guides.
+Guides are loaded on first use (within GUIDE_MEMORY_BUDGET_MB), or at start
+with --preload.
+
+Usage:
+    cd backend
+    RETRIEVAL_SOCKET=/tmp/auris-retrieval.sock python -m retrieval_server
+    python -m retrieval_server --socket /tmp/auris-retrieval.sock [--preload all|popular|clio-4 ...]
+"""
+import argparse
+import signal
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.config import RETRIEVAL_BATCH_MAX, RETRIEVAL_BATCH_WINDOW_MS, RETRIEVAL_SOCKET
+from src.guide_manager import guide_manager
+from src.guide_registry import guide_registry
+from src.retrieval_service import RetrievalService
+
+
+def _preload(targets):
+    if targets == ["all"]:
+        slugs = [g["slug"] for g in guide_manager.list_guides()]
+    elif targets == ["popular"]:
+        slugs = guide_registry.popular_slugs()
+    else:
+        slugs = targets
+    for slug in slugs:
+        try:
+            guide_registry.get(slug, count_hit=False)
+            print(f"RetrievalService: '{slug}' preloaded")
+        except Exception as exc:
+            print(f"RetrievalService: preload of '{slug}' failed ({exc})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve guide searches to the API workers over a UNIX socket")
+    parser.add_argument("--socket", default=RETRIEVAL_SOCKET, help="socket path (default: RETRIEVAL_SOCKET)")
+    parser.add_argument("--window-ms", type=float, default=RETRIEVAL_BATCH_WINDOW_MS, help="micro-batching window")
+    parser.add_argument("--batch-max", type=int, default=RETRIEVAL_BATCH_MAX, help="queries per batch")
+    parser.add_argument("--preload", nargs="*", default=[], help="guides to load at start: all, popular or slugs")
+    args = parser.parse_args()
+
+    if not args.socket:
+        print("ERROR: set RETRIEVAL_SOCKET or pass --socket")
+        sys.exit(1)
+
+    service = RetrievalService(args.socket, args.window_ms, args.batch_max)
+    if args.preload:
+        # In the background: the socket accepts searches meanwhile
+        threading.Thread(target=_preload, args=(args.preload,), name="preload", daemon=True).start()
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever(): call it from another thread
+        threading.Thread(target=service.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    service.serve_forever()
+    print(f"RetrievalService: stopped ({service.metrics()['batching']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Admission control for the chat endpoint: a bounded wait queue in front of
+the LLM calls (limits per worker and per guide), immediate load shedding
+when the expected queueing delay exceeds the SLO, and per-client token
+bucket rate limiting. Rejections surface as 429 + Retry-After.
+All limits are per gunicorn worker: a client spread over N workers gets up
+to N times RATE_LIMIT_PER_MIN.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+from .config import (
+    ADMISSION_MAX_CONCURRENT,
+    ADMISSION_MAX_PER_GUIDE,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_SLO_S,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_PER_MIN,
+)
+
+INITIAL_SERVICE_S = 3.0  # LLM call duration assumed before any measurement
+SERVICE_EWMA_ALPHA = 0.2
+MAX_TRACKED_CLIENTS = 10000
+
+
+class Overloaded(Exception):
+    """The request was shed; retry after ``retry_after`` seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Serveur surcharge ({reason}), reessayez dans {math.ceil(retry_after)} s")
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class AdmissionController:
+    """Concurrency limits with a bounded, SLO-aware wait queue."""
+
+    def __init__(
+        self,
+        max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+        max_per_guide: int = ADMISSION_MAX_PER_GUIDE,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_slo_s: float = ADMISSION_QUEUE_SLO_S,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_per_guide = max_per_guide
+        self.max_queue = max_queue
+        self.queue_slo_s = queue_slo_s
+        self.service_s = INITIAL_SERVICE_S
+        self.running = 0
+        self.queued = 0
+        self.running_by_guide: dict = {}
+        self.queued_by_guide: dict = {}
+        self._waiters: deque = deque()
+        self._cond = threading.Condition()
+        self.stats = {
+            "admitted": 0,
+            "waited": 0,
+            "rejected_queue_full": 0,
+            "rejected_slo": 0,
+            "timed_out": 0,
+            "skipped_background": 0,
+        }
+
+    def _has_slot(self, slug: str) -> bool:
+        return (
+            self.running < self.max_concurrent
+            and self.running_by_guide.get(slug, 0) < self.max_per_guide
+        )
+
+    def _estimated_delay(self, slug: str) -> float:
+        """Expected wait for a new arrival, from the queue ahead and the mean call time."""
+        overall = (self.queued + 1) * self.service_s / self.max_concurrent
+        per_guide = (self.queued_by_guide.get(slug, 0) + 1) * self.service_s / self.max_per_guide
+        return max(overall, per_guide)
+
+    def _take(self, slug: str):
+        self.running += 1
+        self.running_by_guide[slug] = self.running_by_guide.get(slug, 0) + 1
+        self.stats["admitted"] += 1
+
+    def _reject(self, field: str, reason: str, retry_after: float):
+        self.stats[field] += 1
+        raise Overloaded(reason, retry_after)
+
+    def _first_servable(self):
+        """Earliest waiter whose guide has a free slot (FIFO, lock held)."""
+        for waiter in self._waiters:
+            if self._has_slot(waiter[0]):
+                return waiter
+        return None
+
+    def _enter(self, slug: str, max_wait_s: Optional[float] = None):
+        with self._cond:
+            # A freed slot goes to the queue first: arrivals only take one no waiter can use
+            if self._has_slot(slug) and self._first_servable() is None:
+                self._take(slug)
+                return
+
+            wait_limit = self.queue_slo_s if max_wait_s is None else min(self.queue_slo_s, max_wait_s)
+            if self.queued >= self.max_queue:
+                self._reject("rejected_queue_full", "file d'attente pleine", self._estimated_delay(slug))
+            delay = self._estimated_delay(slug)
+            if delay > wait_limit:
+                self._reject("rejected_slo", "attente estimee trop longue", delay)
+
+            self.stats["waited"] += 1
+            self.queued += 1
+            self.queued_by_guide[slug] = self.queued_by_guide.get(slug, 0) + 1
+            waiter = [slug]  # identity marks this waiter's place in the queue
+            self._waiters.append(waiter)
+            deadline = time.monotonic() + wait_limit
+            try:
+                while self._first_servable() is not waiter:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._reject("timed_out", "delai d'attente depasse", self.service_s)
+                    self._cond.wait(remaining)
+            finally:
+                self._waiters.remove(waiter)
+                self.queued -= 1
+                self.queued_by_guide[slug] -= 1
+                if not self.queued_by_guide[slug]:
+                    del self.queued_by_guide[slug]
+                # The next waiter may now be first in line for a free slot
+                self._cond.notify_all()
+            self._take(slug)
+
+    def _leave(self, slug: str):
+        with self._cond:
+            self.running -= 1
+            self.running_by_guide[slug] -= 1
+            if not self.running_by_guide[slug]:
+                del self.running_by_guide[slug]
+            self._cond.notify_all()
+
+    def record_service(self, elapsed: float):
+        """
+        Feed the duration of a completed foreground LLM call to the mean used
+        by the queue-wait estimate (skipped or failed calls would bias it low).
+        """
+        with self._cond:
+            self.service_s += SERVICE_EWMA_ALPHA * (elapsed - self.service_s)
+
+    @contextmanager
+    def slot(self, slug: str, max_wait_s: Optional[float] = None):
+        """
+        Hold an LLM slot for ``slug``; raises Overloaded when shedding.
+        ``max_wait_s`` shortens the queue SLO for requests with less time left.
+        Waiters are served in arrival order; call record_service() with the
+        duration of the LLM call made in the slot.
+        """
+        self._enter(slug, max_wait_s)
+        try:
+            yield
+        finally:
+            self._leave(slug)
+
+    @contextmanager
+    def background_slot(self, slug: str):
+        """Non-blocking variant for optional work: yields False when no slot is free."""
+        with self._cond:
+            acquired = self.queued == 0 and self._has_slot(slug)
+            if acquired:
+                self._take(slug)
+            else:
+                self.stats["skipped_background"] += 1
+        if not acquired:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            self._leave(slug)
+
+    def metrics(self) -> dict:
+        with self._cond:
+            return {
+                "running": self.running,
+                "queue_depth": self.queued,
+                "running_by_guide": dict(self.running_by_guide),
+                "queued_by_guide": dict(self.queued_by_guide),
+                "max_concurrent": self.max_concurrent,
+                "max_per_guide": self.max_per_guide,
+                "max_queue": self.max_queue,
+                "queue_slo_s": self.queue_slo_s,
+                "mean_llm_call_s": round(self.service_s, 3),
+                **self.stats,
+            }
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets (``rate_per_min`` refill, ``burst`` capacity)."""
+
+    def __init__(self, rate_per_min: float = RATE_LIMIT_PER_MIN, burst: int = RATE_LIMIT_BURST):
+        self.rate = rate_per_min / 60.0
+        self.burst = burst
+        self.enabled = rate_per_min > 0 and burst > 0
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"allowed": 0, "limited": 0}
+
+    def allow(self, client: str) -> Tuple[bool, float]:
+        """(allowed, seconds until the next token)."""
+        if not self.enabled:
+            return True, 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(client, (float(self.burst), now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > MAX_TRACKED_CLIENTS:
+                self._buckets.popitem(last=False)
+            self.stats["allowed" if allowed else "limited"] += 1
+        return allowed, 0.0 if allowed else (1.0 - tokens) / self.rate
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return dict(self.stats, clients=len(self._buckets), enabled=self.enabled)
+
+
+llm_admission = AdmissionController()
+chat_rate_limiter = TokenBucketLimiter()
@@ -0,0 +1,201 @@
+"""
+Precomputed answers for the most asked questions, so the first users of a
+guide after a deploy or a re-index do not pay the embedding + LLM cost.
+- mine_questions() counts the normalised questions of the query logs
+  (src.query_log) per guide and language; the /api/suggestions questions are
+  always included.
+- warm_guide() answers them offline (python -m warm_answers, one process per
+  guide) and writes data/warm_answers/<slug>.json (answers with their sources
+  block), tagged with a fingerprint of the guide's index files.
+- load_warm_answers() fills a chatbot's answer cache from that file when the
+  guide is loaded, unless its indexes changed since the file was written.
+This module is imported by api.py at startup: the chatbot stack is only
+imported inside the functions that need it.
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .config import WARM_ANSWERS_DIR, WARM_MIN_COUNT, WARM_TOP_N
+
+# Questions offered by /api/suggestions (French), asked on every guide
+SUGGESTIONS = [
+    {"id": 1, "text": "Comment fonctionne le systeme de freinage ?", "category": "mecanique"},
+    {"id": 2, "text": "Quelle est la pression recommandee des pneus ?", "category": "entretien"},
+    {"id": 3, "text": "Que signifie le voyant moteur allume ?", "category": "diagnostic"},
+    {"id": 4, "text": "Comment faire une vidange ?", "category": "entretien"},
+    {"id": 5, "text": "Quelle est la capacite du reservoir ?", "category": "caracteristiques"},
+    {"id": 6, "text": "Comment connecter mon telephone en Bluetooth ?", "category": "multimedia"},
+]
+SUGGESTIONS_LANG = "fr"
+CACHEABLE_PATHS = ("extractive", "llm")  # not degraded answers, nor spec rows (off by default)
+_FILE_BLOCK = 1024 * 1024
+
+
+def warm_path(slug: str, directory: Path = WARM_ANSWERS_DIR) -> Path:
+    return Path(directory) / f"{slug}.json"
+
+
+def _file_crc(path: Path, crc: int) -> int:
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(_FILE_BLOCK)
+            if not block:
+                return crc
+            crc = zlib.crc32(block, crc)
+
+
+def index_fingerprint(chatbot) -> str:
+    """
+    Changes when any shard is re-indexed: the section CRCs of its guide.bundle
+    (header only, nothing is read), else a CRC of its vector_store/ files.
+    """
+    from .guide_bundle import read_section_table
+
+    if getattr(chatbot, "remote_fingerprint", None):
+        return chatbot.remote_fingerprint  # computed by the retrieval service
+    crc = 0
+    for location in chatbot.guide.shards:
+        crc = zlib.crc32(location.document.encode("utf-8"), crc)
+        if location.has_bundle:
+            for name, (_, length, section_crc) in sorted(read_section_table(location.bundle_path).items()):
+                crc = zlib.crc32(f"{name}:{length}:{section_crc}".encode("utf-8"), crc)
+            continue
+        vs_dir = location.vector_store_dir
+        for path in sorted(vs_dir.iterdir()) if vs_dir.is_dir() else ():
+            if path.is_file():
+                crc = _file_crc(path, zlib.crc32(path.name.encode("utf-8"), crc))
+    return f"{crc:08x}"
+
+
+def mine_questions(
+    log_paths: Iterable[Path],
+    top_n: int = WARM_TOP_N,
+    min_count: int = WARM_MIN_COUNT,
+    slugs: Optional[Iterable[str]] = None,
+) -> Dict[str, List[dict]]:
+    """
+    Most frequent questions per guide: {slug: [{"question", "lang", "count"}]},
+    at most ``top_n`` per (guide, language), each asked ``min_count`` times or
+    more. The question kept is the most common wording of its normalised form.
+    """
+    from .guide_chatbot import normalize_question
+
+    wanted = set(slugs) if slugs is not None else None
+    counts: Counter = Counter()
+    wordings: Dict[tuple, Counter] = {}
+    for path in log_paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # line cut by a crash or a rotation
+                slug, question, lang = record.get("guide"), (record.get("question") or "").strip(), record.get("lang")
+                if not slug or not question or not lang or (wanted is not None and slug not in wanted):
+                    continue
+                if record.get("path") in ("canned", "error"):
+                    continue
+                key = (slug, lang, normalize_question(question))
+                counts[key] += 1
+                wordings.setdefault(key, Counter())[question] += 1
+
+    mined: Dict[str, List[dict]] = {}
+    per_lang: Counter = Counter()
+    for (slug, lang, normalized), count in counts.most_common():
+        if count < min_count or per_lang[(slug, lang)] >= top_n:
+            continue
+        per_lang[(slug, lang)] += 1
+        question = wordings[(slug, lang, normalized)].most_common(1)[0][0]
+        mined.setdefault(slug, []).append({"question": question, "lang": lang, "count": count})
+    return mined
+
+
+def with_suggestions(slug: str, questions: List[dict]) -> List[dict]:
+    """``questions`` plus the suggested questions not already among them."""
+    from .guide_chatbot import normalize_question
+
+    seen = {(q["lang"], normalize_question(q["question"])) for q in questions}
+    extra = [
+        {"question": s["text"], "lang": SUGGESTIONS_LANG, "count": 0}
+        for s in SUGGESTIONS
+        if (SUGGESTIONS_LANG, normalize_question(s["text"])) not in seen
+    ]
+    return questions + extra
+
+
+def warm_guide(slug: str, questions: List[dict], directory: Path = WARM_ANSWERS_DIR) -> dict:
+    """
+    Answer ``questions`` for one guide and write its warm file. Runs in a
+    worker process of python -m warm_answers: loads the guide itself, without
+    the warm file (answers are always recomputed).
+    """
+    from .guide_chatbot import GuideChatbot
+    from .guide_manager import guide_manager
+
+    start = time.perf_counter()
+    chatbot = GuideChatbot(guide_manager.get_guide(slug))
+    answers, failed = [], 0
+    for item in questions:
+        try:
+            result, _ = chatbot.precompute_answer(item["question"], item["lang"])
+        except Exception as exc:
+            print(f"Warm answers: {slug} '{item['question'][:60]}' failed ({exc})")
+            failed += 1
+            continue
+        if result["answer_path"] not in CACHEABLE_PATHS:
+            failed += 1
+            continue
+        answers.append({
+            "question": item["question"],
+            "lang": item["lang"],
+            "count": item["count"],
+            "answer": result["response"],
+            "path": result["answer_path"],
+        })
+
+    data = {
+        "slug": slug,
+        "fingerprint": index_fingerprint(chatbot),
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "answers": answers,
+    }
+    path = warm_path(slug, directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+    return {
+        "slug": slug,
+        "answered": len(answers),
+        "failed": failed,
+        "took_s": round(time.perf_counter() - start, 2),
+    }
+
+
+def load_warm_answers(chatbot, directory: Path = WARM_ANSWERS_DIR) -> int:
+    """Fill the chatbot's answer cache from its warm file; returns the answers loaded."""
+    path = warm_path(chatbot.guide.slug, directory)
+    if not path.exists():
+        return 0
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as exc:
+        print(f"Warm answers: cannot read {path.name} ({exc})")
+        return 0
+    if data.get("fingerprint") != index_fingerprint(chatbot):
+        print(f"Warm answers: {path.name} predates the current index of {chatbot.guide.slug}, ignored")
+        return 0
+    answers = data.get("answers") or []
+    # Least asked first: the most asked end up most recently used in the LRU cache
+    for item in sorted(answers, key=lambda a: a.get("count", 0)):
+        chatbot.store_answer(item["question"], item["lang"], item["answer"])
+    return len(answers)
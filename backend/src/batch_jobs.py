@@ -0,0 +1,146 @@
+"""
+Background batch jobs for POST /api/batch. Batches above BATCH_SYNC_MAX_ITEMS
+would hold the request past the gunicorn timeout, so they run on a thread of
+the web worker instead (run_batch: LLM calls in background admission slots,
+behind the chat requests). As for indexing jobs, the state lives in
+data/batch_jobs/<id>.json and the results are appended to <id>.jsonl as they
+come, so any worker can report progress; a job whose worker died is marked
+failed.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+from .admission import Overloaded
+from .config import BATCH_JOBS_DIR, BATCH_MAX_JOBS, JOBS_KEEP
+from .indexing_jobs import ACTIVE_STATES, PENDING_RETRY_AFTER_S, _JOB_ID, _now, _pid_alive
+
+
+def _job_path(job_id: str, suffix: str = ".json") -> Path:
+    return BATCH_JOBS_DIR / f"{job_id}{suffix}"
+
+
+def write_job(job: dict):
+    BATCH_JOBS_DIR.mkdir(parents=True, exist_ok=True)
+    job["updated_at"] = _now()
+    path = _job_path(job["id"])
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(job, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def read_job(job_id: str) -> Optional[dict]:
+    """Job state, None for an unknown id."""
+    if not _JOB_ID.match(job_id or ""):
+        return None
+    try:
+        with open(_job_path(job_id), "r", encoding="utf-8") as f:
+            job = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if job["status"] in ACTIVE_STATES and not _pid_alive(job.get("owner_pid")):
+        job.update(status="failed", error="Batch interrompu (processus arrete)", finished_at=_now())
+        write_job(job)
+    return job
+
+
+def read_results(job_id: str) -> List[dict]:
+    """Results written so far (a partially written last line is skipped)."""
+    results = []
+    try:
+        with open(_job_path(job_id, ".jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    results.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    except OSError:
+        pass
+    return results
+
+
+def _list_jobs() -> List[dict]:
+    if not BATCH_JOBS_DIR.exists():
+        return []
+    paths = sorted(BATCH_JOBS_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    jobs = (read_job(p.stem) for p in paths)
+    return [job for job in jobs if job]
+
+
+def _prune_jobs():
+    """Keep the JOBS_KEEP most recent finished jobs and their results."""
+    finished = [job for job in _list_jobs() if job["status"] not in ACTIVE_STATES]
+    for job in finished[JOBS_KEEP:]:
+        _job_path(job["id"]).unlink(missing_ok=True)
+        _job_path(job["id"], ".jsonl").unlink(missing_ok=True)
+
+
+def _run(job: dict, items: List[dict], concurrency: int):
+    from .batch_qa import run_batch
+
+    job.update(status="running", started_at=_now())
+    write_job(job)
+
+    def on_result(record: dict):
+        job["completed"] += 1
+        job["progress"] = round(job["completed"] / max(1, job["total"]), 3)
+        write_job(job)
+
+    try:
+        report = run_batch(
+            items,
+            output_path=_job_path(job["id"], ".jsonl"),
+            concurrency=concurrency,
+            on_result=on_result,
+        )
+        job.update(status="done", progress=1.0, rejected=report["rejected"], summary=report["summary"])
+    except Exception as exc:
+        job.update(status="failed", error=str(exc))
+    job["finished_at"] = _now()
+    write_job(job)
+
+
+class BatchJobs:
+    """Batch jobs run on threads of this worker, BATCH_MAX_JOBS active at once over all workers."""
+
+    def __init__(self, max_jobs: int = BATCH_MAX_JOBS):
+        self.max_jobs = max(1, max_jobs)
+        self._lock = threading.Lock()
+        self.stats = {"submitted": 0, "rejected": 0}
+
+    def submit(self, items: List[dict], concurrency: int) -> dict:
+        """Start a job; raises Overloaded when BATCH_MAX_JOBS jobs are active."""
+        with self._lock:
+            active = [job for job in _list_jobs() if job["status"] in ACTIVE_STATES]
+            if len(active) >= self.max_jobs:
+                self.stats["rejected"] += 1
+                raise Overloaded("trop de batchs en cours", PENDING_RETRY_AFTER_S)
+            job = {
+                "id": uuid.uuid4().hex[:12],
+                "status": "queued",
+                "total": len(items),
+                "completed": 0,
+                "progress": 0.0,
+                "error": None,
+                "created_at": _now(),
+                "owner_pid": os.getpid(),
+            }
+            write_job(job)
+            self.stats["submitted"] += 1
+        threading.Thread(
+            target=_run, args=(dict(job), items, concurrency), name=f"batch-{job['id']}", daemon=True
+        ).start()
+        _prune_jobs()
+        return job
+
+    def metrics(self) -> dict:
+        return dict(self.stats, max_jobs=self.max_jobs)
+
+
+batch_jobs = BatchJobs()
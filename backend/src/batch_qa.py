@@ -0,0 +1,247 @@
+"""
+Batch question answering over pre-indexed guides.
+Identical items are answered once, retrieval runs in batches per guide
+(one embedding call, one FAISS search) and LLM calls go through a bounded
+thread pool with retries, each in a background admission slot so that a
+batch yields to the chat requests of the worker. Results can be streamed to
+a resumable JSONL file.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .admission import Overloaded, llm_admission
+from .config import TOP_K_RESULTS, BATCH_MAX_CONCURRENCY, BATCH_MAX_RETRIES, BATCH_SLOT_WAIT_S
+from .guide_manager import guide_manager
+from .guide_chatbot import (
+    GuideChatbot,
+    detect_language,
+    format_sources,
+    get_guide_chatbot,
+    normalize_question,
+)
+from .llm_client import CircuitOpenError
+
+SUPPORTED_LANGS = ("fr", "en", "ko")
+RETRY_BACKOFF_SECONDS = 1.0
+SLOT_POLL_SECONDS = 0.5
+
+
+def item_id(slug: str, question: str, lang: str) -> str:
+    """Stable identifier of a (guide, question, lang) item."""
+    key = f"{slug}\0{lang}\0{normalize_question(question)}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def prepare_items(raw_items: Iterable[dict]) -> Tuple[List[dict], List[dict]]:
+    """
+    Validate and dedupe raw items.
+    Returns (unique items, rejected items). Each unique item records how many
+    input rows it stands for in ``count``.
+    """
+    unique: Dict[str, dict] = {}
+    rejected: List[dict] = []
+
+    for position, raw in enumerate(raw_items):
+        slug = str(raw.get("guide") or raw.get("slug") or "").strip()
+        question = str(raw.get("question") or "").strip()
+        lang = raw.get("lang") or None
+
+        guide = guide_manager.get_guide(slug)
+        if not guide or not guide.is_indexed:
+            rejected.append({"position": position, "guide": slug, "error": "Guide introuvable"})
+            continue
+        if not question:
+            rejected.append({"position": position, "guide": slug, "error": "Question vide"})
+            continue
+        if lang not in SUPPORTED_LANGS:
+            lang = detect_language(question)
+
+        iid = item_id(slug, question, lang)
+        if iid in unique:
+            unique[iid]["count"] += 1
+            continue
+        unique[iid] = {
+            "id": iid,
+            "guide": slug,
+            "question": question,
+            "lang": lang,
+            "count": 1,
+        }
+
+    return list(unique.values()), rejected
+
+
+def load_completed_ids(output_path: Path) -> set:
+    """Ids already answered successfully in a previous run."""
+    done = set()
+    if not output_path.exists():
+        return done
+
+    with output_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partially written last line of an interrupted run
+            if record.get("status") == "ok":
+                done.add(record.get("id"))
+    return done
+
+
+def _retrieve_for_guide(chatbot: GuideChatbot, items: List[dict], k: int) -> Dict[str, list]:
+    """Batched retrieval for all items of one guide."""
+    from .vector_store import embed_queries
+
+    questions = [item["question"] for item in items]
+    vectors = None
+    if chatbot.has_vectors:
+        try:
+            vectors = embed_queries(questions)
+        except Exception as exc:
+            print(f"Batch: query embedding failed for {chatbot.guide.slug} ({exc}), lexical only")
+
+    hits = chatbot.search_batch(questions, k=k, query_vectors=vectors)
+    return {
+        item["id"]: [doc for doc, _ in item_hits]
+        for item, item_hits in zip(items, hits)
+    }
+
+
+def _generate_in_slot(chatbot: GuideChatbot, item: dict, docs: list) -> str:
+    """chatbot.generate in a background LLM slot, polled for up to BATCH_SLOT_WAIT_S."""
+    slug = chatbot.guide.slug
+    give_up_at = time.monotonic() + BATCH_SLOT_WAIT_S
+    while True:
+        with llm_admission.background_slot(slug) as acquired:
+            if acquired:
+                return chatbot.generate(item["question"], docs, item["lang"])
+        if time.monotonic() >= give_up_at:
+            raise Overloaded("aucun emplacement LLM libre", SLOT_POLL_SECONDS)
+        time.sleep(SLOT_POLL_SECONDS)
+
+
+def _generate_with_retries(
+    chatbot: GuideChatbot,
+    item: dict,
+    docs: list,
+    retries: int,
+) -> dict:
+    attempts = 0
+    last_error = ""
+    while attempts <= retries:
+        attempts += 1
+        try:
+            answer = _generate_in_slot(chatbot, item, docs)
+            return {**item, "status": "ok", "answer": answer, "attempts": attempts}
+        except CircuitOpenError as exc:
+            last_error = str(exc)
+            break  # upstream known to be failing: record the item, resume later
+        except Exception as exc:
+            last_error = str(exc)
+            if attempts <= retries:
+                time.sleep(RETRY_BACKOFF_SECONDS * (2 ** (attempts - 1)))
+
+    return {
+        **item,
+        "status": "error",
+        "error": last_error,
+        "answer": None,
+        "sources": format_sources(docs),
+        "attempts": attempts,
+    }
+
+
+def run_batch(
+    raw_items: Iterable[dict],
+    output_path: Optional[Path] = None,
+    concurrency: int = BATCH_MAX_CONCURRENCY,
+    retries: int = BATCH_MAX_RETRIES,
+    k: int = TOP_K_RESULTS,
+    on_result: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Answer a batch of (guide, question, lang) items.
+    With ``output_path`` every result is appended to a JSONL file as soon as
+    it is ready, and items already answered in that file are skipped.
+    """
+    start = time.perf_counter()
+    items, rejected = prepare_items(raw_items)
+
+    skipped = 0
+    if output_path is not None:
+        done = load_completed_ids(output_path)
+        skipped = sum(1 for item in items if item["id"] in done)
+        items = [item for item in items if item["id"] not in done]
+
+    results: List[dict] = []
+    out_file = output_path.open("a", encoding="utf-8") if output_path else None
+
+    def emit(record: dict):
+        results.append(record)
+        if out_file:
+            out_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out_file.flush()
+        if on_result:
+            on_result(record)
+
+    try:
+        by_guide: Dict[str, List[dict]] = {}
+        for item in items:
+            by_guide.setdefault(item["guide"], []).append(item)
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            futures = []
+            for slug, guide_items in by_guide.items():
+                try:
+                    chatbot = get_guide_chatbot(slug)
+                except Exception as exc:
+                    # Guide removed or unreadable since validation: the other guides still run
+                    for item in guide_items:
+                        emit({**item, "status": "error", "error": str(exc), "answer": None, "attempts": 0})
+                    continue
+
+                pending = []
+                for item in guide_items:
+                    canned = chatbot.canned_answer(item["question"], item["lang"])
+                    if canned is not None:
+                        emit({**item, "status": "ok", "answer": canned, "attempts": 0})
+                    else:
+                        pending.append(item)
+                if not pending:
+                    continue
+
+                try:
+                    docs_by_id = _retrieve_for_guide(chatbot, pending, k)
+                except Exception as exc:
+                    # No passages (retrieval service down...): no LLM call without context
+                    for item in pending:
+                        emit({**item, "status": "error", "error": str(exc), "answer": None, "attempts": 0})
+                    continue
+                for item in pending:
+                    futures.append(pool.submit(
+                        _generate_with_retries, chatbot, item, docs_by_id[item["id"]], retries
+                    ))
+
+            for future in as_completed(futures):
+                emit(future.result())
+    finally:
+        if out_file:
+            out_file.close()
+
+    return {
+        "results": results,
+        "rejected": rejected,
+        "summary": {
+            "answered": sum(1 for r in results if r["status"] == "ok"),
+            "failed": sum(1 for r in results if r["status"] != "ok"),
+            "rejected": len(rejected),
+            "skipped": skipped,
+            "took_s": round(time.perf_counter() - start, 2),
+        },
+    }
@@ -0,0 +1,146 @@
+"""
+Chunk adjacency: for every chunk id, its previous and next chunk in the same
+PDF, its section number and its approximate size in tokens, as one (4, n)
+int32 array (16 bytes per chunk) written next to the chunk store.
+A hit that stops mid-procedure can then be widened to the chunks around it
+(optionally without leaving its section) with array lookups: no embedding, no
+BM25 query, and no decompression beyond the neighbours actually returned.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from .text_chunker import starts_section
+
+ADJACENCY_FILENAME = "chunks.adjacency.npy"
+PREV, NEXT, SECTION, TOKENS = range(4)
+CHARS_PER_TOKEN = 4
+NO_CHUNK = -1
+
+
+def adjacency_from_chunks(chunks: Iterable[Document]) -> np.ndarray:
+    """
+    Adjacency of chunks in store order. Sections come from the chunker's
+    ``section`` metadata; chunks indexed before it existed start a new
+    section when their text opens with a heading.
+    """
+    sources: List[str] = []
+    sections: List[int] = []
+    tokens: List[int] = []
+    section_ids = {}
+    current = -1
+    for doc in chunks:
+        source = str(doc.metadata.get("source_file", ""))
+        section_no = doc.metadata.get("section")
+        if section_no is not None:
+            key = (source, int(section_no))
+            if key not in section_ids:
+                section_ids[key] = len(section_ids)
+            current = section_ids[key]
+        elif not sources or source != sources[-1] or starts_section(doc.page_content):
+            current = len(section_ids)
+            section_ids[(source, -len(section_ids) - 1)] = current
+        sources.append(source)
+        sections.append(current)
+        tokens.append(max(1, len(doc.page_content) // CHARS_PER_TOKEN))
+    return build_adjacency(sources, sections, tokens)
+
+
+def build_adjacency(sources: List, sections: List[int], tokens: List[int]) -> np.ndarray:
+    """Prev/next links join consecutive chunks of the same source file."""
+    n = len(sources)
+    adjacency = np.full((4, n), NO_CHUNK, dtype=np.int32)
+    if n:
+        ids = np.arange(n, dtype=np.int32)
+        same_source = np.array([sources[i] == sources[i - 1] for i in range(1, n)], dtype=bool)
+        adjacency[PREV, 1:] = np.where(same_source, ids[:-1], NO_CHUNK)
+        adjacency[NEXT, :-1] = np.where(same_source, ids[1:], NO_CHUNK)
+        adjacency[SECTION] = sections
+        adjacency[TOKENS] = tokens
+    return adjacency
+
+
+def write_adjacency(adjacency: np.ndarray, directory: Path) -> Path:
+    path = Path(directory) / ADJACENCY_FILENAME
+    tmp_path = path.with_suffix(".npy.tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, np.ascontiguousarray(adjacency, dtype="<i4"))
+    os.replace(tmp_path, path)
+    return path
+
+
+class ChunkAdjacency:
+    """Neighbour lookups over the adjacency array of one shard."""
+
+    def __init__(self, array: np.ndarray):
+        if array.ndim != 2 or array.shape[0] != 4:
+            raise ValueError(f"Unexpected adjacency shape {array.shape}")
+        self.array = array
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["ChunkAdjacency"]:
+        path = Path(directory) / ADJACENCY_FILENAME
+        if not path.exists():
+            return None
+        return cls(np.load(path, mmap_mode="r"))
+
+    @classmethod
+    def from_chunks(cls, chunks) -> "ChunkAdjacency":
+        """Built at load time for indexes written before adjacency was persisted."""
+        return cls(adjacency_from_chunks(chunks.iter_documents()))
+
+    def __len__(self) -> int:
+        return self.array.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.array.nbytes
+
+    def tokens(self, chunk_id: int) -> int:
+        return int(self.array[TOKENS, chunk_id])
+
+    def same_section(self, a: int, b: int) -> bool:
+        return bool(self.array[SECTION, a] == self.array[SECTION, b])
+
+    def _step(self, chunk_id: int, direction: int, same_section: bool) -> int:
+        """Neighbour in ``direction`` (PREV or NEXT), NO_CHUNK at the end of the PDF (or section)."""
+        neighbour = int(self.array[direction, chunk_id])
+        if neighbour == NO_CHUNK or (same_section and not self.same_section(neighbour, chunk_id)):
+            return NO_CHUNK
+        return neighbour
+
+    def expand(
+        self, chunk_id: int, hops: int, budget: int, skip=(), same_section: bool = True
+    ) -> Tuple[List[int], List[int], int]:
+        """
+        Chunks before and after ``chunk_id`` (each list nearest first) up to
+        ``hops`` away, in its section only with ``same_section``, the next
+        chunk preferred (procedures continue forward), within ``budget``
+        tokens. A direction stops at a ``skip`` id (a chunk already in the
+        context). Returns (before, after, tokens used).
+        """
+        before: List[int] = []
+        after: List[int] = []
+        used = 0
+        ends = {PREV: chunk_id, NEXT: chunk_id}
+        for _ in range(hops):
+            for direction, out in ((NEXT, after), (PREV, before)):
+                if ends[direction] == NO_CHUNK:
+                    continue
+                neighbour = self._step(ends[direction], direction, same_section)
+                if neighbour == NO_CHUNK:
+                    ends[direction] = NO_CHUNK
+                    continue
+                cost = self.tokens(neighbour)
+                if neighbour in skip or used + cost > budget:
+                    ends[direction] = NO_CHUNK
+                    continue
+                used += cost
+                out.append(neighbour)
+                ends[direction] = neighbour
+        return before, after, used
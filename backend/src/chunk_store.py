@@ -0,0 +1,254 @@
+"""
+Per-guide chunk store: chunk texts compressed one by one into a single
+mmapped blob, an offsets array and compact metadata columns.
+Retrievers work with integer chunk ids; Documents are only built for the
+final top-k results.
+The three files are replaced one by one, metadata last: it records the blob
+size and the CRC of the offsets it was written with, so a store left half
+replaced by a crash is refused on load instead of returning wrong texts.
+"""
+from __future__ import annotations
+
+import importlib.util
+import json
+import mmap
+import os
+import sys
+import zlib
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from .chunk_adjacency import adjacency_from_chunks, write_adjacency
+
+BLOB_FILENAME = "chunks.bin"
+OFFSETS_FILENAME = "chunks.offsets.npy"
+META_FILENAME = "chunks.meta.json"
+STORE_VERSION = 1
+ZSTD_LEVEL = 10
+
+
+def _zstd_available() -> bool:
+    return importlib.util.find_spec("zstandard") is not None
+
+
+def _compressor(codec: str):
+    if codec == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress
+    return lambda data: zlib.compress(data, 9)
+
+
+def _decompressor(codec: str):
+    if codec == "zstd":
+        import zstandard
+
+        # ZstdDecompressor objects are not thread-safe: one per call
+        return lambda data: zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress
+
+
+def write_chunk_store(chunks: List[Document], directory: Path) -> dict:
+    """Write chunk texts, metadata columns and the chunk adjacency; returns size statistics."""
+    directory = Path(directory)
+    codec = "zstd" if _zstd_available() else "zlib"
+    compress = _compressor(codec)
+
+    sources: List[str] = []
+    source_ids = {}
+    offsets = [0]
+    raw_bytes = 0
+
+    blob_tmp = directory / (BLOB_FILENAME + ".tmp")
+    with open(blob_tmp, "wb") as blob:
+        for doc in chunks:
+            data = doc.page_content.encode("utf-8")
+            raw_bytes += len(data)
+            packed = compress(data)
+            blob.write(packed)
+            offsets.append(offsets[-1] + len(packed))
+
+    source_column = []
+    for doc in chunks:
+        source_file = str(doc.metadata.get("source_file", "manuel.pdf"))
+        if source_file not in source_ids:
+            source_ids[source_file] = len(sources)
+            sources.append(source_file)
+        source_column.append(source_ids[source_file])
+
+    offsets_array = np.asarray(offsets, dtype=np.int64)
+    meta = {
+        "version": STORE_VERSION,
+        "codec": codec,
+        "count": len(chunks),
+        "blob_bytes": offsets[-1],
+        "offsets_crc32": zlib.crc32(offsets_array.astype("<i8").tobytes()),
+        "sources": sources,
+        "source_id": source_column,
+        "page": [str(doc.metadata.get("page", "?")) for doc in chunks],
+        "chunk_index": [int(doc.metadata.get("chunk_index", i)) for i, doc in enumerate(chunks)],
+    }
+
+    offsets_tmp = directory / (OFFSETS_FILENAME + ".tmp")
+    with open(offsets_tmp, "wb") as f:
+        np.save(f, offsets_array)
+    meta_tmp = directory / (META_FILENAME + ".tmp")
+    with open(meta_tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, separators=(",", ":"))
+
+    # Metadata last: until it is replaced, the old one refuses the new data files
+    os.replace(blob_tmp, directory / BLOB_FILENAME)
+    os.replace(offsets_tmp, directory / OFFSETS_FILENAME)
+    os.replace(meta_tmp, directory / META_FILENAME)
+    write_adjacency(adjacency_from_chunks(chunks), directory)
+
+    return {
+        "chunks": len(chunks),
+        "codec": codec,
+        "raw_bytes": raw_bytes,
+        "stored_bytes": offsets[-1],
+    }
+
+
+class ChunkStore:
+    """Read-only view over a guide's chunk store (mmapped files or a bundle section)."""
+
+    def __init__(self, meta: dict, offsets, blob, blob_file=None):
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported chunk store version {meta.get('version')}")
+        if meta.get("codec") == "zstd" and not _zstd_available():
+            raise RuntimeError("This chunk store needs the 'zstandard' package")
+        self._check(meta, offsets, blob)
+        self.codec = meta["codec"]
+        self.sources: List[str] = meta["sources"]
+        self.source_id: List[int] = meta["source_id"]
+        self.pages: List[str] = meta["page"]
+        self.chunk_index: List[int] = meta["chunk_index"]
+        self.offsets = offsets
+        self._decompress = _decompressor(self.codec)
+        self._blob = blob
+        self._blob_file = blob_file
+
+    @staticmethod
+    def _check(meta: dict, offsets, blob):
+        """Raise ValueError when the data files do not belong to this metadata."""
+        count = meta.get("count", len(meta["page"]))
+        if len(offsets) != count + 1 or len(meta["page"]) != count:
+            raise ValueError(f"Chunk store offsets ({len(offsets)}) do not match {count} chunks")
+        if "blob_bytes" in meta:  # absent from stores written before the check
+            if int(offsets[-1]) != meta["blob_bytes"] or len(blob) != meta["blob_bytes"]:
+                raise ValueError(f"Chunk store blob is {len(blob)} bytes, {meta['blob_bytes']} expected")
+            if zlib.crc32(np.asarray(offsets, dtype="<i8").tobytes()) != meta["offsets_crc32"]:
+                raise ValueError("Chunk store offsets do not match their metadata (checksum)")
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["ChunkStore"]:
+        """
+        None without a (readable) store; raises ValueError when the files are
+        inconsistent, e.g. a write interrupted between two replacements.
+        """
+        directory = Path(directory)
+        meta_path = directory / META_FILENAME
+        if not meta_path.exists() or not (directory / BLOB_FILENAME).exists():
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != STORE_VERSION:
+            return None
+        if meta.get("codec") == "zstd" and not _zstd_available():
+            print(f"Chunk store in {directory} needs the 'zstandard' package")
+            return None
+
+        offsets = np.load(directory / OFFSETS_FILENAME, mmap_mode="r")
+        blob_file = open(directory / BLOB_FILENAME, "rb")
+        size = os.fstat(blob_file.fileno()).st_size
+        blob = mmap.mmap(blob_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        try:
+            return cls(meta, offsets, blob, blob_file)
+        except ValueError as exc:
+            if isinstance(blob, mmap.mmap):
+                blob.close()
+            blob_file.close()
+            raise ValueError(f"{exc} in {directory}: re-run index_manuals for this guide") from exc
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    @property
+    def nbytes(self) -> int:
+        """Compressed blob (mmapped) + offsets + metadata columns."""
+        columns = sum(sys.getsizeof(c) for c in (self.pages, self.source_id, self.chunk_index))
+        return len(self._blob) + self.offsets.nbytes + columns
+
+    def text(self, chunk_id: int) -> str:
+        start, end = int(self.offsets[chunk_id]), int(self.offsets[chunk_id + 1])
+        return self._decompress(self._blob[start:end]).decode("utf-8")
+
+    def metadata(self, chunk_id: int) -> dict:
+        return {
+            "source_file": self.sources[self.source_id[chunk_id]],
+            "page": self.pages[chunk_id],
+            "chunk_index": self.chunk_index[chunk_id],
+            "chunk_id": chunk_id,
+        }
+
+    def document(self, chunk_id: int) -> Document:
+        return Document(page_content=self.text(chunk_id), metadata=self.metadata(chunk_id))
+
+    def documents(self, chunk_ids: Iterable[int]) -> List[Document]:
+        return [self.document(i) for i in chunk_ids]
+
+    def iter_documents(self):
+        for chunk_id in range(len(self)):
+            yield self.document(chunk_id)
+
+    def close(self):
+        """Release the files opened by load(); bundle-backed stores share the bundle mapping."""
+        if self._blob_file is None:
+            return
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self._blob_file.close()
+
+
+class InMemoryChunks:
+    """Same interface over a plain list of Documents (legacy indexes)."""
+
+    def __init__(self, documents: List[Document]):
+        self._documents = documents
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(doc.page_content) for doc in self._documents)
+
+    def text(self, chunk_id: int) -> str:
+        return self._documents[chunk_id].page_content
+
+    def metadata(self, chunk_id: int) -> dict:
+        return self._documents[chunk_id].metadata
+
+    def document(self, chunk_id: int) -> Document:
+        return self._documents[chunk_id]
+
+    def documents(self, chunk_ids: Iterable[int]) -> List[Document]:
+        return [self._documents[i] for i in chunk_ids]
+
+    def iter_documents(self):
+        return iter(self._documents)
+
+    def close(self):
+        pass
+
+
+def load_chunks(directory: Path, legacy_chunks: Optional[List[Document]] = None):
+    """Chunk store of a guide if present, else the chunks kept in the BM25 pickle."""
+    store = ChunkStore.load(directory)
+    if store is not None:
+        return store
+    return InMemoryChunks(legacy_chunks or [])
@@ -0,0 +1,185 @@
+"""
+Single-flight coalescing of identical in-flight chat requests.
+Concurrent requests with the same (slug, lang, normalised question) wait on
+the first one instead of each embedding, searching and calling Gemini.
+Within a worker the followers wait on the leader's Future; across gunicorn
+workers (COALESCE_DIR set, POSIX only) the leader holds a lock file and
+publishes its result next to it for the other workers.
+The published result file is reused for COALESCE_RESULT_TTL_S (10 s by
+default) after it was written: a worker that takes the lock within that
+time serves it, even for a request that arrived after the leader finished.
+So across workers, an answer can be up to that old. Expired files are
+ignored, then removed every SWEEP_EVERY publications.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: in-process coalescing only
+    fcntl = None
+
+from .config import COALESCE_DIR, COALESCE_ENABLED, COALESCE_RESULT_TTL_S, COALESCE_WAIT_S
+
+LOCK_POLL_S = 0.05
+SWEEP_EVERY = 200  # publications between removals of expired result files
+
+
+class SingleFlight:
+    """Run one call per key at a time and share its result with concurrent callers."""
+
+    def __init__(
+        self,
+        shared_dir: Optional[str] = COALESCE_DIR,
+        wait_s: float = COALESCE_WAIT_S,
+        result_ttl_s: float = COALESCE_RESULT_TTL_S,
+    ):
+        self.wait_s = wait_s
+        self.result_ttl_s = result_ttl_s
+        self.shared_dir = Path(shared_dir) if shared_dir and fcntl is not None else None
+        if shared_dir and fcntl is None:
+            print("Coalescing: fcntl unavailable, cross-worker coalescing disabled")
+        if self.shared_dir is not None:
+            self.shared_dir.mkdir(parents=True, exist_ok=True)
+        self._published = 0
+        self._inflight: dict = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "leaders": 0, "followers": 0, "cross_worker": 0}
+
+    def _count(self, field: str):
+        with self._lock:
+            self.stats[field] += 1
+
+    def do(self, key: tuple, fn: Callable[[], dict], shareable: Callable[[dict], bool] = None) -> Tuple[dict, bool]:
+        """
+        Return (result, shared). ``shared`` is True when the result came from
+        another in-flight call. ``shareable`` decides whether a result may be
+        published to other workers (errors are not).
+        """
+        self._count("requests")
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            try:
+                result = future.result(timeout=self.wait_s)
+            except FutureTimeout:
+                self._count("leaders")  # leader stuck: do not fail the follower
+                return fn(), False
+            self._count("followers")
+            return result, True
+
+        try:
+            result, shared = self._run_leader(key, fn, shareable)
+            future.set_result(result)
+            return result, shared
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _run_leader(self, key: tuple, fn: Callable[[], dict], shareable) -> Tuple[dict, bool]:
+        if self.shared_dir is None:
+            self._count("leaders")
+            return fn(), False
+
+        digest = hashlib.sha1(json.dumps(key, ensure_ascii=False).encode("utf-8")).hexdigest()
+        lock_path = self.shared_dir / f"{digest}.lock"
+        result_path = self.shared_dir / f"{digest}.json"
+
+        with open(lock_path, "a+") as lock_file:
+            if not self._acquire(lock_file):
+                # Another worker held the lock for too long: answer on our own
+                self._count("leaders")
+                return fn(), False
+            try:
+                published = self._read_result(result_path)
+                if published is not None:
+                    self._count("cross_worker")
+                    return published, True
+
+                self._count("leaders")
+                result = fn()
+                if shareable is None or shareable(result):
+                    self._publish(result_path, result)
+                return result, False
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _acquire(self, lock_file) -> bool:
+        deadline = time.monotonic() + self.wait_s
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(LOCK_POLL_S)
+
+    def _read_result(self, path: Path) -> Optional[dict]:
+        try:
+            if time.time() - path.stat().st_mtime > self.result_ttl_s:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _publish(self, path: Path, result: dict):
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            print(f"Coalescing: cannot publish result ({exc})")
+            return
+
+        with self._lock:
+            self._published += 1
+            sweep = self._published % SWEEP_EVERY == 0
+        if sweep:
+            self._sweep()
+
+    def _sweep(self):
+        """Remove expired result files (lock files are empty and kept)."""
+        cutoff = time.time() - self.result_ttl_s
+        for path in self.shared_dir.glob("*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats, in_flight=len(self._inflight))
+        shared = stats["followers"] + stats["cross_worker"]
+        stats["coalescing_ratio"] = round(shared / stats["requests"], 3) if stats["requests"] else 0.0
+        stats["cross_worker_enabled"] = self.shared_dir is not None
+        return stats
+
+
+chat_flights = SingleFlight()
+
+
+def coalesced(key: tuple, fn: Callable[[], dict], shareable: Callable[[dict], bool] = None) -> Tuple[dict, bool]:
+    """Run ``fn`` through the chat single-flight group unless coalescing is disabled."""
+    if not COALESCE_ENABLED:
+        return fn(), False
+    return chat_flights.do(key, fn, shareable)
@@ -8,24 +8,42 @@ from dotenv import load_dotenv
 # Charger les variables d'environnement
 load_dotenv()
 
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Option booleenne: 1/true/yes/on ou 0/false/no/off, valeur par defaut si absente."""
+    value = os.getenv(name, "").strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    return default
+
+
 # Chemins du projet
 PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
 PDF_DIR = DATA_DIR / "pdfs"
 VECTOR_STORE_DIR = PROJECT_ROOT / "vector_store"
 
-# Creer les repertoires s'ils n'existent pas
-PDF_DIR.mkdir(parents=True, exist_ok=True)
-VECTOR_STORE_DIR.mkdir(parents=True, exist_ok=True)
+
+def ensure_data_dirs():
+    """Creer les repertoires s'ils n'existent pas (appele a la premiere ecriture)."""
+    PDF_DIR.mkdir(parents=True, exist_ok=True)
+    VECTOR_STORE_DIR.mkdir(parents=True, exist_ok=True)
+
 
 # Configuration API Google
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-if not GOOGLE_API_KEY:
-    raise ValueError(
-        "GOOGLE_API_KEY non configuree. "
-        "Creez un fichier .env avec votre cle API Google."
-    )
+
+def require_google_api_key() -> str:
+    """Return the API key, failing only when a Gemini client is actually needed."""
+    if not GOOGLE_API_KEY:
+        raise ValueError(
+            "GOOGLE_API_KEY non configuree. "
+            "Creez un fichier .env avec votre cle API Google."
+        )
+    return GOOGLE_API_KEY
 
 # Configuration du modÃ¨le
 def _normalize_model_name(raw_value, default_value, aliases=None):
@@ -52,10 +70,184 @@ LLM_MODEL = _normalize_model_name(
     default_value="models/gemini-2.5-flash",
 )
 
+# Reduction des embeddings stockes dans FAISS: "none", "truncate" (Matryoshka)
+# ou "pca"; EMBEDDING_DIM = dimension gardee (0 = pleine dimension).
+# Surcharge par guide: options "embedding_reduction" / "embedding_dim" du manifest
+EMBEDDING_REDUCTION = os.getenv("EMBEDDING_REDUCTION", "none").strip().lower()
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "0"))
+
+# Extraction du texte des PDF: "auto" (pdfium > pypdf > pdfminer selon les
+# paquets installes), "pdfium", "pypdf" ou "pdfminer"
+PDF_EXTRACTOR = os.getenv("PDF_EXTRACTOR", "auto").strip().lower()
+
 # Configuration du chunking
 CHUNK_SIZE = 2000
 CHUNK_OVERLAP = 300
 
+# Elimination des passages quasi identiques a l'indexation (MinHash + LSH):
+# seuil de similarite de Jaccard sur les 5-grammes de mots. Desactivee par defaut:
+# change le contenu indexe, a verifier d'abord avec index_manuals --dedup-report
+DEDUP_ENABLED = _env_bool("DEDUP_ENABLED", False)
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+
 # Configuration du RAG
 TOP_K_RESULTS = 5
+# Contexte elargi aux passages voisins des resultats: budget en tokens (0 = desactive,
+# par defaut: change le contexte envoye au LLM), voisins de chaque cote,
+# "document" (suite du PDF) ou "section" (sans quitter la section)
+CONTEXT_EXPAND_TOKENS = int(os.getenv("CONTEXT_EXPAND_TOKENS", "0"))
+CONTEXT_EXPAND_HOPS = int(os.getenv("CONTEXT_EXPAND_HOPS", "1"))
+CONTEXT_EXPAND_SCOPE = os.getenv("CONTEXT_EXPAND_SCOPE", "document").strip().lower()
+
+# Configuration de la recherche multi-guides
+SEARCH_MAX_WORKERS = int(os.getenv("SEARCH_MAX_WORKERS", "4"))
+# Guides interroges au plus par POST /api/search (chacun charge ses index)
+SEARCH_MAX_GUIDES = int(os.getenv("SEARCH_MAX_GUIDES", "10"))
+SEARCH_SNIPPET_CHARS = 400
+
+# Configuration de l'expansion des requetes (questions EN/KO sur manuels FR): off | dict | llm
+QUERY_EXPANSION = os.getenv("QUERY_EXPANSION", "off").lower()
+
+# Configuration du profilage echantillonne des requetes (/api/debug/profiles)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+
+# Configuration du suivi memoire (/api/debug/memory, python -m benchmark_memory)
+MEMORY_TRACE_LOADS = _env_bool("MEMORY_TRACE_LOADS", False)
+MEMORY_SAMPLE_S = float(os.getenv("MEMORY_SAMPLE_S", "30"))
+MEMORY_HISTORY_SIZE = int(os.getenv("MEMORY_HISTORY_SIZE", "240"))
+
+# Configuration de l'historique des conversations (partage entre workers)
+# "sqlite" (data/conversations.db, mode WAL) ou "redis" (REDIS_URL, paquet redis requis)
+CONVERSATION_STORE = os.getenv("CONVERSATION_STORE", "sqlite").strip().lower()
+CONVERSATION_DB = Path(os.getenv("CONVERSATION_DB", DATA_DIR / "conversations.db"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+CONVERSATION_MAX_MESSAGES = int(os.getenv("CONVERSATION_MAX_MESSAGES", "200"))
+CONVERSATION_TTL_DAYS = float(os.getenv("CONVERSATION_TTL_DAYS", "30"))
+CONVERSATION_FLUSH_MS = float(os.getenv("CONVERSATION_FLUSH_MS", "200"))
+CONVERSATION_BATCH_SIZE = int(os.getenv("CONVERSATION_BATCH_SIZE", "100"))
+CONVERSATION_QUEUE_SIZE = int(os.getenv("CONVERSATION_QUEUE_SIZE", "10000"))
+CONVERSATION_COMPACT_S = float(os.getenv("CONVERSATION_COMPACT_S", "3600"))
+
+# Journal des questions (JSONL, ecriture en arriere-plan, rotation par taille)
+QUERY_LOG_ENABLED = _env_bool("QUERY_LOG_ENABLED", True)
+QUERY_LOG_DIR = Path(os.getenv("QUERY_LOG_DIR", DATA_DIR / "query_logs"))
+QUERY_LOG_QUEUE_SIZE = int(os.getenv("QUERY_LOG_QUEUE_SIZE", "10000"))
+QUERY_LOG_MAX_MB = float(os.getenv("QUERY_LOG_MAX_MB", "20"))
+QUERY_LOG_KEEP = int(os.getenv("QUERY_LOG_KEEP", "20"))
+
+# Reponses precalculees des questions frequentes (python -m warm_answers),
+# chargees dans le cache de reponses au chargement d'un guide
+WARM_ANSWERS_ENABLED = _env_bool("WARM_ANSWERS_ENABLED", True)
+WARM_ANSWERS_DIR = Path(os.getenv("WARM_ANSWERS_DIR", DATA_DIR / "warm_answers"))
+WARM_TOP_N = int(os.getenv("WARM_TOP_N", "50"))
+WARM_MIN_COUNT = int(os.getenv("WARM_MIN_COUNT", "3"))
+WARM_WORKERS = int(os.getenv("WARM_WORKERS", "2"))
+
+# Configuration des guides multi-documents (un index par PDF, interroges en parallele)
+SHARD_SEARCH_WORKERS = int(os.getenv("SHARD_SEARCH_WORKERS", "4"))
+
+# Service de recherche partage (optionnel, python -m retrieval_server): un seul
+# processus charge les index et sert la recherche de tous les workers par un
+# socket UNIX. Vide = chaque worker charge ses propres index
+RETRIEVAL_SOCKET = os.getenv("RETRIEVAL_SOCKET", "").strip()
+RETRIEVAL_POOL_SIZE = int(os.getenv("RETRIEVAL_POOL_SIZE", "4"))
+RETRIEVAL_TIMEOUT_S = float(os.getenv("RETRIEVAL_TIMEOUT_S", "5"))
+RETRIEVAL_BATCH_WINDOW_MS = float(os.getenv("RETRIEVAL_BATCH_WINDOW_MS", "3"))
+RETRIEVAL_BATCH_MAX = int(os.getenv("RETRIEVAL_BATCH_MAX", "32"))
+
+# Configuration du mode batch
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+BATCH_MAX_RETRIES = int(os.getenv("BATCH_MAX_RETRIES", "3"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+# Attente max d'un emplacement LLM libre par element (les requetes de chat passent avant)
+BATCH_SLOT_WAIT_S = float(os.getenv("BATCH_SLOT_WAIT_S", "60"))
+# Au-dela de BATCH_SYNC_MAX_ITEMS elements, POST /api/batch lance un job (202 + id)
+# pour ne pas depasser le timeout gunicorn; jobs batch simultanes au total
+BATCH_SYNC_MAX_ITEMS = int(os.getenv("BATCH_SYNC_MAX_ITEMS", "5"))
+BATCH_MAX_JOBS = int(os.getenv("BATCH_MAX_JOBS", "2"))
+BATCH_JOBS_DIR = Path(os.getenv("BATCH_JOBS_DIR", DATA_DIR / "batch_jobs"))
+
+# Configuration du mode extractif (reponse sans LLM)
+# "llm" = toujours le LLM, "auto" = extractif si confiance suffisante,
+# "extractive" = extractif des qu'une phrase correspond
+EXTRACTIVE_MODE = os.getenv("EXTRACTIVE_MODE", "auto")
+EXTRACTIVE_MIN_CONFIDENCE = float(os.getenv("EXTRACTIVE_MIN_CONFIDENCE", "0.8"))
+EXTRACTIVE_REFINE = _env_bool("EXTRACTIVE_REFINE", True)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "256"))
+
+# Recherche directe dans les tables de caracteristiques (specs.json), desactivee
+# par defaut: a activer une fois les tables extraites des PDF verifiees
+SPEC_LOOKUP_ENABLED = _env_bool("SPEC_LOOKUP_ENABLED", False)
+
+# Demarrage: "off", "modules" (import en arriere-plan), "all", "popular"
+# (guides les plus demandes, voir GUIDE_PREFETCH) ou liste de slugs
+WARMUP = os.getenv("WARMUP", "modules").strip()
+
+# Client Gemini partage: timeouts, requetes dupliquees (hedging), circuit breaker
+# LLM_BASE_URL permet de pointer vers un autre endpoint (ex: faux serveur local)
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "30"))
+EMBEDDING_TIMEOUT_S = float(os.getenv("EMBEDDING_TIMEOUT_S", "10"))
+LLM_HEDGE_ENABLED = _env_bool("LLM_HEDGE_ENABLED", False)
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_DELAY_S = float(os.getenv("LLM_HEDGE_MIN_DELAY_S", "0.5"))
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+BREAKER_WINDOW_S = float(os.getenv("BREAKER_WINDOW_S", "60"))
+BREAKER_COOLDOWN_S = float(os.getenv("BREAKER_COOLDOWN_S", "30"))
+
+# Regroupement des requetes identiques en cours (single-flight)
+# COALESCE_DIR: repertoire partage entre workers (verrous + resultats), vide = par worker.
+# Un resultat publie y est reutilise par les autres workers pendant COALESCE_RESULT_TTL_S
+# secondes apres sa fin (reponse jusqu'a 10 s plus ancienne que la requete)
+COALESCE_ENABLED = _env_bool("COALESCE_ENABLED", True)
+COALESCE_DIR = os.getenv("COALESCE_DIR", "").strip() or None
+COALESCE_WAIT_S = float(os.getenv("COALESCE_WAIT_S", "60"))
+COALESCE_RESULT_TTL_S = float(os.getenv("COALESCE_RESULT_TTL_S", "10"))
+
+# Controle d'admission du chat (par worker): appels LLM simultanes, file d'attente
+# bornee, rejet 429 si l'attente estimee depasse ADMISSION_QUEUE_SLO_S
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "4"))
+ADMISSION_MAX_PER_GUIDE = int(os.getenv("ADMISSION_MAX_PER_GUIDE", "2"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "16"))
+ADMISSION_QUEUE_SLO_S = float(os.getenv("ADMISSION_QUEUE_SLO_S", "10"))
+
+# Limitation de debit par client (jetons/minute, 0 = desactive par defaut).
+# Compteurs propres a chaque worker gunicorn (pas de limite globale: avec N workers,
+# un client obtient jusqu'a N fois ce debit). Derriere un proxy, regler
+# TRUSTED_PROXY_HOPS, sinon tous les clients partagent l'adresse du proxy
+RATE_LIMIT_PER_MIN = float(os.getenv("RATE_LIMIT_PER_MIN", "0"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "5"))
+
+# Budget de temps par requete de chat (propage a la recherche, au contexte et au LLM)
+REQUEST_BUDGET_S = float(os.getenv("REQUEST_BUDGET_S", "25"))
+SEMANTIC_BUDGET_S = float(os.getenv("SEMANTIC_BUDGET_S", "3"))
+MIN_LLM_BUDGET_S = float(os.getenv("MIN_LLM_BUDGET_S", "2"))
+CONTEXT_TRIM_BELOW_S = float(os.getenv("CONTEXT_TRIM_BELOW_S", "8"))
+
+# Guides charges en memoire: budget (Mo), eviction "lru" ou "lfu",
+# nombre de guides populaires precharges (WARMUP=popular)
+GUIDE_MEMORY_BUDGET_MB = float(os.getenv("GUIDE_MEMORY_BUDGET_MB", "512"))
+GUIDE_EVICTION = os.getenv("GUIDE_EVICTION", "lru").strip().lower()
+GUIDE_PREFETCH = int(os.getenv("GUIDE_PREFETCH", "2"))
+# Verifie le CRC de chaque section d'un guide.bundle a son chargement
+# (0: seulement l'en-tete et la table des sections)
+BUNDLE_VERIFY_ON_LOAD = _env_bool("BUNDLE_VERIFY_ON_LOAD", True)
+
+# Indexation en arriere-plan (POST /api/guides): processus d'indexation simultanes
+# par worker, jobs en attente ou en cours acceptes au total, taille max d'un PDF.
+# UPLOADS_ENABLED=1 ouvre l'upload (desactive par defaut); les routes admin
+# (upload, suivi des jobs, debug) exigent l'en-tete X-Admin-Token et sont refusees sans ADMIN_TOKEN
+INDEXING_MAX_WORKERS = int(os.getenv("INDEXING_MAX_WORKERS", "1"))
+INDEXING_MAX_PENDING = int(os.getenv("INDEXING_MAX_PENDING", "4"))
+UPLOAD_MAX_MB = float(os.getenv("UPLOAD_MAX_MB", "100"))
+JOBS_DIR = Path(os.getenv("JOBS_DIR", DATA_DIR / "jobs"))
+JOBS_KEEP = int(os.getenv("JOBS_KEEP", "100"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+UPLOADS_ENABLED = _env_bool("UPLOADS_ENABLED", False)
 
+# Proxys de confiance devant l'API (Render, image Docker: 1): X-Forwarded-For n'est lu que
+# sur ce nombre de sauts, pour l'adresse client du rate limit
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
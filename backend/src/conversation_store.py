@@ -0,0 +1,405 @@
+"""
+Conversation history shared by every gunicorn worker and kept across restarts.
+Messages are keyed by (guide slug, session id). A chat request only queues its
+messages (write-behind): one writer thread per worker flushes them in batches,
+one transaction per CONVERSATION_FLUSH_MS, so persistence never adds latency
+to an answer. A history read first flushes the worker's own queue
+(read-your-writes); another worker's messages show up after its next flush.
+- "sqlite" (default): data/conversations.db in WAL mode, readers never block
+  the writers of the other workers.
+- "redis": one sorted set per session (optional ``redis`` package, REDIS_URL).
+A batch that fails to write is retried once before its messages are dropped.
+Retention: the last CONVERSATION_MAX_MESSAGES per session; sessions idle for
+CONVERSATION_TTL_DAYS are dropped by compact(), run every CONVERSATION_COMPACT_S.
+The store is created on first use (get_conversations()), not at import.
+"""
+from __future__ import annotations
+
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .config import (
+    CONVERSATION_BATCH_SIZE,
+    CONVERSATION_COMPACT_S,
+    CONVERSATION_DB,
+    CONVERSATION_FLUSH_MS,
+    CONVERSATION_MAX_MESSAGES,
+    CONVERSATION_QUEUE_SIZE,
+    CONVERSATION_STORE,
+    CONVERSATION_TTL_DAYS,
+    REDIS_URL,
+)
+
+DEFAULT_SESSION = "default"  # callers outside the API (CLI, batch)
+MAX_PAGE_SIZE = 200
+SESSION_ID_MAX_LEN = 64
+FLUSH_RETRY_S = 0.2
+
+# (slug, session, role, content, created_at)
+Message = Tuple[str, str, str, str, float]
+
+
+def session_id(value: Optional[str]) -> Optional[str]:
+    """Session id sent back by a client, None when missing or malformed."""
+    value = (value or "").strip()
+    if not value or len(value) > SESSION_ID_MAX_LEN or not all(c.isalnum() or c in "-_." for c in value):
+        return None
+    return value
+
+
+def new_session_id() -> str:
+    """Unguessable id for a new session, issued by the API."""
+    return secrets.token_urlsafe(24)
+
+
+class ConversationStore:
+    """Write-behind queue + flusher thread; subclasses implement the storage calls."""
+
+    backend = "none"
+
+    def __init__(
+        self,
+        max_messages: int = CONVERSATION_MAX_MESSAGES,
+        ttl_days: float = CONVERSATION_TTL_DAYS,
+        flush_ms: float = CONVERSATION_FLUSH_MS,
+        batch_size: int = CONVERSATION_BATCH_SIZE,
+        queue_size: int = CONVERSATION_QUEUE_SIZE,
+        compact_s: float = CONVERSATION_COMPACT_S,
+    ):
+        self.max_messages = max(2, max_messages)
+        self.ttl_s = ttl_days * 86400
+        self.flush_s = max(0.01, flush_ms / 1000.0)
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(self.batch_size, queue_size)
+        self.compact_s = compact_s
+        self._queue: "deque[Message]" = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # one batch written at a time per worker
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._last_compact = time.time()
+        self.stats = {
+            "queued": 0, "written": 0, "batches": 0, "inline_flushes": 0, "retried": 0, "failed": 0, "compacted": 0,
+        }
+
+    # -- request path -------------------------------------------------------
+
+    def append(self, slug: str, session: str, messages: Iterable[Tuple[str, str]]):
+        """Queue (role, content) messages; returns at once unless the queue is full."""
+        now = time.time()
+        rows = [(slug, session, role, content, now) for role, content in messages]
+        self._ensure_writer()
+        with self._cond:
+            self._queue.extend(rows)
+            self.stats["queued"] += len(rows)
+            full = len(self._queue) >= self.queue_size
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+        if full:  # writer behind: this request pays for one flush instead of growing the queue
+            self.stats["inline_flushes"] += 1
+            self.flush()
+
+    def history(self, slug: str, session: str, limit: int = 50, before: Optional[int] = None) -> dict:
+        """
+        One page of a session, oldest first: the ``limit`` messages preceding
+        message id ``before`` (the latest ones without it). ``next_before`` is
+        the cursor of the previous page, None on the first message.
+        """
+        self.flush()
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        messages = self._read(slug, session, limit + 1, before)
+        more = len(messages) > limit
+        messages = messages[-limit:]
+        return {
+            "messages": messages,
+            "next_before": messages[0]["id"] if more and messages else None,
+        }
+
+    def clear(self, slug: str, session: Optional[str] = None):
+        """Delete one session, or every session of the guide."""
+        self.flush()
+        self._delete(slug, session)
+
+    # -- write-behind -------------------------------------------------------
+
+    def _ensure_writer(self):
+        # Started lazily, and again in a forked worker (threads do not survive fork)
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="conversation-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if len(self._queue) < self.batch_size:
+                    self._cond.wait(self.flush_s)
+            self.flush()
+            if self.compact_s > 0 and time.time() - self._last_compact >= self.compact_s:
+                self.compact()
+
+    def flush(self) -> int:
+        """Write everything queued so far, one batch per transaction; returns the messages written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._cond:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                if not batch:
+                    return written
+                try:
+                    self._write(batch)
+                except Exception as exc:
+                    # Busy database, dropped Redis connection...: once more before giving up
+                    print(f"ConversationStore: batch of {len(batch)} not written ({exc}), retrying")
+                    self.stats["retried"] += 1
+                    time.sleep(FLUSH_RETRY_S)
+                    try:
+                        self._write(batch)
+                    except Exception as exc:
+                        self.stats["failed"] += len(batch)
+                        print(f"ConversationStore: {len(batch)} message(s) lost ({exc})")
+                        continue
+                written += len(batch)
+                self.stats["written"] += len(batch)
+                self.stats["batches"] += 1
+
+    def compact(self) -> int:
+        """Drop the sessions idle for more than CONVERSATION_TTL_DAYS; returns how many."""
+        self._last_compact = time.time()
+        if self.ttl_s <= 0:
+            return 0
+        try:
+            removed = self._compact(time.time() - self.ttl_s)
+        except Exception as exc:
+            print(f"ConversationStore: compaction failed ({exc})")
+            return 0
+        self.stats["compacted"] += removed
+        if removed:
+            print(f"ConversationStore: {removed} idle session(s) removed")
+        return removed
+
+    def metrics(self) -> dict:
+        with self._cond:
+            pending = len(self._queue)
+        return dict(self.stats, backend=self.backend, pending=pending)
+
+    # -- storage ------------------------------------------------------------
+
+    def _write(self, batch: List[Message]):
+        raise NotImplementedError
+
+    def _read(self, slug: str, session: str, limit: int, before: Optional[int]) -> List[dict]:
+        raise NotImplementedError
+
+    def _delete(self, slug: str, session: Optional[str]):
+        raise NotImplementedError
+
+    def _compact(self, idle_before: float) -> int:
+        raise NotImplementedError
+
+
+def _touched(batch: List[Message]) -> Dict[Tuple[str, str], float]:
+    sessions: Dict[Tuple[str, str], float] = {}
+    for slug, session, _, _, created_at in batch:
+        sessions[(slug, session)] = created_at
+    return sessions
+
+
+class SqliteConversationStore(ConversationStore):
+    """SQLite in WAL mode: one file shared by the workers of a machine."""
+
+    backend = "sqlite"
+
+    def __init__(self, path: Path = CONVERSATION_DB, **kwargs):
+        super().__init__(**kwargs)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    slug TEXT NOT NULL,
+                    session TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS messages_by_session ON messages (slug, session, id);
+                CREATE TABLE IF NOT EXISTS sessions (
+                    slug TEXT NOT NULL,
+                    session TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (slug, session)
+                );
+                CREATE INDEX IF NOT EXISTS sessions_by_age ON sessions (updated_at);
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread (and per process: never reused across fork)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(str(self.path), timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # WAL: durable up to the last checkpoint-safe commit
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _write(self, batch: List[Message]):
+        conn = self._connect()
+        sessions = _touched(batch)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO messages (slug, session, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                batch,
+            )
+            conn.executemany(
+                "INSERT INTO sessions (slug, session, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (slug, session) DO UPDATE SET updated_at = excluded.updated_at",
+                [(slug, session, at) for (slug, session), at in sessions.items()],
+            )
+            # Retention: keep the newest max_messages of each session written to
+            conn.executemany(
+                "DELETE FROM messages WHERE slug = ? AND session = ? AND id <= "
+                "(SELECT id FROM messages WHERE slug = ? AND session = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                [(slug, session, slug, session, self.max_messages) for slug, session in sessions],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _read(self, slug: str, session: str, limit: int, before: Optional[int]) -> List[dict]:
+        rows = self._connect().execute(
+            "SELECT id, role, content, created_at FROM messages "
+            "WHERE slug = ? AND session = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (slug, session, before if before is not None else 2 ** 63 - 1, limit),
+        ).fetchall()
+        return [
+            {"id": row[0], "role": row[1], "content": row[2], "created_at": row[3]}
+            for row in reversed(rows)
+        ]
+
+    def _delete(self, slug: str, session: Optional[str]):
+        conn = self._connect()
+        where, params = ("slug = ?", (slug,)) if session is None else ("slug = ? AND session = ?", (slug, session))
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(f"DELETE FROM messages WHERE {where}", params)
+        conn.execute(f"DELETE FROM sessions WHERE {where}", params)
+        conn.execute("COMMIT")
+
+    def _compact(self, idle_before: float) -> int:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            idle = conn.execute("SELECT slug, session FROM sessions WHERE updated_at < ?", (idle_before,)).fetchall()
+            conn.executemany("DELETE FROM messages WHERE slug = ? AND session = ?", idle)
+            conn.execute("DELETE FROM sessions WHERE updated_at < ?", (idle_before,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if idle:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")  # hand the freed pages back to the main file
+        return len(idle)
+
+
+class RedisConversationStore(ConversationStore):
+    """
+    Redis (or any server speaking its protocol): a sorted set per session,
+    scored by a per-session sequence number, so pages are ZREVRANGEBYSCORE
+    calls and retention is ZREMRANGEBYRANK. Idle sessions expire by TTL.
+    """
+
+    backend = "redis"
+    PREFIX = "auris:conv"
+
+    def __init__(self, url: str = REDIS_URL, **kwargs):
+        import redis  # optional dependency, only with CONVERSATION_STORE=redis
+
+        super().__init__(**kwargs)
+        self.client = redis.Redis.from_url(url)
+        self.client.ping()
+
+    def _key(self, slug: str, session: str) -> str:
+        return f"{self.PREFIX}:{slug}:{session}"
+
+    def _write(self, batch: List[Message]):
+        by_session: Dict[Tuple[str, str], List[Message]] = {}
+        for message in batch:
+            by_session.setdefault((message[0], message[1]), []).append(message)
+        # Reserve one id range per session, then everything in one round-trip
+        seq_pipe = self.client.pipeline(transaction=False)
+        for (slug, session), messages in by_session.items():
+            seq_pipe.incrby(self._key(slug, session) + ":seq", len(messages))
+        last_ids = seq_pipe.execute()
+
+        pipe = self.client.pipeline(transaction=False)
+        ttl = int(self.ttl_s) if self.ttl_s > 0 else None
+        for ((slug, session), messages), last_id in zip(by_session.items(), last_ids):
+            key = self._key(slug, session)
+            first_id = last_id - len(messages) + 1
+            pipe.zadd(key, {
+                json.dumps({"id": first_id + i, "role": m[2], "content": m[3], "created_at": m[4]}): first_id + i
+                for i, m in enumerate(messages)
+            })
+            pipe.zremrangebyrank(key, 0, -self.max_messages - 1)
+            if ttl:
+                pipe.expire(key, ttl)
+                pipe.expire(key + ":seq", ttl)
+        pipe.execute()
+
+    def _read(self, slug: str, session: str, limit: int, before: Optional[int]) -> List[dict]:
+        high = f"({before}" if before is not None else "+inf"
+        members = self.client.zrevrangebyscore(self._key(slug, session), high, "-inf", start=0, num=limit)
+        return [json.loads(member) for member in reversed(members)]
+
+    def _delete(self, slug: str, session: Optional[str]):
+        if session is not None:
+            key = self._key(slug, session)
+            self.client.delete(key, key + ":seq")
+            return
+        keys = list(self.client.scan_iter(match=f"{self.PREFIX}:{slug}:*", count=500))
+        if keys:
+            self.client.delete(*keys)
+
+    def _compact(self, idle_before: float) -> int:
+        return 0  # keys expire on their own after CONVERSATION_TTL_DAYS
+
+
+def create_store(backend: str = CONVERSATION_STORE) -> ConversationStore:
+    if backend == "redis":
+        try:
+            return RedisConversationStore()
+        except Exception as exc:
+            print(f"ConversationStore: Redis unavailable ({exc}), falling back to SQLite")
+    return SqliteConversationStore()
+
+
+_store: Optional[ConversationStore] = None
+_store_lock = threading.Lock()
+
+
+def get_conversations() -> ConversationStore:
+    """The process-wide store, created on first use (no database file at import)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_store()
+    return _store
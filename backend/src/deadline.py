@@ -0,0 +1,46 @@
+"""
+Per-request time budget. A Deadline is created when a chat request starts
+and passed down to retrieval, context building and the LLM call; each stage
+takes what is left and records why it degraded instead of overrunning.
+"""
+from __future__ import annotations
+
+import time
+from typing import List, Optional
+
+from .config import REQUEST_BUDGET_S
+
+
+class Deadline:
+    """Absolute expiry time plus the degradation reasons collected on the way."""
+
+    def __init__(self, budget_s: Optional[float] = REQUEST_BUDGET_S):
+        self.budget_s = budget_s
+        self.started_at = time.monotonic()
+        self.expires_at = None if budget_s is None else self.started_at + budget_s
+        self.reasons: List[str] = []
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), None for an unbounded deadline."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def cap(self, seconds: Optional[float], reserve_s: float = 0.0) -> Optional[float]:
+        """``seconds`` limited to what is left once ``reserve_s`` is kept for later stages."""
+        remaining = self.remaining()
+        if remaining is None:
+            return seconds
+        available = max(0.0, remaining - reserve_s)
+        return available if seconds is None else min(seconds, available)
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def degrade(self, reason: str):
+        if reason not in self.reasons:
+            self.reasons.append(reason)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
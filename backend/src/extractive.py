@@ -0,0 +1,187 @@
+"""
+Extractive answering: pick the manual sentences that answer the question
+directly, so crisp factual questions can skip the LLM call.
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from .config import EXTRACTIVE_MODE, EXTRACTIVE_MIN_CONFIDENCE, EXTRACTIVE_REFINE
+
+MIN_SENTENCE_CHARS = 20
+MAX_SENTENCE_CHARS = 320
+MAX_ANSWER_SENTENCES = 2
+
+_STOPWORDS = {
+    "quel", "quelle", "quels", "quelles", "est", "sont", "la", "le", "les",
+    "des", "du", "de", "un", "une", "comment", "que", "qui", "quoi", "pour",
+    "mon", "ma", "mes", "au", "aux", "en", "et", "ou", "il", "elle", "on",
+    "faut", "faire", "peut", "peux", "je", "dans", "sur", "avec", "ce", "cette",
+    "the", "what", "is", "are", "how", "of", "to", "my", "do", "does", "can",
+    "in", "on", "for", "which", "where", "when", "why", "and", "or", "it",
+}
+
+# Question words that call for a measured value, with the units that answer them
+_QUANTITY_UNITS = {
+    r"pression|pressure|gonflage|inflation": r"bars?|kpa|psi",
+    r"capacite|capacity|contenance|volume|reservoir|tank": r"l|litres?|liters?|kwh|cm3",
+    r"couple|torque|serrage": r"nm|kgm",
+    r"poids|weight|masse|charge": r"kg|t",
+    r"taille|size|dimension|longueur|length": r"mm|cm|m|pouces?|inch(?:es)?",
+    r"tension|voltage|ampoule|bulb|fusible|fuse": r"v|w|a|ah",
+    r"combien|how much|how many": r"",
+}
+# Whole words (plural allowed): "charge" must not match "chargement" or "charger"
+_QUANTITY_PATTERNS = [
+    (re.compile(rf"\b(?:{words})s?\b"), units) for words, units in _QUANTITY_UNITS.items()
+]
+_ANY_UNIT = r"l|litres?|liters?|bars?|kpa|psi|°c|mm|cm|nm|km/h|kg|kw|kwh|ah|%"
+
+
+def _measure_pattern(question: str) -> Optional[re.Pattern]:
+    """Regex for the kind of measured value the question asks for, if any."""
+    folded = fold(question)
+    for pattern, units in _QUANTITY_PATTERNS:
+        if pattern.search(folded):
+            return re.compile(
+                rf"\d+(?:[.,]\d+)?\s*(?:{units or _ANY_UNIT})(?!\w)", re.IGNORECASE
+            )
+    return None
+
+
+_DOT_LEADERS = re.compile(r"(?:\.\s?){4,}")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?;:])\s+(?=[A-ZÀ-Ý0-9•\-])|\s*[•▶]\s*")
+
+ANSWER_TEMPLATES = {
+    "fr": "D'apres le manuel :\n{answer}",
+    "en": "From the manual (original text):\n{answer}",
+    "ko": "매뉴얼 원문 내용:\n{answer}",
+}
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents so 'réservoir' matches 'reservoir'."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def stem(term: str) -> str:
+    """Very light stemming: drop plural marks and keep a fixed prefix."""
+    if len(term) > 3 and term[-1] in "sx":
+        term = term[:-1]
+    return term[:7]
+
+
+def query_terms(text: str) -> List[str]:
+    terms = []
+    for token in re.findall(r"[a-z0-9]{2,}", fold(text)):
+        if token in _STOPWORDS:
+            continue
+        term = stem(token)
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+
+def split_sentences(text: str) -> List[str]:
+    """Rebuild sentences from PDF text where lines are hard-wrapped."""
+    flat = re.sub(r"(\w)-\s*\n\s*(\w)", r"\1\2", text)  # "carbu-\nrant"
+    flat = re.sub(r"[ \t]*\n[ \t]*", " ", flat)
+    flat = re.sub(r"\s{2,}", " ", flat)
+    sentences = []
+    for raw in _SENTENCE_SPLIT.split(flat):
+        sentence = raw.strip(" -")
+        if not (MIN_SENTENCE_CHARS <= len(sentence) <= MAX_SENTENCE_CHARS):
+            continue
+        if _DOT_LEADERS.search(sentence):
+            continue  # table-of-contents style line
+        sentences.append(sentence)
+    return sentences
+
+
+def guide_settings(guide) -> dict:
+    """Extractive settings for a guide: manifest 'extractive' entry over env defaults."""
+    overrides = (getattr(guide, "options", None) or {}).get("extractive") or {}
+    return {
+        "mode": overrides.get("mode", EXTRACTIVE_MODE),
+        "min_confidence": float(overrides.get("min_confidence", EXTRACTIVE_MIN_CONFIDENCE)),
+        "langs": overrides.get("langs", ["fr"]),
+        "refine": bool(overrides.get("refine", EXTRACTIVE_REFINE)),
+    }
+
+
+def is_factual_question(question: str) -> bool:
+    """Questions that usually have a crisp answer (values, capacities...)."""
+    return _measure_pattern(question) is not None
+
+
+def build_term_weights(idf: Dict[str, float]) -> Dict[str, float]:
+    """Fold a BM25 idf table onto the stemmed terms used for scoring."""
+    weights: Dict[str, float] = {}
+    for token, value in idf.items():
+        term = stem(fold(token))
+        weights[term] = max(weights.get(term, 0.0), float(value))
+    return weights
+
+
+def extract_answer(
+    question: str,
+    documents: List[Document],
+    term_weights: Optional[Dict[str, float]] = None,
+) -> Optional[dict]:
+    """
+    Score sentences of the retrieved chunks against the question.
+    Returns {"answer", "confidence", "document"} for the best match, or None.
+    Confidence is the weighted share of question terms found in the sentence,
+    penalised when a quantitative question gets a sentence without a value
+    in a matching unit.
+    """
+    terms = query_terms(question)
+    if not terms or not documents:
+        return None
+
+    weights = {t: max((term_weights or {}).get(t, 1.0), 0.1) for t in terms}
+    total_weight = sum(weights.values()) or 1.0
+    measure = _measure_pattern(question)
+
+    candidates = []
+    for rank, doc in enumerate(documents):
+        for position, sentence in enumerate(split_sentences(doc.page_content)):
+            sentence_terms = {stem(t) for t in re.findall(r"[a-z0-9]{2,}", fold(sentence))}
+            matched = sum(w for t, w in weights.items() if t in sentence_terms)
+            if not matched:
+                continue
+            confidence = matched / total_weight
+            if measure is not None and not measure.search(sentence):
+                confidence *= 0.6
+            confidence *= 1.0 - 0.03 * rank  # slight preference for top chunks
+            candidates.append((confidence, rank, position, sentence, doc))
+
+    if not candidates:
+        return None
+
+    candidates.sort(key=lambda c: c[0], reverse=True)
+    best = candidates[0]
+    chosen = [best]
+    for candidate in candidates[1:]:
+        if len(chosen) >= MAX_ANSWER_SENTENCES:
+            break
+        same_doc = candidate[4] is best[4]
+        if same_doc and candidate[0] >= best[0] * 0.8 and candidate[3] != best[3]:
+            chosen.append(candidate)
+
+    chosen.sort(key=lambda c: c[2])
+    return {
+        "answer": " ".join(c[3] for c in chosen),
+        "confidence": round(best[0], 3),
+        "document": best[4],
+    }
+
+
+def format_extractive_answer(answer: str, lang: str) -> str:
+    template = ANSWER_TEMPLATES.get(lang, ANSWER_TEMPLATES["fr"])
+    return template.format(answer=answer)
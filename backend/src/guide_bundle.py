@@ -0,0 +1,268 @@
+"""
+Single-file guide bundle: every index of a guide (FAISS vectors, BM25,
+chunk store, specs, metadata) in one versioned, mmappable container.
+
+Layout (little-endian):
+    header   magic "AURISGB\\0", version, flags, section count,
+             section table offset/length and CRC32 of the table
+    table    one entry per section: name, offset, length, CRC32
+    sections each aligned on SECTION_ALIGN bytes
+
+The server maps the whole file once and reads sections in place; the chunk
+texts stay in the mapping and are only decompressed on demand. The FAISS
+section is the exception: faiss.deserialize_index copies it into memory
+owned by FAISS (it cannot search a read-only buffer), so the vectors are
+resident once per process, as counted by src.memory_accounting.
+The section table is checked (CRC, bounds) on every open; with verify=True,
+as the server opens bundles (BUNDLE_VERIFY_ON_LOAD), every section is too.
+"""
+from __future__ import annotations
+
+import io
+import json
+import mmap
+import os
+import pickle
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .chunk_adjacency import ADJACENCY_FILENAME, ChunkAdjacency
+from .chunk_store import BLOB_FILENAME, META_FILENAME, OFFSETS_FILENAME, ChunkStore
+from .spec_tables import SPEC_INDEX_FILENAME, SpecIndex
+from .vector_index import (
+    IDS_FILENAME,
+    INDEX_FILENAME,
+    LEGACY_DOCSTORE_FILENAME,
+    META_FILENAME as FAISS_META_FILENAME,
+    PCA_FILENAME,
+    EmbeddingReducer,
+    VectorIndex,
+)
+
+BUNDLE_FILENAME = "guide.bundle"
+BUNDLE_MAGIC = b"AURISGB\0"
+BUNDLE_VERSION = 1
+SECTION_ALIGN = 64
+
+_HEADER = struct.Struct("<8sHHIQQI4x")
+_ENTRY = struct.Struct("<16sQQI4x")
+
+# section name -> loose file in vector_store/ ("raw" arrays are stored without the .npy header)
+SECTION_FILES = {
+    "faiss": INDEX_FILENAME,
+    "faiss_ids": IDS_FILENAME,
+    "faiss_meta": FAISS_META_FILENAME,
+    "faiss_pca": PCA_FILENAME,
+    "bm25": "bm25_index.pkl",
+    "chunks_blob": BLOB_FILENAME,
+    "chunks_offsets": OFFSETS_FILENAME,
+    "chunks_meta": META_FILENAME,
+    "chunks_adjacency": ADJACENCY_FILENAME,
+    "specs": SPEC_INDEX_FILENAME,
+}
+RAW_ARRAY_SECTIONS = ("faiss_ids", "chunks_offsets")
+
+
+class BundleError(ValueError):
+    """Unreadable, truncated or corrupted bundle."""
+
+
+def _pad(length: int) -> int:
+    return (-length) % SECTION_ALIGN
+
+
+def write_bundle(sections: Dict[str, bytes], path: Path) -> Path:
+    """Write sections to ``path`` atomically (temp file, fsync, rename)."""
+    path = Path(path)
+    names = list(sections)
+    table_offset = _HEADER.size
+    table_length = _ENTRY.size * len(names)
+    offset = table_offset + table_length
+    offset += _pad(offset)
+
+    entries = []
+    for name in names:
+        data = sections[name]
+        entries.append((name, offset, len(data), zlib.crc32(data)))
+        offset += len(data) + _pad(len(data))
+
+    table = b"".join(
+        _ENTRY.pack(name.encode("ascii"), start, length, crc)
+        for name, start, length, crc in entries
+    )
+    header = _HEADER.pack(
+        BUNDLE_MAGIC, BUNDLE_VERSION, 0, len(names), table_offset, table_length, zlib.crc32(table)
+    )
+
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(table)
+        f.write(b"\0" * _pad(f.tell()))
+        for name, start, length, _ in entries:
+            assert f.tell() == start
+            f.write(sections[name])
+            f.write(b"\0" * _pad(length))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+def pack_guide(vs_dir: Path, path: Path, meta: Optional[dict] = None) -> dict:
+    """Bundle the loose index files of ``vs_dir``; returns the section sizes."""
+    vs_dir = Path(vs_dir)
+    sections: Dict[str, bytes] = {}
+    for name, filename in SECTION_FILES.items():
+        file_path = vs_dir / filename
+        if not file_path.exists():
+            continue
+        if name in RAW_ARRAY_SECTIONS:
+            sections[name] = np.ascontiguousarray(np.load(file_path), dtype="<i8").tobytes()
+        else:
+            sections[name] = file_path.read_bytes()
+
+    if "bm25" not in sections and "faiss" not in sections:
+        raise BundleError(f"No index found in {vs_dir}")
+    if "faiss" in sections and "faiss_ids" not in sections and (vs_dir / LEGACY_DOCSTORE_FILENAME).exists():
+        raise BundleError(f"{LEGACY_DOCSTORE_FILENAME} without {IDS_FILENAME} in {vs_dir}: run 'python -m migrate_indexes'")
+
+    meta = dict(meta or {}, created_at=time.strftime("%Y-%m-%dT%H:%M:%S"), format=BUNDLE_VERSION)
+    sections["meta"] = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    write_bundle(sections, path)
+    return {name: len(data) for name, data in sections.items()}
+
+
+def read_section_table(path: Path) -> Dict[str, tuple]:
+    """Section name -> (offset, length, crc) from the header only (no mapping)."""
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+        return _parse_table(header, lambda offset, length: (f.seek(offset), f.read(length))[1])
+
+
+def _parse_table(header: bytes, read) -> Dict[str, tuple]:
+    if len(header) < _HEADER.size:
+        raise BundleError("Truncated bundle header")
+    magic, version, _, count, table_offset, table_length, table_crc = _HEADER.unpack(header[:_HEADER.size])
+    if magic != BUNDLE_MAGIC:
+        raise BundleError("Not a guide bundle")
+    if version != BUNDLE_VERSION:
+        raise BundleError(f"Unsupported bundle version {version}")
+    table = read(table_offset, table_length)
+    if len(table) != table_length or table_length != count * _ENTRY.size:
+        raise BundleError("Truncated section table")
+    if zlib.crc32(table) != table_crc:
+        raise BundleError("Section table checksum mismatch")
+
+    sections = {}
+    for i in range(count):
+        raw_name, offset, length, crc = _ENTRY.unpack_from(table, i * _ENTRY.size)
+        sections[raw_name.rstrip(b"\0").decode("ascii")] = (offset, length, crc)
+    return sections
+
+
+class GuideBundle:
+    """Read-only view over a mapped bundle file."""
+
+    def __init__(self, path: Path, verify: bool = False):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise BundleError(f"{self.path.name}: truncated bundle")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self.sections = _parse_table(
+            self._mmap[:_HEADER.size], lambda offset, length: self._mmap[offset:offset + length]
+        )
+        for name, (offset, length, _) in self.sections.items():
+            if offset + length > size:
+                raise BundleError(f"{self.path.name}: section '{name}' past end of file")
+        if verify:
+            problems = self.verify()
+            if problems:
+                raise BundleError(f"{self.path.name}: " + "; ".join(problems))
+
+    @classmethod
+    def open(cls, path: Path) -> Optional["GuideBundle"]:
+        return cls(path) if Path(path).exists() else None
+
+    def has(self, name: str) -> bool:
+        return name in self.sections
+
+    def section(self, name: str) -> memoryview:
+        offset, length, _ = self.sections[name]
+        return self._view[offset:offset + length]
+
+    def json_section(self, name: str):
+        return json.loads(bytes(self.section(name)).decode("utf-8")) if self.has(name) else None
+
+    @property
+    def meta(self) -> dict:
+        return self.json_section("meta") or {}
+
+    # -- index loaders ----------------------------------------------------
+
+    def vector_index(self) -> Optional[VectorIndex]:
+        if not self.has("faiss"):
+            return None
+        import faiss
+
+        # Copy of the section (see the module docstring), not a view of the mapping
+        index = faiss.deserialize_index(np.frombuffer(self.section("faiss"), dtype=np.uint8))
+        if self.has("faiss_ids"):
+            row_to_chunk = np.frombuffer(self.section("faiss_ids"), dtype="<i8")
+        else:
+            row_to_chunk = np.arange(index.ntotal, dtype=np.int64)
+        pca = np.load(io.BytesIO(self.section("faiss_pca"))) if self.has("faiss_pca") else None
+        reducer = EmbeddingReducer.from_meta(self.json_section("faiss_meta"), pca, index.d)
+        return VectorIndex(index, row_to_chunk, reducer)
+
+    def bm25(self):
+        if not self.has("bm25"):
+            return None
+        return pickle.loads(self.section("bm25"))["bm25"]
+
+    def chunk_store(self) -> Optional[ChunkStore]:
+        if not self.has("chunks_meta"):
+            return None
+        return ChunkStore(
+            self.json_section("chunks_meta"),
+            np.frombuffer(self.section("chunks_offsets"), dtype="<i8"),
+            self.section("chunks_blob"),
+        )
+
+    def chunk_adjacency(self) -> Optional[ChunkAdjacency]:
+        if not self.has("chunks_adjacency"):
+            return None
+        return ChunkAdjacency(np.load(io.BytesIO(self.section("chunks_adjacency"))))
+
+    def spec_index(self) -> Optional[SpecIndex]:
+        return SpecIndex.from_data(self.json_section("specs"))
+
+    # -- checks -----------------------------------------------------------
+
+    def verify(self) -> List[str]:
+        """Checksum every section; returns the problems found (empty = valid)."""
+        problems = []
+        for name, (_, length, crc) in self.sections.items():
+            if zlib.crc32(self.section(name)) != crc:
+                problems.append(f"section '{name}' ({length} bytes): checksum mismatch")
+        return problems
+
+    def info(self) -> dict:
+        return {
+            "path": str(self.path),
+            "bytes": self._mmap.size(),
+            "version": BUNDLE_VERSION,
+            "meta": self.meta,
+            "sections": {
+                name: {"offset": offset, "bytes": length, "crc32": f"{crc:08x}"}
+                for name, (offset, length, crc) in self.sections.items()
+            },
+        }
@@ -3,22 +3,50 @@ Guide-scoped RAG chatbot with hybrid retrieval (FAISS + BM25).
 Works with pre-indexed guides instead of user sessions.
 Supports multilingual responses (French, English, Korean).
 """
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from typing import Optional, List, Tuple
-import pickle
 import re
-import importlib.util
+import threading
+import time
 
-from google import genai
 from langchain_core.documents import Document
-from langchain_community.vectorstores import FAISS
 
-from .config import GOOGLE_API_KEY, LLM_MODEL, TOP_K_RESULTS
-from .vector_store import get_embeddings
+from .config import (
+    LLM_MODEL,
+    TOP_K_RESULTS,
+    ANSWER_CACHE_SIZE,
+    SPEC_LOOKUP_ENABLED,
+    SEMANTIC_BUDGET_S,
+    MIN_LLM_BUDGET_S,
+    CONTEXT_TRIM_BELOW_S,
+    SHARD_SEARCH_WORKERS,
+    CONTEXT_EXPAND_TOKENS,
+    CONTEXT_EXPAND_HOPS,
+    CONTEXT_EXPAND_SCOPE,
+)
+from .vector_store import embed_queries
+from .llm_client import CircuitOpenError, UpstreamError, UpstreamTimeout, get_llm_client
+from .deadline import Deadline
 from .guide_manager import guide_manager, Guide
+from .extractive import (
+    build_term_weights,
+    extract_answer,
+    format_extractive_answer,
+    guide_settings,
+    is_factual_question,
+)
+from .spec_tables import SpecIndex, format_spec_answer, spec_source_documents
+from .guide_shards import IndexShard
+from .query_expansion import expand_query, expansion_mode, query_tokens
+from .coalescing import coalesced
+from .admission import Overloaded, llm_admission
+from .conversation_store import DEFAULT_SESSION, get_conversations
 
 
 MAX_RESPONSE_CHARS = 900
 MAX_RESPONSE_LINES = 14
+TRIMMED_CONTEXT_DOCS = 3
 
 LANGUAGE_PATTERNS = {
     "ko": re.compile(r"[\uac00-\ud7af\u1100-\u11ff\u3130-\u318f]"),
@@ -40,6 +68,12 @@ def detect_language(text: str) -> str:
     return "fr"
 
 
+def normalize_question(text: str) -> str:
+    """Canonical form of a question, used to spot identical requests."""
+    clean = re.sub(r"\s+", " ", (text or "").strip().lower())
+    return clean.rstrip(" ?!.")
+
+
 LANG_INSTRUCTIONS = {
     "fr": "Reponds en francais.",
     "en": "Answer in English.",
@@ -289,85 +323,359 @@ def format_context(documents: List[Document]) -> str:
     return "\n\n---\n\n".join(parts)
 
 
+RETRIEVAL_ONLY_HEADERS = {
+    "fr": "Le service de generation est momentanement indisponible. Passages du manuel les plus pertinents :",
+    "en": "The answer service is temporarily unavailable. Most relevant passages from the manual:",
+    "ko": "답변 생성 서비스를 일시적으로 사용할 수 없습니다. 매뉴얼에서 가장 관련성 높은 내용:",
+}
+RETRIEVAL_ONLY_PASSAGES = 3
+RETRIEVAL_ONLY_SNIPPET_CHARS = 220
+
+
+def retrieval_only_answer(
+    question: str,
+    documents: List[Document],
+    lang: str,
+    term_weights: Optional[dict] = None,
+) -> str:
+    """Answer with the best manual passages when the LLM cannot be reached."""
+    docs = documents[:RETRIEVAL_ONLY_PASSAGES]
+    lines = []
+    for doc in docs:
+        best = extract_answer(question, [doc], term_weights)
+        if best:
+            text = best["answer"]
+        else:
+            text = re.sub(r"\s+", " ", doc.page_content).strip()
+        if len(text) > RETRIEVAL_ONLY_SNIPPET_CHARS:
+            text = text[:RETRIEVAL_ONLY_SNIPPET_CHARS].rsplit(" ", 1)[0] + "..."
+        lines.append(f"- {text} (page {doc.metadata.get('page', '?')})")
+
+    header = RETRIEVAL_ONLY_HEADERS.get(lang, RETRIEVAL_ONLY_HEADERS["fr"])
+    answer = trim_response(header + "\n" + "\n".join(lines))
+    return f"{answer}\n\n{format_sources(docs)}"
+
+
+# Background LLM calls that refine extractive answers for the answer cache
+_refine_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="answer-refine")
+# Query embedding + FAISS, run next to BM25 and abandoned when over budget
+_semantic_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="semantic-search")
+# Per-document shards of multi-document guides, searched side by side
+_shard_pool = ThreadPoolExecutor(max_workers=SHARD_SEARCH_WORKERS, thread_name_prefix="shard-search")
+
+
+def _fuse_semantic(per_query: List[List[Tuple[int, int, float]]]) -> List[Tuple[int, int, float]]:
+    """One hit list from several query variants: each chunk keeps its best distance."""
+    if len(per_query) == 1:
+        return per_query[0]
+    best = {}
+    for hits in per_query:
+        for shard_no, chunk_id, distance in hits:
+            key = (shard_no, chunk_id)
+            if key not in best or distance < best[key]:
+                best[key] = distance
+    return [(shard_no, chunk_id, distance) for (shard_no, chunk_id), distance in best.items()]
+
+
 class GuideChatbot:
-    """RAG chatbot attached to a pre-indexed guide with hybrid retrieval."""
+    """RAG chatbot attached to a pre-indexed guide with hybrid retrieval.
+
+    The guide's documents are separate index shards searched side by side;
+    their hits are merged on one score scale (see _merge_hits).
+    """
 
     def __init__(self, guide: Guide):
         self.guide = guide
-        self.vector_store = self._load_vector_store()
-        self.bm25_index, self.bm25_chunks = self._load_bm25()
-        self.client = genai.Client(api_key=GOOGLE_API_KEY)
+        self._load_indexes()
+        self.llm = get_llm_client()
         self.model_name = LLM_MODEL.replace("models/", "", 1)
-        self.conversation_history: List[dict] = []
-
-    def _load_vector_store(self) -> Optional[FAISS]:
-        vs_dir = self.guide.vector_store_dir
-        index_path = vs_dir / "index.faiss"
-        if not index_path.exists():
+        self.answer_cache: "OrderedDict[tuple, str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._refining: set = set()
+        self._term_weights: Optional[dict] = None
+
+    def _load_indexes(self):
+        """One IndexShard per document, plus their merged spec table."""
+        locations = self.guide.shards
+        slug = self.guide.slug
+        self.shards: List[IndexShard] = [
+            IndexShard(location, slug if len(locations) == 1 else f"{slug}/{location.document}")
+            for location in locations
+        ]
+        self.spec_index = SpecIndex.merge([s.spec_index for s in self.shards if s.spec_index is not None])
+
+    @property
+    def has_vectors(self) -> bool:
+        return any(shard.vector_store for shard in self.shards)
+
+    @property
+    def has_lexical(self) -> bool:
+        return any(shard.has_lexical for shard in self.shards)
+
+    def _map_shards(self, fn) -> list:
+        """``fn(shard)`` for every shard, in parallel when the guide has several."""
+        if len(self.shards) == 1:
+            return [fn(self.shards[0])]
+        return list(_shard_pool.map(fn, self.shards))
+
+    def query_variants(self, question: str, lang: Optional[str] = None) -> List[str]:
+        """The question plus its French variants when query expansion is enabled."""
+        mode = expansion_mode(self.guide.options)
+        if mode == "off":
+            return [question]
+        return expand_query(question, lang or detect_language(question), mode, self.guide.slug)
+
+    def _embed_queries(self, variants: List[str]) -> Optional[List[List[float]]]:
+        """Query vectors (one batched call) from the shared client, None when embedding fails."""
+        try:
+            return embed_queries(variants)
+        except UpstreamError as exc:
+            print(f"GuideChatbot: query embedding failed for {self.guide.slug} ({exc}), lexical only")
             return None
 
-        if importlib.util.find_spec("faiss") is None:
+    def _semantic_ids(
+        self,
+        variants: List[str],
+        k: int,
+        query_vector: Optional[List[float]] = None,
+    ) -> List[Tuple[int, int, float]]:
+        """FAISS hits as (shard, chunk id, L2 distance), fused over the query variants."""
+        vectors = [query_vector] if query_vector is not None else self._embed_queries(variants)
+        if not vectors:
+            return []
+        return _fuse_semantic(self._semantic_ids_batch(vectors, k))
+
+    def _semantic_task(self, variants: List[str], k: int, timeout_s: float) -> List[Tuple[int, int, float]]:
+        vectors = embed_queries(variants, timeout_s=timeout_s)
+        return _fuse_semantic(self._semantic_ids_batch(vectors, k))
+
+    def _start_semantic(self, variants: List[str], k: int, deadline: Deadline):
+        """Submit the semantic lookup; returns (future, wait-until) or None when out of budget."""
+        budget = deadline.cap(SEMANTIC_BUDGET_S, reserve_s=MIN_LLM_BUDGET_S)
+        if budget <= 0:
+            deadline.degrade("semantic_skipped_budget")
             return None
+        future = _semantic_pool.submit(self._semantic_task, variants, k, budget)
+        return future, time.monotonic() + budget
 
-        embeddings = get_embeddings()
+    def _collect_semantic(self, pending, deadline: Deadline) -> List[Tuple[int, int, float]]:
+        future, wait_until = pending
         try:
-            return FAISS.load_local(
-                str(vs_dir), embeddings, allow_dangerous_deserialization=True
-            )
-        except ImportError:
-            return None
+            return future.result(timeout=max(0.0, wait_until - time.monotonic()))
+        except (FutureTimeout, UpstreamTimeout):
+            deadline.degrade("semantic_timeout")
+        except Exception as exc:
+            print(f"GuideChatbot: semantic search failed for {self.guide.slug} ({exc}), lexical only")
+            deadline.degrade("semantic_failed")
+        return []
+
+    def _semantic_ids_batch(
+        self, query_vectors: List[List[float]], k: int
+    ) -> List[List[Tuple[int, int, float]]]:
+        """One FAISS search per shard for a whole matrix of query vectors."""
+        per_shard = self._map_shards(lambda shard: shard.semantic(query_vectors, k))
+        return [
+            [(shard_no, chunk_id, distance)
+             for shard_no, shard_hits in enumerate(per_shard)
+             for chunk_id, distance in shard_hits[q]]
+            for q in range(len(query_vectors))
+        ]
+
+    def _lexical_ids(self, variants: List[str], k: int) -> List[Tuple[int, int, float]]:
+        """BM25 hits as (shard, chunk id, score scaled to [0, 0.8]).
+
+        One BM25 query over the union of the variants' terms. Raw scores are
+        divided by the best score over all shards (not per shard), so a
+        document that barely matches does not get its weak passages
+        promoted to the top of the merged list.
+        """
+        tokens = list(dict.fromkeys(t for variant in variants for t in query_tokens(variant)))
+        if not tokens:
+            return []
+
+        per_shard = self._map_shards(lambda shard: shard.lexical(tokens, k))
+        best = max((top for _, top in per_shard), default=0.0)
+        max_score = best if best > 0 else 1.0
+        return [
+            (shard_no, chunk_id, score / max_score * 0.8)
+            for shard_no, (hits, _) in enumerate(per_shard)
+            for chunk_id, score in hits
+        ]
+
+    def _merge_hits(
+        self,
+        semantic: List[Tuple[int, int, float]],
+        lexical: List[Tuple[int, int, float]],
+        k: int,
+        expand_tokens: int = 0,
+    ) -> List[Tuple[Document, float]]:
+        """Fuse both id lists and build Documents for the final top-k only.
+
+        Semantic scores 1/(1+d) are comparable across shards as every shard
+        is embedded with the same model. With ``expand_tokens``, the hits are
+        then widened to their neighbouring chunks (see _with_neighbours).
+        """
+        scores = {}
+        for shard_no, chunk_id, distance in semantic:
+            scores.setdefault((shard_no, chunk_id), 1.0 / (1.0 + distance))
+        for shard_no, chunk_id, score in lexical:
+            scores.setdefault((shard_no, chunk_id), score)
+
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
 
-    def _load_bm25(self):
-        bm25_path = self.guide.vector_store_dir / "bm25_index.pkl"
-        if not bm25_path.exists():
-            return None, []
-        try:
-            with open(bm25_path, "rb") as f:
-                data = pickle.load(f)
-            return data["bm25"], data["chunks"]
-        except Exception:
-            return None, []
-
-    def _hybrid_search(self, question: str, k: int = TOP_K_RESULTS) -> List[Document]:
-        """Combine FAISS semantic search + BM25 lexical search."""
         seen_contents = set()
-        results: List[Tuple[Document, float]] = []
-
-        if self.vector_store:
-            faiss_docs = self.vector_store.similarity_search_with_score(question, k=k)
-            for doc, score in faiss_docs:
-                key = doc.page_content[:200]
-                if key not in seen_contents:
-                    seen_contents.add(key)
-                    results.append((doc, 1.0 / (1.0 + score)))
-
-        if self.bm25_index and self.bm25_chunks:
-            tokens = re.findall(r"[a-z0-9]{2,}", question.lower())
-            if tokens:
-                scores = self.bm25_index.get_scores(tokens)
-                top_indices = sorted(
-                    range(len(scores)),
-                    key=lambda i: scores[i],
-                    reverse=True,
-                )[:k]
-                max_score = max(scores) if len(scores) > 0 and max(scores) > 0 else 1.0
-                for idx in top_indices:
-                    if scores[idx] <= 0:
-                        continue
-                    doc = self.bm25_chunks[idx]
-                    key = doc.page_content[:200]
-                    if key not in seen_contents:
-                        seen_contents.add(key)
-                        results.append((doc, scores[idx] / max_score * 0.8))
-
-        results.sort(key=lambda x: x[1], reverse=True)
-        return [doc for doc, _ in results[:k]]
-
-    def chat(self, question: str, lang: str = None) -> str:
-        """Generate a response. If lang is provided, use it; otherwise auto-detect."""
-        if not lang:
-            lang = detect_language(question)
-
+        results: List[Tuple[tuple, Document, float]] = []
+        for (shard_no, chunk_id), score in ranked:
+            doc = self.shards[shard_no].chunks.document(chunk_id)
+            key = doc.page_content[:200]
+            if key in seen_contents:
+                continue
+            seen_contents.add(key)
+            results.append(((shard_no, chunk_id), doc, score))
+            if len(results) >= k:
+                break
+        if expand_tokens > 0:
+            return self._with_neighbours(results, expand_tokens)
+        return [(doc, score) for _, doc, score in results]
+
+    def _with_neighbours(
+        self, results: List[Tuple[tuple, Document, float]], budget: int
+    ) -> List[Tuple[Document, float]]:
+        """
+        Each hit surrounded by the chunks before and after it in the PDF (up
+        to CONTEXT_EXPAND_HOPS each way, within its section when
+        CONTEXT_EXPAND_SCOPE is "section"), in PDF order and with the hit's
+        score. Best hits are widened first until ``budget`` tokens are spent.
+        Only array lookups: neighbours cost no search, just their decompression.
+        """
+        taken = {key for key, _, _ in results}
+        expanded: List[Tuple[Document, float]] = []
+        for (shard_no, chunk_id), doc, score in results:
+            shard = self.shards[shard_no]
+            before, after = [], []
+            if budget > 0 and shard.adjacency is not None:
+                skip = {c for s, c in taken if s == shard_no}
+                before, after, used = shard.adjacency.expand(
+                    chunk_id, CONTEXT_EXPAND_HOPS, budget, skip, same_section=CONTEXT_EXPAND_SCOPE == "section"
+                )
+                budget -= used
+                taken.update((shard_no, c) for c in before + after)
+            expanded.extend((shard.chunks.document(c), score) for c in reversed(before))
+            expanded.append((doc, score))
+            expanded.extend((shard.chunks.document(c), score) for c in after)
+        return expanded
+
+    def search(
+        self,
+        question: str,
+        k: int = TOP_K_RESULTS,
+        query_vector: Optional[List[float]] = None,
+        semantic: bool = True,
+        deadline: Optional[Deadline] = None,
+        lang: Optional[str] = None,
+        expand_tokens: int = 0,
+    ) -> List[Tuple[Document, float]]:
+        """Combine FAISS semantic search + BM25 lexical search over every shard.
+
+        Returns (document, score) pairs, best first. When ``query_vector`` is
+        given it is used for the FAISS lookup instead of embedding the question
+        again, so callers searching several guides can embed only once.
+        With a ``deadline``, embedding + FAISS run concurrently with BM25 and
+        are dropped (lexical only) when they do not finish within budget.
+        With query expansion, all variants are embedded in one call and
+        searched as one FAISS query matrix; BM25 gets the union of their terms.
+        ``expand_tokens`` > 0 adds the neighbours of the top-k hits (more
+        than k results, see _with_neighbours).
+        """
+        variants = self.query_variants(question, lang)
+        semantic_hits = []
+        pending = None
+        if self.has_vectors and semantic:
+            if deadline is not None and query_vector is None:
+                pending = self._start_semantic(variants, k, deadline)
+            else:
+                semantic_hits = self._semantic_ids(variants, k, query_vector)
+
+        lexical_hits = []
+        if self.has_lexical:
+            lexical_hits = self._lexical_ids(variants, k)
+
+        if pending is not None:
+            semantic_hits = self._collect_semantic(pending, deadline)
+
+        return self._merge_hits(semantic_hits, lexical_hits, k, expand_tokens)
+
+    def search_batch(
+        self,
+        questions: List[str],
+        k: int = TOP_K_RESULTS,
+        query_vectors: Optional[List[List[float]]] = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """Hybrid search for many questions with a single FAISS call per shard.
+
+        ``query_vectors`` must be aligned with ``questions``; without them
+        only the lexical index is used.
+        """
+        if self.has_vectors and query_vectors is not None and questions:
+            semantic_batch = self._semantic_ids_batch(query_vectors, k)
+        else:
+            semantic_batch = [[] for _ in questions]
+
+        results = []
+        for question, semantic_hits in zip(questions, semantic_batch):
+            lexical_hits = []
+            if self.has_lexical:
+                lexical_hits = self._lexical_ids(self.query_variants(question), k)
+            results.append(self._merge_hits(semantic_hits, lexical_hits, k))
+        return results
+
+    def search_prepared(
+        self, queries: List[Tuple[List[str], Optional[List[List[float]]], int, int]]
+    ) -> List[List[Tuple[Document, float]]]:
+        """Hybrid search of already expanded (and embedded) queries, as a batch.
+
+        Each query is (variants, vectors of the variants or None, k,
+        expand_tokens); the vectors of every query with the same k go to
+        FAISS as one matrix per shard. Queries with the same terms share one
+        BM25 scoring. Used by the retrieval service to serve concurrent
+        requests of all web workers together.
+        """
+        semantic = [[] for _ in queries]
+        if self.has_vectors:
+            by_k = {}
+            for i, (_, vectors, k, _) in enumerate(queries):
+                if vectors is not None and len(vectors):
+                    by_k.setdefault(k, []).append(i)
+            for k, members in by_k.items():
+                matrix = [vector for i in members for vector in queries[i][1]]
+                per_vector = iter(self._semantic_ids_batch(matrix, k))
+                for i in members:
+                    semantic[i] = _fuse_semantic([next(per_vector) for _ in range(len(queries[i][1]))])
+
+        lexical_cache = {}
+        results = []
+        for (variants, _, k, expand_tokens), semantic_hits in zip(queries, semantic):
+            lexical_hits = []
+            if self.has_lexical:
+                key = (frozenset(t for variant in variants for t in query_tokens(variant)), k)
+                if key not in lexical_cache:
+                    lexical_cache[key] = self._lexical_ids(variants, k)
+                lexical_hits = lexical_cache[key]
+            results.append(self._merge_hits(semantic_hits, lexical_hits, k, expand_tokens))
+        return results
+
+    def _hybrid_search(
+        self,
+        question: str,
+        k: int = TOP_K_RESULTS,
+        deadline: Optional[Deadline] = None,
+        lang: Optional[str] = None,
+    ) -> List[Document]:
+        hits = self.search(question, k=k, deadline=deadline, lang=lang, expand_tokens=CONTEXT_EXPAND_TOKENS)
+        return [doc for doc, _ in hits]
+
+    def canned_answer(self, question: str, lang: str) -> Optional[str]:
+        """Return the fixed answer for language or off-topic questions, else None."""
         if LANG_QUESTION_PATTERNS.search(question):
             return LANG_QUESTION_RESPONSE.get(lang, LANG_QUESTION_RESPONSE["fr"])
 
@@ -377,17 +685,13 @@ class GuideChatbot:
             return LANG_OFF_TOPIC.get(lang, LANG_OFF_TOPIC["fr"]).format(
                 vehicle=self.guide.name
             )
+        return None
 
-        docs: List[Document] = []
-        context = ""
-        if self.vector_store or self.bm25_index:
-            docs = self._hybrid_search(question, k=TOP_K_RESULTS)
-            context = format_context(docs)
-
-        sources_block = format_sources(docs)
+    def build_prompt(self, question: str, docs: List[Document], lang: str) -> str:
+        context = format_context(docs) if (self.has_vectors or self.has_lexical) else ""
         lang_instruction = LANG_INSTRUCTIONS.get(lang, LANG_INSTRUCTIONS["fr"])
 
-        prompt = f"""Tu es un assistant expert pour le vehicule {self.guide.name}.
+        return f"""Tu es un assistant expert pour le vehicule {self.guide.name}.
 
 Regles:
 1) {lang_instruction}
@@ -404,55 +708,287 @@ Contexte:
 Question: {question}
 """
 
-        try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt,
+    def _fit_context(self, docs: List[Document], deadline: Deadline) -> List[Document]:
+        """Shorter context (faster generation) when little time is left."""
+        remaining = deadline.remaining()
+        if remaining is not None and remaining < CONTEXT_TRIM_BELOW_S and len(docs) > TRIMMED_CONTEXT_DOCS:
+            deadline.degrade("context_trimmed")
+            return docs[:TRIMMED_CONTEXT_DOCS]
+        return docs
+
+    def generate(
+        self,
+        question: str,
+        docs: List[Document],
+        lang: str,
+        deadline: Optional[Deadline] = None,
+    ) -> str:
+        """Call the LLM on retrieved docs; raises UpstreamError on failure."""
+        timeout_s = None
+        if deadline is not None:
+            docs = self._fit_context(docs, deadline)
+            timeout_s = deadline.remaining()
+        raw_answer = self.llm.generate(
+            self.build_prompt(question, docs, lang), model=self.model_name, timeout_s=timeout_s
+        ).strip()
+        clean_answer = clean_model_output(raw_answer)
+        answer = trim_response(clean_answer)
+        if not answer:
+            answer = "Je n'ai pas trouve de reponse exploitable."
+        return f"{answer}\n\n{format_sources(docs)}"
+
+    @property
+    def term_weights(self) -> dict:
+        """Stemmed BM25 idf weights used to score extractive answers."""
+        if self._term_weights is None:
+            self._term_weights = build_term_weights(self._merged_idf())
+        return self._term_weights
+
+    def _merged_idf(self) -> dict:
+        """BM25 idf of all shards, averaged by shard size where a term appears in several."""
+        indexes = [s.bm25_index for s in self.shards if getattr(s.bm25_index, "idf", None)]
+        if len(indexes) == 1:
+            return indexes[0].idf
+        totals, weights = {}, {}
+        for bm25 in indexes:
+            size = bm25.corpus_size
+            for term, value in bm25.idf.items():
+                totals[term] = totals.get(term, 0.0) + value * size
+                weights[term] = weights.get(term, 0) + size
+        return {term: totals[term] / weights[term] for term in totals}
+
+    def cached_answer(self, question: str, lang: str) -> Optional[str]:
+        key = (lang, normalize_question(question))
+        with self._cache_lock:
+            answer = self.answer_cache.get(key)
+            if answer is not None:
+                self.answer_cache.move_to_end(key)
+            return answer
+
+    def store_answer(self, question: str, lang: str, answer: str):
+        key = (lang, normalize_question(question))
+        with self._cache_lock:
+            self.answer_cache[key] = answer
+            self.answer_cache.move_to_end(key)
+            while len(self.answer_cache) > ANSWER_CACHE_SIZE:
+                self.answer_cache.popitem(last=False)
+
+    def spec_answer(self, question: str, lang: str) -> Optional[str]:
+        """Answer value questions (pressures, capacities...) from specs.json."""
+        enabled = (self.guide.options.get("specs") or {}).get("enabled", SPEC_LOOKUP_ENABLED)
+        if not enabled or self.spec_index is None:
+            return None
+
+        entries = self.spec_index.lookup(question)
+        if not entries:
+            return None
+
+        answer = trim_response(format_spec_answer(entries, lang))
+        return f"{answer}\n\n{format_sources(spec_source_documents(entries))}"
+
+    def extractive_answer(self, question: str, docs: List[Document], lang: str) -> Optional[str]:
+        """Answer straight from the manual text when the guide settings allow it."""
+        settings = guide_settings(self.guide)
+        mode = settings["mode"]
+        if mode == "llm" or lang not in settings["langs"]:
+            return None
+        if mode == "auto" and not is_factual_question(question):
+            return None
+
+        result = extract_answer(question, docs, self.term_weights)
+        if not result:
+            return None
+        if mode == "auto" and result["confidence"] < settings["min_confidence"]:
+            return None
+
+        answer = trim_response(format_extractive_answer(result["answer"], lang))
+        return f"{answer}\n\n{format_sources([result['document']])}"
+
+    def _refine_in_background(self, question: str, docs: List[Document], lang: str):
+        """Generate the LLM answer off the request path and keep it in the cache."""
+        key = (lang, normalize_question(question))
+        with self._cache_lock:
+            if key in self._refining:
+                return
+            self._refining.add(key)
+
+        def task():
+            try:
+                with llm_admission.background_slot(self.guide.slug) as acquired:
+                    if acquired:  # refinement is optional: skipped under load
+                        self.store_answer(question, lang, self.generate(question, docs, lang))
+            except Exception as exc:
+                print(f"Answer refinement failed for {self.guide.slug}: {exc}")
+            finally:
+                with self._cache_lock:
+                    self._refining.discard(key)
+
+        _refine_pool.submit(task)
+
+    def respond(
+        self,
+        question: str,
+        lang: str = None,
+        deadline: Optional[Deadline] = None,
+        session: str = DEFAULT_SESSION,
+    ) -> dict:
+        """
+        Answer a question and report which path produced the answer:
+        "canned", "cache", "specs", "extractive", "llm", "retrieval"
+        (LLM unavailable or out of time, best passages returned) or "error".
+        Identical questions already in flight share one answer ("coalesced");
+        "degraded" lists the stages cut short by the request deadline or by
+        upstream failures (for a shared answer, those of the request that
+        computed it). The exchange is recorded in the ``session`` history.
+        """
+        if not lang:
+            lang = detect_language(question)
+        if deadline is None:
+            deadline = Deadline()
+
+        key = (self.guide.slug, lang, normalize_question(question))
+        result, shared = coalesced(
+            key,
+            lambda: self._respond(question, lang, deadline),
+            shareable=lambda r: r["answer_path"] != "error",
+        )
+        if result["answer_path"] not in ("canned", "error"):
+            get_conversations().append(
+                self.guide.slug, session, [("user", question), ("assistant", result["response"])]
             )
-            raw_answer = (getattr(response, "text", "") or "").strip()
-            clean_answer = clean_model_output(raw_answer)
-            answer = trim_response(clean_answer)
-            if not answer:
-                answer = "Je n'ai pas trouve de reponse exploitable."
-            final_answer = f"{answer}\n\n{sources_block}"
+        return dict(result, coalesced=shared, lang=lang)
 
-            self.conversation_history.append({"role": "user", "content": question})
-            self.conversation_history.append({"role": "assistant", "content": final_answer})
-            return final_answer
+    def _respond(self, question: str, lang: str, deadline: Deadline) -> dict:
+        result = self._answer(question, lang, deadline)
+        result["degraded"] = list(deadline.reasons)
+        return result
 
-        except Exception as exc:
-            return (
+    def _answer(self, question: str, lang: str, deadline: Deadline) -> dict:
+        canned = self.canned_answer(question, lang)
+        if canned is not None:
+            return {"response": canned, "answer_path": "canned"}
+
+        cached = self.cached_answer(question, lang)
+        if cached is not None:
+            return {"response": cached, "answer_path": "cache"}
+
+        result, _ = self._compute_answer(question, lang, deadline)
+        return result
+
+    def _compute_answer(
+        self, question: str, lang: str, deadline: Deadline, refine: bool = True
+    ) -> Tuple[dict, List[Document]]:
+        """Answer from the specs, the manual text or the LLM, and the passages retrieved for it."""
+        docs: List[Document] = []
+        final_answer = self.spec_answer(question, lang)
+        path = "specs"
+
+        if final_answer is None:
+            if self.has_vectors or self.has_lexical:
+                # Unbounded deadline (offline precompute): wait for the embedding
+                search_deadline = deadline if deadline.budget_s is not None else None
+                docs = self._hybrid_search(question, k=TOP_K_RESULTS, deadline=search_deadline, lang=lang)
+
+            final_answer = self.extractive_answer(question, docs, lang)
+            path = "extractive"
+            if final_answer is not None:
+                if refine and guide_settings(self.guide)["refine"]:
+                    self._refine_in_background(question, docs, lang)
+            else:
+                final_answer, path = self._llm_answer(question, docs, lang, deadline)
+                if final_answer is None:
+                    return path, docs
+
+        return {"response": final_answer, "answer_path": path}, docs
+
+    def precompute_answer(self, question: str, lang: str) -> Tuple[dict, List[Document]]:
+        """
+        Offline answer for the warm cache (src.answer_warming): no cache, no
+        history, and the refined LLM answer right away where the live path
+        would serve the extractive one first.
+        """
+        result, docs = self._compute_answer(question, lang, Deadline(None), refine=False)
+        if result["answer_path"] == "extractive" and guide_settings(self.guide)["refine"]:
+            try:
+                result = {"response": self.generate(question, docs, lang), "answer_path": "llm"}
+            except Exception as exc:
+                print(f"GuideChatbot: refinement failed for {self.guide.slug} ({exc}), extractive answer kept")
+        return result, docs
+
+    def _llm_answer(self, question: str, docs: List[Document], lang: str, deadline: Deadline):
+        """
+        (answer, path) from the LLM, or from the retrieved passages when the
+        budget runs out, the LLM queue is saturated or the upstream fails;
+        (None, error dict) without docs, Overloaded (-> 429) when saturated.
+        """
+        try:
+            with llm_admission.slot(self.guide.slug, max_wait_s=deadline.cap(None, reserve_s=MIN_LLM_BUDGET_S)):
+                remaining = deadline.remaining()
+                if remaining is not None and remaining < MIN_LLM_BUDGET_S:
+                    deadline.degrade("llm_skipped_budget")
+                    error = UpstreamTimeout("request budget exhausted before the LLM call")
+                else:
+                    try:
+                        start = time.monotonic()
+                        answer = self.generate(question, docs, lang, deadline)
+                        llm_admission.record_service(time.monotonic() - start)
+                        return answer, "llm"
+                    except CircuitOpenError as exc:
+                        deadline.degrade("llm_circuit_open")
+                        error = exc
+                    except UpstreamTimeout as exc:
+                        deadline.degrade("llm_timeout")
+                        error = exc
+                    except UpstreamError as exc:
+                        deadline.degrade("llm_unavailable")
+                        error = exc
+                    except Exception as exc:
+                        return None, self._error_response(exc)
+        except Overloaded as exc:
+            # LLM queue saturated: the passages still answer; without them, 429
+            if not docs:
+                raise
+            deadline.degrade("llm_overloaded")
+            error = exc
+
+        if not docs:
+            return None, self._error_response(error)
+        print(f"GuideChatbot: LLM answer unavailable for {self.guide.slug} ({error}), retrieval-only answer")
+        return retrieval_only_answer(question, docs, lang, self.term_weights), "retrieval"
+
+    @staticmethod
+    def _error_response(exc: Exception) -> dict:
+        return {
+            "response": (
                 "Erreur:\n"
                 f"Impossible de generer une reponse ({str(exc)}).\n\n"
                 "Sources:\n"
                 "- Indisponibles (erreur interne)."
-            )
+            ),
+            "answer_path": "error",
+        }
 
-    def get_history(self) -> list:
-        return self.conversation_history
-
-    def clear_history(self):
-        self.conversation_history = []
+    def chat(self, question: str, lang: str = None) -> str:
+        """Generate a response. If lang is provided, use it; otherwise auto-detect."""
+        return self.respond(question, lang=lang)["response"]
 
+    def get_history(self, session: str = DEFAULT_SESSION, limit: int = 50, before: Optional[int] = None) -> dict:
+        """One page of a session's messages (see ConversationStore.history)."""
+        return get_conversations().history(self.guide.slug, session, limit=limit, before=before)
 
-# Cache chatbots by guide slug + a simple instance id
-_guide_chatbot_cache: dict[str, GuideChatbot] = {}
+    def clear_history(self, session: Optional[str] = DEFAULT_SESSION):
+        """Forget one session, or every session of the guide with None."""
+        get_conversations().clear(self.guide.slug, session)
 
 
 def get_guide_chatbot(slug: str) -> GuideChatbot:
-    """Get or create a chatbot for a guide slug."""
-    if slug not in _guide_chatbot_cache:
-        guide = guide_manager.get_guide(slug)
-        if not guide:
-            raise ValueError(f"Guide '{slug}' not found")
-        if not guide.is_indexed:
-            raise ValueError(f"Guide '{slug}' is not indexed yet")
-        _guide_chatbot_cache[slug] = GuideChatbot(guide)
-    return _guide_chatbot_cache[slug]
+    """Get or load the chatbot for a guide slug (see src.guide_registry)."""
+    from .guide_registry import guide_registry
+
+    return guide_registry.get(slug)
 
 
 def clear_guide_chatbot_cache(slug: str = None):
-    if slug:
-        _guide_chatbot_cache.pop(slug, None)
-    else:
-        _guide_chatbot_cache.clear()
+    from .guide_registry import guide_registry
+
+    guide_registry.unload(slug)
@@ -1,18 +1,97 @@
 """
 Guide manager for pre-indexed vehicle manuals.
-Each guide lives under data/guides/<slug>/ with FAISS + BM25 indexes.
+Each guide lives under data/guides/<slug>/ with FAISS + BM25 indexes, either
+as a single guide.bundle file or as loose files in vector_store/. A guide made
+of several PDFs (owner's manual, multimedia manual, maintenance booklet...)
+keeps one index shard per extra document under shards/<document id>/, listed
+in the manifest entry's "documents", so each one is rebuilt on its own.
+manifest.json is re-read when it changes on disk, so guides published by an
+indexing job appear in every worker without a restart.
 """
 from __future__ import annotations
 
 import json
+import os
 import re
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: single-process manifest updates
+    fcntl = None
 
 from .config import DATA_DIR
 
 GUIDES_DIR = DATA_DIR / "guides"
 GUIDES_DIR.mkdir(parents=True, exist_ok=True)
+MANIFEST_PATH = GUIDES_DIR / "manifest.json"
+BUNDLE_FILENAME = "guide.bundle"
+SHARDS_DIRNAME = "shards"
+MAIN_DOCUMENT = "main"  # shard id of the index stored at the guide root
+
+
+def read_manifest() -> List[dict]:
+    if not MANIFEST_PATH.exists():
+        return []
+    with MANIFEST_PATH.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(entries: List[dict]) -> Path:
+    """Replace manifest.json atomically so readers never see a half-written file."""
+    tmp_path = MANIFEST_PATH.with_suffix(".json.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, MANIFEST_PATH)
+    return MANIFEST_PATH
+
+
+@contextmanager
+def _manifest_lock():
+    """Exclusive lock around read-modify-write of the manifest (across processes)."""
+    with open(GUIDES_DIR / ".manifest.lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def upsert_manifest_entry(entry: dict) -> Path:
+    """Add or replace the entry for ``entry['slug']``, keeping its existing options, image and documents."""
+    with _manifest_lock():
+        entries = read_manifest()
+        previous = next((e for e in entries if e["slug"] == entry["slug"]), {})
+        entry = dict(entry)
+        for key in ("options", "documents"):
+            if key in previous and key not in entry:
+                entry[key] = previous[key]
+        if not entry.get("image") and previous.get("image"):
+            entry["image"] = previous["image"]
+        entries = [e for e in entries if e["slug"] != entry["slug"]] + [entry]
+        return write_manifest(entries)
+
+
+def upsert_manifest_document(slug: str, name: str, document: dict, image: Optional[str] = None) -> Path:
+    """Add or replace one document shard of ``slug`` (the guide entry is created if needed)."""
+    with _manifest_lock():
+        entries = read_manifest()
+        entry = next((e for e in entries if e["slug"] == slug), None)
+        if entry is None:
+            entry = {"slug": slug, "name": name, "image": image}
+            entries.append(entry)
+        elif image and not entry.get("image"):
+            entry["image"] = image
+        documents = [d for d in entry.get("documents", []) if d["id"] != document["id"]]
+        entry["documents"] = documents + [document]
+        return write_manifest(entries)
 
 
 def slugify(name: str) -> str:
@@ -28,28 +107,109 @@ def slugify(name: str) -> str:
     return s.strip("-")
 
 
+def derive_guide_name(pdf_name: str) -> str:
+    """Derive a clean guide name from a PDF filename."""
+    name = pdf_name.replace(".pdf", "").replace(".PDF", "")
+    # Remove 'manuel' prefix
+    name = name.replace("manuel ", "").replace("Manuel ", "")
+    # Title case
+    return name.strip().title()
+
+
+class ShardLocation:
+    """Where one document's indexes live: a guide.bundle or loose files in vector_store/."""
+
+    def __init__(self, document: str, directory: Path, pdf: Optional[str] = None):
+        self.document = document
+        self.dir = directory
+        self.pdf = pdf
+
+    @property
+    def vector_store_dir(self) -> Path:
+        return self.dir / "vector_store"
+
+    @property
+    def bundle_path(self) -> Path:
+        return self.dir / BUNDLE_FILENAME
+
+    @property
+    def has_bundle(self) -> bool:
+        return self.bundle_path.exists()
+
+    @property
+    def has_vector_index(self) -> bool:
+        if self.has_bundle:
+            from .guide_bundle import BundleError, read_section_table
+
+            try:
+                return "faiss" in read_section_table(self.bundle_path)
+            except (OSError, BundleError):
+                return False
+        return (self.vector_store_dir / "index.faiss").exists()
+
+    @property
+    def is_indexed(self) -> bool:
+        """Check if a bundle, FAISS or BM25 index exists."""
+        faiss_ok = (self.vector_store_dir / "index.faiss").exists()
+        bm25_ok = (self.vector_store_dir / "bm25_index.pkl").exists()
+        return self.has_bundle or faiss_ok or bm25_ok
+
+
 class Guide:
     """Represents a pre-indexed vehicle guide."""
 
-    def __init__(self, slug: str, name: str, image: Optional[str] = None):
+    def __init__(
+        self,
+        slug: str,
+        name: str,
+        image: Optional[str] = None,
+        options: Optional[dict] = None,
+        documents: Optional[List[dict]] = None,
+    ):
         self.slug = slug
         self.name = name
         self.image = image  # filename like "clio-4.png"
+        self.options = options or {}  # per-guide settings from the manifest
+        self.documents = documents or []  # extra PDFs: [{"id", "pdf", "indexed_at"}]
 
     @property
     def dir(self) -> Path:
         return GUIDES_DIR / self.slug
 
+    @property
+    def main_shard(self) -> ShardLocation:
+        return ShardLocation(MAIN_DOCUMENT, self.dir)
+
     @property
     def vector_store_dir(self) -> Path:
-        return self.dir / "vector_store"
+        return self.main_shard.vector_store_dir
+
+    @property
+    def bundle_path(self) -> Path:
+        return self.main_shard.bundle_path
+
+    @property
+    def has_bundle(self) -> bool:
+        return self.main_shard.has_bundle
+
+    def shard_dir(self, document: str) -> Path:
+        return self.dir if document == MAIN_DOCUMENT else self.dir / SHARDS_DIRNAME / document
+
+    @property
+    def shards(self) -> List[ShardLocation]:
+        """Indexed shards: the guide root (if indexed) then one per listed document."""
+        shards = [self.main_shard] + [
+            ShardLocation(d["id"], self.shard_dir(d["id"]), d.get("pdf")) for d in self.documents
+        ]
+        return [shard for shard in shards if shard.is_indexed]
+
+    @property
+    def has_vector_index(self) -> bool:
+        return any(s.has_vector_index for s in self.shards)
 
     @property
     def is_indexed(self) -> bool:
-        """Check if FAISS or BM25 index exists."""
-        faiss_ok = (self.vector_store_dir / "index.faiss").exists()
-        bm25_ok = (self.vector_store_dir / "bm25_index.pkl").exists()
-        return faiss_ok or bm25_ok
+        return bool(self.shards)
 
     def to_dict(self) -> dict:
         return {
@@ -60,43 +220,90 @@ class Guide:
         }
 
 
+def manifest_shards(entry: dict):
+    """(label, shard, bundle meta) for every indexed shard of a manifest entry."""
+    guide = Guide(entry["slug"], entry["name"], documents=entry.get("documents"))
+    for shard in guide.shards:
+        if shard.document == MAIN_DOCUMENT:
+            yield entry["slug"], shard, entry
+        else:
+            yield f"{entry['slug']}/{shard.document}", shard, dict(entry, document=shard.document)
+
+
 class GuideManager:
     """Discover and manage pre-indexed guides."""
 
     def __init__(self):
         self.guides: Dict[str, Guide] = {}
+        self._entries: Dict[str, dict] = {}
+        self._manifest_mtime = None
+        self._listeners: List[Callable[[str], None]] = []
+        self._lock = threading.Lock()
         self._load_guides()
 
-    def _load_guides(self):
-        """Load guides from the guides directory manifest."""
-        manifest_path = GUIDES_DIR / "manifest.json"
-        if not manifest_path.exists():
-            return
-
-        with manifest_path.open("r", encoding="utf-8") as f:
-            entries = json.load(f)
+    def _manifest_stamp(self):
+        try:
+            stat = MANIFEST_PATH.stat()
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
 
-        for entry in entries:
-            slug = entry["slug"]
-            self.guides[slug] = Guide(
+    def _load_guides(self):
+        """Load guides from the guides directory manifest (swapped in at once)."""
+        stamp = self._manifest_stamp()
+        entries = {entry["slug"]: entry for entry in read_manifest()} if stamp else {}
+        self.guides = {
+            slug: Guide(
                 slug=slug,
                 name=entry["name"],
                 image=entry.get("image"),
+                options=entry.get("options"),
+                documents=entry.get("documents"),
             )
+            for slug, entry in entries.items()
+        }
+        self._entries = entries
+        self._manifest_mtime = stamp
+        if stamp:
+            print(f"GuideManager: {len(self.guides)} guides loaded")
+
+    def on_change(self, listener: Callable[[str], None]):
+        """Call ``listener(slug)`` for every guide added, replaced or removed on reload."""
+        self._listeners.append(listener)
 
-        print(f"GuideManager: {len(self.guides)} guides loaded")
+    def refresh(self) -> bool:
+        """Reload when manifest.json changed on disk (one stat per call)."""
+        if self._manifest_stamp() == self._manifest_mtime:
+            return False
+        self.reload()
+        return True
 
     def list_guides(self) -> List[dict]:
         """Return all indexed guides as dicts."""
-        return [g.to_dict() for g in self.guides.values() if g.is_indexed]
+        self.refresh()
+        return [g.to_dict() for g in list(self.guides.values()) if g.is_indexed]
 
     def get_guide(self, slug: str) -> Optional[Guide]:
+        self.refresh()
         return self.guides.get(slug)
 
     def reload(self):
         """Re-read from disk."""
-        self.guides.clear()
-        self._load_guides()
+        with self._lock:
+            previous = self._entries
+            try:
+                self._load_guides()
+            except (OSError, ValueError, KeyError) as exc:
+                # Keep serving the previous guides when the manifest is unreadable
+                print(f"GuideManager: cannot reload manifest ({exc})")
+                return
+            changed = [
+                slug for slug in set(previous) | set(self._entries)
+                if previous.get(slug) != self._entries.get(slug)
+            ]
+        for slug in changed:
+            for listener in self._listeners:
+                listener(slug)
 
 
 guide_manager = GuideManager()
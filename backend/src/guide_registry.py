@@ -0,0 +1,274 @@
+"""
+Thread-safe registry of loaded guide chatbots (FAISS + BM25 + chunk store).
+Loads each guide once even under concurrent first requests (per-slug
+single-flight), keeps the resident guides within a memory budget by evicting
+cold ones (LRU or LFU), and remembers guide popularity so the most used
+guides can be prefetched at startup.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+
+from .answer_warming import load_warm_answers
+from .config import (
+    GUIDE_EVICTION,
+    GUIDE_MEMORY_BUDGET_MB,
+    GUIDE_PREFETCH,
+    MEMORY_TRACE_LOADS,
+    RETRIEVAL_SOCKET,
+    WARM_ANSWERS_ENABLED,
+)
+from .guide_manager import GUIDES_DIR, guide_manager
+from .memory_accounting import index_sizes, rss_bytes, session_sizes, tracing
+
+POPULARITY_PATH = GUIDES_DIR / "popularity.json"
+POPULARITY_SAVE_EVERY = 50  # hits between writes of popularity.json
+
+
+def estimate_chatbot_bytes(chatbot) -> Dict[str, int]:
+    """Approximate resident size of a chatbot's indexes (all shards), per component."""
+    return index_sizes(chatbot)
+
+
+class _Resident:
+    def __init__(self, chatbot, load_s: float, load_memory: Optional[dict] = None):
+        self.chatbot = chatbot
+        self.sizes = estimate_chatbot_bytes(chatbot)
+        self.load_memory = load_memory or {}
+        self.loaded_at = time.time()
+        self.last_used = time.monotonic()
+        self.hits = 0
+        self.load_s = load_s
+
+
+class GuideRegistry:
+    def __init__(
+        self,
+        memory_budget_mb: float = GUIDE_MEMORY_BUDGET_MB,
+        eviction: str = GUIDE_EVICTION,
+    ):
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.eviction = eviction if eviction in ("lru", "lfu") else "lru"
+        self._resident: Dict[str, _Resident] = {}
+        self._loading: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.popularity: Dict[str, int] = self._load_popularity()
+        self._hits_since_save = 0
+        self.stats = {"loads": 0, "evictions": 0, "load_waits": 0}
+        # Indexes served by the retrieval service: chatbots only hold spec tables and caches
+        self.remote_retrieval = bool(RETRIEVAL_SOCKET)
+        # A reindexed or removed guide must be reloaded from its new files
+        guide_manager.on_change(self.unload)
+
+    # -- popularity -------------------------------------------------------
+
+    @staticmethod
+    def _load_popularity() -> Dict[str, int]:
+        try:
+            with open(POPULARITY_PATH, "r", encoding="utf-8") as f:
+                return {slug: int(hits) for slug, hits in json.load(f).items()}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def save_popularity(self):
+        with self._lock:
+            data = dict(self.popularity)
+        tmp_path = POPULARITY_PATH.with_suffix(".json.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, POPULARITY_PATH)
+        except OSError as exc:
+            print(f"GuideRegistry: cannot save popularity ({exc})")
+
+    def popular_slugs(self, limit: int = GUIDE_PREFETCH) -> List[str]:
+        with self._lock:
+            ranked = sorted(self.popularity.items(), key=lambda item: item[1], reverse=True)
+        return [slug for slug, _ in ranked if guide_manager.get_guide(slug)][:limit]
+
+    def _record_hit(self, slug: str) -> bool:
+        """Count a request for ``slug``; True when popularity.json is due for a save."""
+        self.popularity[slug] = self.popularity.get(slug, 0) + 1
+        self._hits_since_save += 1
+        if self._hits_since_save >= POPULARITY_SAVE_EVERY:
+            self._hits_since_save = 0
+            return True
+        return False
+
+    # -- loading ----------------------------------------------------------
+
+    def get(self, slug: str, count_hit: bool = True):
+        """Resident chatbot for ``slug``, loading it once if needed."""
+        with self._lock:
+            save_due = self._record_hit(slug) if count_hit else False
+            resident = self._resident.get(slug)
+            if resident is not None:
+                resident.hits += int(count_hit)
+                resident.last_used = time.monotonic()
+                future = None
+            else:
+                future = self._loading.get(slug)
+                leader = future is None
+                if leader:
+                    future = Future()
+                    self._loading[slug] = future
+                else:
+                    self.stats["load_waits"] += 1
+        if save_due:
+            self.save_popularity()
+        if resident is not None:
+            return resident.chatbot
+        if not leader:
+            return future.result()
+
+        try:
+            chatbot = self._load(slug)
+            future.set_result(chatbot)
+            return chatbot
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._loading.pop(slug, None)
+
+    def _load(self, slug: str):
+        if self.remote_retrieval:
+            from .remote_chatbot import RemoteGuideChatbot as GuideChatbot
+        else:
+            from .guide_chatbot import GuideChatbot
+
+        guide = guide_manager.get_guide(slug)
+        if not guide:
+            raise ValueError(f"Guide '{slug}' not found")
+        if not guide.is_indexed:
+            raise ValueError(f"Guide '{slug}' is not indexed yet")
+
+        rss_before = rss_bytes()
+        start = time.perf_counter()
+        with tracing() if MEMORY_TRACE_LOADS else nullcontext():
+            chatbot = GuideChatbot(guide)
+        if WARM_ANSWERS_ENABLED:
+            warmed = load_warm_answers(chatbot)
+            if warmed:
+                print(f"GuideRegistry: {warmed} precomputed answers loaded for '{slug}'")
+        load_s = time.perf_counter() - start
+        rss_after = rss_bytes()
+        load_memory = {}
+        if rss_before is not None and rss_after is not None:
+            # Process-wide: includes whatever other threads allocated meanwhile
+            load_memory["rss_delta"] = rss_after - rss_before
+        if MEMORY_TRACE_LOADS:
+            traced_bytes = {}
+            for shard in chatbot.shards:
+                for component, size in shard.load_bytes.items():
+                    traced_bytes[component] = traced_bytes.get(component, 0) + size
+            load_memory["traced"] = traced_bytes
+        resident = _Resident(chatbot, load_s, load_memory)
+        resident.hits = 1
+        with self._lock:
+            self._resident[slug] = resident
+            self.stats["loads"] += 1
+            evicted = self._evict_over_budget(keep=slug)
+        for name in evicted:
+            print(f"GuideRegistry: evicted '{name}' (memory budget {self.memory_budget // (1024 * 1024)} MB)")
+        return chatbot
+
+    def _evict_over_budget(self, keep: str) -> List[str]:
+        """Drop cold guides until the estimated total fits the budget (lock held)."""
+        evicted = []
+        while self._resident_bytes() > self.memory_budget:
+            candidates = [slug for slug in self._resident if slug != keep]
+            if not candidates:
+                break
+            if self.eviction == "lfu":
+                victim = min(candidates, key=lambda s: (self._resident[s].hits, self._resident[s].last_used))
+            else:
+                victim = min(candidates, key=lambda s: self._resident[s].last_used)
+            del self._resident[victim]
+            self.stats["evictions"] += 1
+            evicted.append(victim)
+        return evicted
+
+    def _resident_bytes(self) -> int:
+        return sum(r.sizes["total"] for r in self._resident.values())
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return self._resident_bytes()
+
+    def memory_report(self) -> List[dict]:
+        """Per resident guide: index sizes, session state sizes and what its load cost."""
+        with self._lock:
+            residents = list(self._resident.items())
+        return [
+            {
+                "slug": slug,
+                "shards": len(r.chatbot.shards),
+                "indexes": r.sizes,
+                "sessions": session_sizes(r.chatbot),
+                "load": r.load_memory,
+            }
+            for slug, r in residents
+        ]
+
+    def unload(self, slug: Optional[str] = None):
+        """Forget one guide (or all); in-flight requests keep their reference."""
+        with self._lock:
+            if slug:
+                self._resident.pop(slug, None)
+            else:
+                self._resident.clear()
+
+    def is_resident(self, slug: str) -> bool:
+        with self._lock:
+            return slug in self._resident
+
+    def prefetch(self, limit: int = GUIDE_PREFETCH) -> List[str]:
+        """Load the most requested guides while they fit the memory budget."""
+        loaded = []
+        for slug in self.popular_slugs(limit):
+            if self.is_resident(slug):
+                continue
+            try:
+                self.get(slug, count_hit=False)
+            except Exception as exc:
+                print(f"GuideRegistry: prefetch of '{slug}' failed ({exc})")
+                continue
+            loaded.append(slug)
+            with self._lock:
+                if self._resident_bytes() >= self.memory_budget:
+                    break
+        return loaded
+
+    def report(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            guides = [
+                {
+                    "slug": slug,
+                    "hits": r.hits,
+                    "idle_s": round(now - r.last_used, 1),
+                    "load_s": round(r.load_s, 3),
+                    "bytes": r.sizes,
+                }
+                for slug, r in self._resident.items()
+            ]
+            return {
+                "resident": sorted(guides, key=lambda g: g["bytes"]["total"], reverse=True),
+                "resident_bytes": self._resident_bytes(),
+                "memory_budget_bytes": self.memory_budget,
+                "eviction": self.eviction,
+                "remote_retrieval": self.remote_retrieval,
+                "loading": list(self._loading),
+                **self.stats,
+            }
+
+
+guide_registry = GuideRegistry()
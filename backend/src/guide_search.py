@@ -0,0 +1,114 @@
+"""
+Federated retrieval across several guides (no LLM call).
+The query is embedded once and the vector is reused for every FAISS index.
+"""
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
+from .config import TOP_K_RESULTS, SEARCH_MAX_WORKERS, SEARCH_SNIPPET_CHARS
+from .guide_manager import guide_manager
+from .guide_chatbot import get_guide_chatbot
+
+# Admission "guide" of /api/search: searches count against the per-worker
+# LLM limits and at most ADMISSION_MAX_PER_GUIDE of them run at once
+SEARCH_ADMISSION_KEY = "_search"
+
+
+def _resolve_slugs(slugs: Optional[Iterable[str]]) -> List[str]:
+    """Keep only known, indexed guides (all of them when slugs is empty)."""
+    if not slugs:
+        return [g["slug"] for g in guide_manager.list_guides()]
+
+    resolved = []
+    for slug in slugs:
+        guide = guide_manager.get_guide(slug)
+        if guide and guide.is_indexed and slug not in resolved:
+            resolved.append(slug)
+    return resolved
+
+
+def _embed_query(query: str) -> Optional[List[float]]:
+    from .vector_store import embed_queries
+
+    try:
+        return embed_queries([query])[0]
+    except Exception as exc:
+        print(f"Federated search: query embedding failed ({exc}), lexical only")
+        return None
+
+
+def _search_guide(
+    slug: str,
+    query: str,
+    k: int,
+    query_vector: Optional[List[float]],
+) -> List[dict]:
+    """Search one guide and normalise its scores to [0, 1]."""
+    guide = guide_manager.get_guide(slug)
+    chatbot = get_guide_chatbot(slug)
+    hits = chatbot.search(
+        query,
+        k=k,
+        query_vector=query_vector,
+        semantic=query_vector is not None,
+    )
+    if not hits:
+        return []
+
+    top_score = max(score for _, score in hits) or 1.0
+    passages = []
+    for doc, score in hits:
+        passages.append({
+            "slug": slug,
+            "vehicle_name": guide.name,
+            "source_file": doc.metadata.get("source_file", "manuel.pdf"),
+            "page": doc.metadata.get("page", "?"),
+            "chunk_index": doc.metadata.get("chunk_index"),
+            "score": round(score / top_score, 4),
+            "text": doc.page_content[:SEARCH_SNIPPET_CHARS],
+        })
+    return passages
+
+
+def federated_search(
+    query: str,
+    slugs: Optional[Iterable[str]] = None,
+    k: int = TOP_K_RESULTS,
+) -> dict:
+    """
+    Search several guides in parallel and merge the ranked passages.
+    Scores are normalised per guide so each guide's best passage scores 1.0.
+    """
+    start = time.perf_counter()
+    targets = _resolve_slugs(slugs)
+
+    query_vector = None
+    if any(guide_manager.get_guide(s).has_vector_index for s in targets):
+        query_vector = _embed_query(query)
+
+    passages: List[dict] = []
+    errors = {}
+    if targets:
+        workers = max(1, min(SEARCH_MAX_WORKERS, len(targets)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                slug: pool.submit(_search_guide, slug, query, k, query_vector)
+                for slug in targets
+            }
+            for slug, future in futures.items():
+                try:
+                    passages.extend(future.result())
+                except Exception as exc:
+                    errors[slug] = str(exc)
+
+    passages.sort(key=lambda p: p["score"], reverse=True)
+    return {
+        "query": query,
+        "guides": targets,
+        "results": passages,
+        "errors": errors,
+        "took_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
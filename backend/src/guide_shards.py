@@ -0,0 +1,129 @@
+"""
+Per-document index shards of a guide. Each shard holds the FAISS index, BM25
+index, chunk store and spec table of one PDF, loaded from its guide.bundle or
+from the loose files in vector_store/ (also when the bundle fails its
+checks). Chunk ids are local to a shard, so a
+hit is identified by (shard number, chunk id); ``adjacency`` links each chunk
+to its neighbours in the PDF. While a load is traced, ``load_bytes`` holds
+the Python/numpy bytes each component allocated.
+"""
+from __future__ import annotations
+
+import pickle
+from typing import List, Optional, Tuple
+
+from .chunk_adjacency import ChunkAdjacency
+from .chunk_store import InMemoryChunks, load_chunks
+from .config import BUNDLE_VERIFY_ON_LOAD
+from .guide_bundle import BundleError, GuideBundle
+from .guide_manager import ShardLocation
+from .memory_accounting import traced
+from .spec_tables import SpecIndex
+from .vector_index import VectorIndex
+
+
+class IndexShard:
+    """Indexes of one document of a guide."""
+
+    def __init__(self, location: ShardLocation, label: str):
+        self.location = location
+        self.document = location.document
+        self.label = label  # "<slug>" or "<slug>/<document>" in log messages
+        self.load_bytes = {}
+        loaded = False
+        if location.has_bundle:
+            try:
+                self._load_bundle()
+                loaded = True
+            except (OSError, BundleError) as exc:
+                print(f"GuideChatbot: unusable bundle for {self.label} ({exc}), loose files used")
+        if not loaded:
+            with traced(self.load_bytes, "faiss"):
+                self.vector_store = self._load_vector_store()
+            with traced(self.load_bytes, "bm25"):
+                self.bm25_index, legacy_chunks = self._load_bm25()
+            with traced(self.load_bytes, "chunks"):
+                self.chunks = load_chunks(location.vector_store_dir, legacy_chunks)
+                self.adjacency = ChunkAdjacency.load(location.vector_store_dir)
+            with traced(self.load_bytes, "specs"):
+                self.spec_index = SpecIndex.load(location.vector_store_dir)
+        self._check_vector_ids()
+        self._check_adjacency()
+
+    def _load_bundle(self):
+        """All indexes from the single-file guide.bundle (one mapping, read in place)."""
+        # Raises BundleError on a corrupted header, table or (BUNDLE_VERIFY_ON_LOAD) section
+        bundle = GuideBundle(self.location.bundle_path, verify=BUNDLE_VERIFY_ON_LOAD)
+        with traced(self.load_bytes, "faiss"):
+            try:
+                self.vector_store = bundle.vector_index()
+            except Exception as exc:
+                print(f"GuideChatbot: cannot load FAISS index for {self.label}: {exc}")
+                self.vector_store = None
+        with traced(self.load_bytes, "bm25"):
+            self.bm25_index = bundle.bm25()
+        with traced(self.load_bytes, "chunks"):
+            self.chunks = bundle.chunk_store() or InMemoryChunks([])
+            self.adjacency = bundle.chunk_adjacency()
+        with traced(self.load_bytes, "specs"):
+            self.spec_index = bundle.spec_index()
+
+    def _load_vector_store(self) -> Optional[VectorIndex]:
+        try:
+            return VectorIndex.load(self.location.vector_store_dir)
+        except Exception as exc:
+            print(f"GuideChatbot: cannot load FAISS index for {self.label}: {exc}")
+            return None
+
+    def _load_bm25(self):
+        bm25_path = self.location.vector_store_dir / "bm25_index.pkl"
+        if not bm25_path.exists():
+            return None, []
+        try:
+            with open(bm25_path, "rb") as f:
+                data = pickle.load(f)
+            # Indexes with a chunk store no longer keep the chunks in the pickle
+            return data["bm25"], data.get("chunks") or []
+        except Exception:
+            return None, []
+
+    def _check_vector_ids(self):
+        if self.vector_store and int(self.vector_store.row_to_chunk.max(initial=-1)) >= len(self.chunks):
+            print(
+                f"GuideChatbot: FAISS ids exceed the {len(self.chunks)} chunks of {self.label} "
+                "(run 'python -m migrate_indexes'), semantic search disabled"
+            )
+            self.vector_store = None
+
+    def _check_adjacency(self):
+        # Indexes written before the adjacency was persisted: built from the chunks
+        # (python -m migrate_indexes writes it to disk)
+        if self.adjacency is not None and len(self.adjacency) != len(self.chunks):
+            print(f"GuideChatbot: stale chunk adjacency for {self.label}, rebuilt from the chunks")
+            self.adjacency = None
+        if self.adjacency is None and len(self.chunks) > 0:
+            with traced(self.load_bytes, "chunks"):
+                self.adjacency = ChunkAdjacency.from_chunks(self.chunks)
+
+    @property
+    def has_lexical(self) -> bool:
+        return bool(self.bm25_index) and len(self.chunks) > 0
+
+    def semantic(self, query_vectors: List[List[float]], k: int) -> List[List[Tuple[int, float]]]:
+        """FAISS hits per query as (chunk id, L2 distance)."""
+        if not self.vector_store:
+            return [[] for _ in query_vectors]
+        return self.vector_store.search(query_vectors, k)
+
+    def lexical(self, tokens: List[str], k: int) -> Tuple[List[Tuple[int, float]], float]:
+        """Top-k BM25 hits as (chunk id, raw score), plus the shard's best score."""
+        if not tokens or not self.has_lexical:
+            return [], 0.0
+        scores = self.bm25_index.get_scores(tokens)
+        top_indices = sorted(
+            range(len(scores)),
+            key=lambda i: scores[i],
+            reverse=True,
+        )[:k]
+        hits = [(int(idx), float(scores[idx])) for idx in top_indices if scores[idx] > 0]
+        return hits, float(max(scores)) if len(scores) > 0 else 0.0
@@ -0,0 +1,257 @@
+"""
+Background indexing jobs for uploaded manuals. POST /api/guides saves the PDF
+under manuel/ and enqueues a job on a bounded process pool running the
+index_single_manual stages. The job state lives in data/jobs/<id>.json,
+written by the indexing process after each stage, so any gunicorn worker can
+report progress; the finished guide is added to manifest.json, which every
+worker re-reads on its next request (no restart needed). A job for one
+document of a multi-document guide rebuilds only that document's shard.
+"""
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from .admission import Overloaded
+from .config import INDEXING_MAX_PENDING, INDEXING_MAX_WORKERS, JOBS_DIR, JOBS_KEEP
+from .guide_manager import guide_manager, upsert_manifest_document, upsert_manifest_entry
+
+PDF_MAGIC = b"%PDF-"
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+BACKEND_DIR = Path(__file__).parent.parent
+MANUALS_DIR = BACKEND_DIR.parent / "manuel"
+IMAGES_DIR = MANUALS_DIR / "voiture"
+
+ACTIVE_STATES = ("queued", "running")
+PENDING_RETRY_AFTER_S = 60
+_JOB_ID = re.compile(r"^[0-9a-f]{12}$")
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _job_path(job_id: str) -> Path:
+    return JOBS_DIR / f"{job_id}.json"
+
+
+def write_job(job: dict):
+    JOBS_DIR.mkdir(parents=True, exist_ok=True)
+    job["updated_at"] = _now()
+    path = _job_path(job["id"])
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(job, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid or os.name != "posix":
+        return True  # cannot tell: assume the owner is still there
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_job(job_id: str) -> Optional[dict]:
+    """Job state, None for an unknown id. Jobs whose web worker died are marked failed."""
+    if not _JOB_ID.match(job_id or ""):
+        return None
+    try:
+        with open(_job_path(job_id), "r", encoding="utf-8") as f:
+            job = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if job["status"] in ACTIVE_STATES and not _pid_alive(job.get("owner_pid")):
+        job.update(status="failed", error="Indexation interrompue (processus arrete)", finished_at=_now())
+        write_job(job)
+    return job
+
+
+def list_jobs(limit: int = 20) -> List[dict]:
+    if not JOBS_DIR.exists():
+        return []
+    paths = sorted(JOBS_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    jobs = (read_job(p.stem) for p in paths[:limit])
+    return [job for job in jobs if job]
+
+
+def _prune_jobs():
+    """Keep the JOBS_KEEP most recent finished jobs."""
+    paths = sorted(JOBS_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in paths[JOBS_KEEP:]:
+        job = read_job(path.stem)
+        if job and job["status"] not in ACTIVE_STATES:
+            path.unlink(missing_ok=True)
+
+
+def save_upload(upload, directory: Path, filename: str, magic: Optional[bytes] = None) -> Path:
+    """Store an uploaded file (werkzeug FileStorage) atomically; checks its magic bytes."""
+    head = upload.stream.read(len(magic or b""))
+    if magic and head != magic:
+        raise ValueError(f"{filename}: format de fichier invalide")
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / filename
+    tmp_path = directory / f".{filename}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(head)
+        while True:
+            block = upload.stream.read(1024 * 1024)
+            if not block:
+                break
+            f.write(block)
+    os.replace(tmp_path, path)
+    return path
+
+
+def run_job(
+    job_id: str,
+    pdf_path: str,
+    name: str,
+    image: Optional[str],
+    options: Optional[dict],
+    document: Optional[str] = None,
+) -> str:
+    """Indexing process entry point: runs the stages and publishes the guide (or document)."""
+    from index_manuals import INDEX_STAGES, index_single_manual
+
+    job = read_job(job_id)
+    job.update(status="running", started_at=_now(), pid=os.getpid())
+    write_job(job)
+
+    def progress(stage: str, fraction: float, message: str):
+        position = INDEX_STAGES.index(stage)
+        job.update(
+            stage=stage,
+            stage_index=position + 1,
+            progress=round((position + fraction) / len(INDEX_STAGES), 3),
+            message=message,
+        )
+        write_job(job)
+
+    try:
+        result = index_single_manual(Path(pdf_path), name, image, options, progress=progress, document=document)
+        if not result:
+            raise RuntimeError("Aucun passage exploitable dans le PDF")
+        if document:
+            upsert_manifest_document(result["slug"], name, result["document"], image)
+        else:
+            if options:
+                result["options"] = options
+            upsert_manifest_entry(result)
+        job.update(status="done", progress=1.0, message="Guide publie", result=result)
+    except Exception as exc:
+        job.update(status="failed", error=str(exc))
+    job["finished_at"] = _now()
+    write_job(job)
+    return job["status"]
+
+
+class IndexingJobs:
+    """Bounded process pool for indexing jobs (one pool per web worker)."""
+
+    def __init__(self, max_workers: int = INDEXING_MAX_WORKERS, max_pending: int = INDEXING_MAX_PENDING):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.stats = {"submitted": 0, "done": 0, "failed": 0, "rejected": 0}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: never fork a web worker holding threads, sockets and FAISS state
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    @staticmethod
+    def active_jobs() -> List[dict]:
+        """Queued or running jobs of every worker."""
+        return [job for job in list_jobs(limit=JOBS_KEEP) if job["status"] in ACTIVE_STATES]
+
+    def check_capacity(self, slug: str):
+        """Raise Overloaded when too many jobs are pending, ValueError when ``slug`` is being indexed."""
+        active = self.active_jobs()
+        if len(active) >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise Overloaded("file d'indexation pleine", PENDING_RETRY_AFTER_S)
+        if any(job["slug"] == slug for job in active):
+            raise ValueError(f"Une indexation de '{slug}' est deja en cours")
+
+    def submit(
+        self,
+        pdf_path: Path,
+        name: str,
+        slug: str,
+        image: Optional[str] = None,
+        document: Optional[str] = None,
+    ) -> dict:
+        """Enqueue an indexing job (same errors as check_capacity); ``document``: shard id."""
+        with self._lock:
+            self.check_capacity(slug)
+
+            existing = guide_manager.get_guide(slug)
+            job = {
+                "id": uuid.uuid4().hex[:12],
+                "slug": slug,
+                "name": name,
+                "document": document,
+                "pdf": Path(pdf_path).name,
+                "status": "queued",
+                "stage": None,
+                "stage_index": 0,
+                "progress": 0.0,
+                "message": "En attente",
+                "error": None,
+                "created_at": _now(),
+                "owner_pid": os.getpid(),
+            }
+            write_job(job)
+            options = existing.options if existing and existing.options else None
+            future = self._executor().submit(run_job, job["id"], str(pdf_path), name, image, options, document)
+            self.stats["submitted"] += 1
+        future.add_done_callback(lambda f, job_id=job["id"]: self._finished(job_id, f))
+        _prune_jobs()
+        return job
+
+    def _finished(self, job_id: str, future):
+        error = future.exception()
+        if error is not None:
+            # The indexing process died (BrokenProcessPool, out of memory...)
+            job = read_job(job_id) or {"id": job_id}
+            job.update(status="failed", error=f"Processus d'indexation arrete: {error}", finished_at=_now())
+            write_job(job)
+            with self._lock:
+                if self._pool is not None:
+                    self._pool.shutdown(wait=False)
+                self._pool = None
+        status = "done" if error is None and future.result() == "done" else "failed"
+        self.stats[status] += 1
+        # Publish in this worker right away; the others see the new manifest on their next request
+        guide_manager.refresh()
+
+    def metrics(self) -> dict:
+        return dict(
+            self.stats,
+            max_workers=self.max_workers,
+            max_pending=self.max_pending,
+            active=len(self.active_jobs()),
+        )
+
+
+indexing_jobs = IndexingJobs()
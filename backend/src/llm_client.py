@@ -0,0 +1,318 @@
+"""
+Process-wide Gemini client shared by every guide: one pooled HTTP client
+(keep-alive connections), per-call deadlines, optional hedged requests and a
+circuit breaker per operation. LLM_BASE_URL points it at another endpoint
+speaking the Gemini REST API, e.g. a local fake server in tests.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, List, Optional
+
+from google import genai
+from google.genai import types
+
+from .config import (
+    BREAKER_COOLDOWN_S,
+    BREAKER_ERROR_RATE,
+    BREAKER_MIN_CALLS,
+    BREAKER_WINDOW_S,
+    EMBEDDING_MODEL,
+    EMBEDDING_TIMEOUT_S,
+    LLM_BASE_URL,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_MIN_DELAY_S,
+    LLM_HEDGE_PERCENTILE,
+    LLM_TIMEOUT_S,
+    require_google_api_key,
+)
+
+LATENCY_SAMPLES = 200
+MIN_HEDGE_SAMPLES = 20
+HEDGE_MAX_WORKERS = 8
+EMBED_BATCH_SIZE = 100  # embed_content limit per request
+
+
+class UpstreamError(RuntimeError):
+    """The Gemini API failed or timed out."""
+
+
+class UpstreamTimeout(UpstreamError):
+    """The call exceeded its deadline."""
+
+
+class CircuitOpenError(UpstreamError):
+    """The circuit breaker rejected the call without reaching the API."""
+
+
+def _is_timeout(exc: BaseException) -> bool:
+    return isinstance(exc, TimeoutError) or "Timeout" in type(exc).__name__
+
+
+def _timeout_ms(seconds: float) -> int:
+    return max(1, int(seconds * 1000))
+
+
+class LatencyTracker:
+    """Recent successful call latencies, used to pick the hedging delay."""
+
+    def __init__(self, size: int = LATENCY_SAMPLES):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < MIN_HEDGE_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class CircuitBreaker:
+    """
+    Closed -> open when the error rate over the last BREAKER_WINDOW_S seconds
+    reaches BREAKER_ERROR_RATE (with at least BREAKER_MIN_CALLS calls).
+    After BREAKER_COOLDOWN_S one trial call is let through (half-open): success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        error_rate: float = BREAKER_ERROR_RATE,
+        min_calls: int = BREAKER_MIN_CALLS,
+        window_s: float = BREAKER_WINDOW_S,
+        cooldown_s: float = BREAKER_COOLDOWN_S,
+    ):
+        self.name = name
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.window_s = window_s
+        self.cooldown_s = cooldown_s
+        self.state = "closed"
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._outcomes = deque()  # (timestamp, ok)
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window_s:
+            self._outcomes.popleft()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown_s:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record(self, ok: bool):
+        now = time.monotonic()
+        with self._lock:
+            if self.state == "half_open":
+                self._trial_running = False
+                if ok:
+                    self.state = "closed"
+                    self._outcomes.clear()
+                else:
+                    self._open(now)
+                return
+
+            self._outcomes.append((now, ok))
+            self._prune(now)
+            failures = sum(1 for _, success in self._outcomes if not success)
+            if (
+                self.state == "closed"
+                and len(self._outcomes) >= self.min_calls
+                and failures / len(self._outcomes) >= self.error_rate
+            ):
+                self._open(now)
+
+    def _open(self, now: float):
+        self.state = "open"
+        self._opened_at = now
+        print(f"Circuit breaker '{self.name}' opened for {self.cooldown_s:.0f}s")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._prune(time.monotonic())
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                "state": self.state,
+                "window_calls": len(self._outcomes),
+                "window_failures": failures,
+            }
+
+
+class GeminiClient:
+    """Shared genai client wrapped with deadlines, hedging and circuit breakers."""
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = LLM_BASE_URL,
+        timeout_s: float = LLM_TIMEOUT_S,
+        embed_timeout_s: float = EMBEDDING_TIMEOUT_S,
+        hedge: bool = LLM_HEDGE_ENABLED,
+    ):
+        self.timeout_s = timeout_s
+        self.embed_timeout_s = embed_timeout_s
+        self.hedge = hedge
+        self._client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(base_url=base_url, timeout=int(timeout_s * 1000)),
+        )
+        self.breakers = {"generate": CircuitBreaker("generate"), "embed": CircuitBreaker("embed")}
+        self.latency = {"generate": LatencyTracker(), "embed": LatencyTracker()}
+        self.stats = {
+            kind: {"calls": 0, "failures": 0, "rejected": 0, "hedged": 0, "hedge_wins": 0}
+            for kind in self.breakers
+        }
+        self._stats_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="llm-hedge")
+
+    def _count(self, kind: str, field: str):
+        with self._stats_lock:
+            self.stats[kind][field] += 1
+
+    def _hedge_delay(self, kind: str) -> Optional[float]:
+        if not self.hedge:
+            return None
+        p = self.latency[kind].percentile(LLM_HEDGE_PERCENTILE)
+        return None if p is None else max(p, LLM_HEDGE_MIN_DELAY_S)
+
+    def _hedged(self, kind: str, fn: Callable[[float], object], timeout_s: float):
+        """
+        fn(timeout_s), plus a duplicate request when the first one is slower
+        than the usual p95; the duplicate only gets the time left to the first.
+        """
+        delay = self._hedge_delay(kind)
+        if delay is None or delay >= timeout_s:
+            return fn(timeout_s)
+
+        started = time.monotonic()
+        primary = self._pool.submit(fn, timeout_s)
+        done, _ = wait([primary], timeout=delay)
+        remaining = timeout_s - (time.monotonic() - started)
+        if done or remaining <= 0:
+            return primary.result()
+
+        self._count(kind, "hedged")
+        backup = self._pool.submit(fn, remaining)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        self._count(kind, "hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _call(self, kind: str, fn: Callable[[float], object], timeout_s: float):
+        breaker = self.breakers[kind]
+        if not breaker.allow():
+            self._count(kind, "rejected")
+            raise CircuitOpenError(f"{kind}: upstream circuit open, call skipped")
+
+        self._count(kind, "calls")
+        start = time.perf_counter()
+        try:
+            result = self._hedged(kind, fn, timeout_s)
+        except Exception as exc:
+            breaker.record(False)
+            self._count(kind, "failures")
+            error_class = UpstreamTimeout if _is_timeout(exc) else UpstreamError
+            raise error_class(f"{kind} failed: {exc}") from exc
+        breaker.record(True)
+        self.latency[kind].add(time.perf_counter() - start)
+        return result
+
+    def generate(self, prompt: str, model: str, timeout_s: Optional[float] = None) -> str:
+        """Generate text; raises UpstreamError (UpstreamTimeout, CircuitOpenError) on failure."""
+        if timeout_s is None or timeout_s > self.timeout_s:
+            timeout_s = self.timeout_s
+
+        def call(call_timeout_s: float):
+            config = types.GenerateContentConfig(
+                http_options=types.HttpOptions(timeout=_timeout_ms(call_timeout_s))
+            )
+            response = self._client.models.generate_content(
+                model=model, contents=prompt, config=config
+            )
+            return getattr(response, "text", "") or ""
+
+        return self._call("generate", call, timeout_s)
+
+    def embed(
+        self,
+        texts: List[str],
+        task_type: str = "RETRIEVAL_QUERY",
+        model: str = EMBEDDING_MODEL,
+        timeout_s: Optional[float] = None,
+    ) -> List[List[float]]:
+        """
+        Embed texts in batches of EMBED_BATCH_SIZE through the shared client.
+        ``timeout_s`` bounds the whole call: each batch gets the time left.
+        """
+        if timeout_s is None or timeout_s > self.embed_timeout_s:
+            timeout_s = self.embed_timeout_s
+        deadline = time.monotonic() + timeout_s
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            batch = texts[start:start + EMBED_BATCH_SIZE]
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise UpstreamTimeout(f"embed: {timeout_s:.1f}s deadline spent after {start} of {len(texts)} texts")
+
+            def call(call_timeout_s: float, batch=batch):
+                config = types.EmbedContentConfig(
+                    task_type=task_type,
+                    http_options=types.HttpOptions(timeout=_timeout_ms(call_timeout_s)),
+                )
+                result = self._client.models.embed_content(model=model, contents=batch, config=config)
+                return [list(e.values) for e in result.embeddings]
+
+            vectors.extend(self._call("embed", call, remaining))
+        return vectors
+
+    def status(self) -> dict:
+        with self._stats_lock:
+            stats = {kind: dict(values) for kind, values in self.stats.items()}
+        for kind, breaker in self.breakers.items():
+            stats[kind]["breaker"] = breaker.snapshot()
+            p95 = self.latency[kind].percentile(95)
+            stats[kind]["p95_ms"] = None if p95 is None else round(p95 * 1000)
+        return stats
+
+
+_client: Optional[GeminiClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> GeminiClient:
+    """The process-wide client, created on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GeminiClient(api_key=require_google_api_key())
+    return _client
+
+
+def llm_status() -> Optional[dict]:
+    """Client metrics, or None while no upstream call has been prepared."""
+    return _client.status() if _client is not None else None
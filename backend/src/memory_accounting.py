@@ -0,0 +1,172 @@
+"""
+Memory accounting for capacity planning: what each loaded guide costs, per
+component, and how the process RSS evolves.
+- deep_size() walks Python object graphs (BM25 dicts, spec tables, chat
+  answer cache); FAISS vectors live in C++ and are counted from their shape.
+- traced() measures the Python/numpy allocations of a block with tracemalloc,
+  only while a guide load is being traced (MEMORY_TRACE_LOADS).
+- RssMonitor samples the process RSS every MEMORY_SAMPLE_S.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Dict, Optional
+
+from .config import MEMORY_HISTORY_SIZE, MEMORY_SAMPLE_S
+
+_OPAQUE = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType, memoryview)
+_SCALARS = (str, bytes, bytearray, int, float, bool)
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size (Linux /proc), else the peak from getrusage, else None."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports KiB
+
+
+def deep_size(obj, seen: Optional[set] = None) -> int:
+    """Bytes of ``obj`` and everything it references (each object counted once in ``seen``)."""
+    seen = set() if seen is None else seen
+    numpy = sys.modules.get("numpy")  # not imported here: api.py loads this module at startup
+    leaves = _SCALARS + ((numpy.ndarray, numpy.generic) if numpy else ())
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if item is None or id(item) in seen or isinstance(item, _OPAQUE):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)  # includes the buffer of arrays that own their data
+        if isinstance(item, leaves):
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+        else:
+            if hasattr(item, "__dict__"):
+                stack.append(vars(item))
+            for slot in getattr(type(item), "__slots__", ()):
+                stack.append(getattr(item, slot, None))
+    return total
+
+
+def faiss_bytes(index) -> int:
+    """Vectors (float32) + row -> chunk map + reducer of a VectorIndex."""
+    if index is None:
+        return 0
+    return index.ntotal * index.dim * 4 + index.row_to_chunk.nbytes + index.reducer.nbytes
+
+
+def index_sizes(chatbot) -> Dict[str, int]:
+    """Resident size of a chatbot's indexes (all shards), per component, plus "total"."""
+    seen: set = set()
+    sizes = {"faiss": 0, "bm25": 0, "chunks": 0, "specs": 0}
+    for shard in chatbot.shards:
+        sizes["faiss"] += faiss_bytes(shard.vector_store)
+        sizes["bm25"] += deep_size(shard.bm25_index, seen)
+        sizes["chunks"] += shard.chunks.nbytes + (shard.adjacency.nbytes if shard.adjacency else 0)
+    sizes["specs"] = deep_size(chatbot.spec_index, seen)
+    sizes["total"] = sum(sizes.values())
+    return sizes
+
+
+def session_sizes(chatbot) -> Dict[str, int]:
+    """Answer cache, which grows with traffic (not part of the eviction estimate)."""
+    with chatbot._cache_lock:
+        cache = dict(chatbot.answer_cache)
+    return {"answer_cache": deep_size(cache)}
+
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_started_here = False
+
+
+@contextmanager
+def tracing():
+    """Keep tracemalloc running for the block (started by the first user, stopped by the last)."""
+    global _tracing_users, _started_here
+    with _tracing_lock:
+        if _tracing_users == 0:
+            # Already on (python -X tracemalloc ...): leave it running afterwards
+            _started_here = not tracemalloc.is_tracing()
+            if _started_here:
+                tracemalloc.start()
+        _tracing_users += 1
+    try:
+        yield
+    finally:
+        with _tracing_lock:
+            _tracing_users -= 1
+            if _tracing_users == 0 and _started_here:
+                tracemalloc.stop()
+                _started_here = False
+
+
+@contextmanager
+def traced(into: Dict[str, int], key: str):
+    """Add the net bytes allocated by the block (>= 0) to ``into[key]`` (no-op unless tracing)."""
+    if not tracemalloc.is_tracing():
+        yield
+        return
+    before = tracemalloc.get_traced_memory()[0]
+    try:
+        yield
+    finally:
+        into[key] = into.get(key, 0) + max(0, tracemalloc.get_traced_memory()[0] - before)
+
+
+class RssMonitor:
+    """Samples the process RSS (and the registry's estimate) into a bounded history."""
+
+    def __init__(self, interval_s: float = MEMORY_SAMPLE_S, size: int = MEMORY_HISTORY_SIZE):
+        self.interval_s = interval_s
+        self.history: "deque[dict]" = deque(maxlen=max(1, size))
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None and self.interval_s > 0:
+            self._thread = threading.Thread(target=self._run, name="rss-monitor", daemon=True)
+            self._thread.start()
+
+    def sample(self) -> dict:
+        from .guide_registry import guide_registry
+
+        point = {
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "rss_bytes": rss_bytes(),
+            "guides_bytes": guide_registry.resident_bytes(),
+        }
+        self.history.append(point)
+        return point
+
+    def _run(self):
+        while True:
+            self.sample()
+            time.sleep(self.interval_s)
+
+
+rss_monitor = RssMonitor()
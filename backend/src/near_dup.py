@@ -0,0 +1,166 @@
+"""
+Near-duplicate chunk elimination (MinHash + LSH) for index time.
+Manuals repeat warning boxes, legal notices and multilingual boilerplate on
+many pages: chunks whose word 5-gram Jaccard similarity reaches the threshold
+are clustered, and only one canonical copy is kept, carrying the union of the
+cluster's page references. Chunks that do not quote the same numbers are
+never merged: spec tables of two engine versions can share almost all their
+words and differ only in their values.
+"""
+from __future__ import annotations
+
+import re
+import zlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from .config import DEDUP_THRESHOLD
+from .text_chunker import _format_pages
+
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+BANDS = 32  # 4 rows per band: pairs at Jaccard 0.85 collide with p > 0.99
+_MERSENNE = (1 << 61) - 1
+_WORD = re.compile(r"[a-zà-ÿ0-9]+")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def _shingles(text: str) -> np.ndarray:
+    words = _WORD.findall(text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    # crc32, not hash(): stable across processes (PYTHONHASHSEED)
+    return np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64))
+
+
+def _permutations(seed: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+    return a, b
+
+
+def minhash(shingles: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """NUM_PERM-long signature: min over shingles of (a*x + b) mod 2^61-1."""
+    if len(shingles) == 0:
+        return np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    # a, x < 2^32, so a*x + b fits in 64 bits
+    return ((np.outer(shingles, a) + b) % _MERSENNE).min(axis=0)
+
+
+def _numbers(text: str) -> frozenset:
+    return frozenset(n.replace(",", ".") for n in _NUMBER.findall(text))
+
+
+def _jaccard(x: np.ndarray, y: np.ndarray) -> float:
+    if len(x) == 0 and len(y) == 0:
+        return 1.0
+    inter = len(np.intersect1d(x, y, assume_unique=True))
+    return inter / (len(x) + len(y) - inter)
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def parse_pages(value) -> List[int]:
+    """Page numbers from the chunk 'page' field: 12, '12-14' or '12, 15, 18'."""
+    pages = []
+    for part in str(value).split(","):
+        part = part.strip()
+        if "-" in part:
+            start, _, end = part.partition("-")
+            if start.strip().isdigit() and end.strip().isdigit():
+                pages.extend(range(int(start), int(end) + 1))
+        elif part.isdigit():
+            pages.append(int(part))
+    return pages
+
+
+def find_clusters(texts: List[str], threshold: float = DEDUP_THRESHOLD) -> List[List[int]]:
+    """
+    Groups (of 2+ indexes) of texts whose shingle Jaccard similarity reaches
+    ``threshold`` and which contain the same numbers.
+    """
+    a, b = _permutations()
+    shingles = [_shingles(t) for t in texts]
+    numbers = [_numbers(t) for t in texts]
+    signatures = np.array([minhash(s, a, b) for s in shingles]) if texts else np.empty((0, NUM_PERM))
+
+    rows = NUM_PERM // BANDS
+    uf = _UnionFind(len(texts))
+    checked = set()
+    for band in range(BANDS):
+        buckets: Dict[bytes, List[int]] = {}
+        for i, signature in enumerate(signatures):
+            buckets.setdefault(signature[band * rows:(band + 1) * rows].tobytes(), []).append(i)
+        for members in buckets.values():
+            for j in members[1:]:
+                pair = (members[0], j)
+                if pair in checked or uf.find(j) == uf.find(members[0]):
+                    continue
+                checked.add(pair)
+                # LSH only proposes candidates: confirm on the exact shingle sets
+                if numbers[members[0]] != numbers[j]:
+                    continue
+                if _jaccard(shingles[members[0]], shingles[j]) >= threshold:
+                    uf.union(members[0], j)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(texts)):
+        groups.setdefault(uf.find(i), []).append(i)
+    return [g for g in groups.values() if len(g) > 1]
+
+
+def dedup_chunks(
+    chunks: List[Document], threshold: float = DEDUP_THRESHOLD
+) -> Tuple[List[Document], dict]:
+    """
+    Keep one canonical chunk per near-duplicate cluster (the longest text, the
+    first one on ties) with the union of the cluster's pages. Order is kept;
+    chunks of different source files are never merged.
+    """
+    chunks = list(chunks)
+    by_source: Dict[str, List[int]] = {}
+    for i, chunk in enumerate(chunks):
+        by_source.setdefault(chunk.metadata.get("source_file", ""), []).append(i)
+    clusters = [
+        [ids[i] for i in cluster]
+        for ids in by_source.values()
+        for cluster in find_clusters([chunks[i].page_content for i in ids], threshold)
+    ]
+    drop = set()
+    for cluster in clusters:
+        canonical = max(cluster, key=lambda i: (len(chunks[i].page_content), -i))
+        pages = sorted({p for i in cluster for p in parse_pages(chunks[i].metadata.get("page", ""))})
+        chunks[canonical] = Document(
+            page_content=chunks[canonical].page_content,
+            metadata=dict(chunks[canonical].metadata, page=_format_pages(pages)),
+        )
+        drop.update(i for i in cluster if i != canonical)
+
+    kept = [c for i, c in enumerate(chunks) if i not in drop]
+    return kept, {
+        "chunks_in": len(chunks),
+        "chunks_out": len(kept),
+        "clusters": len(clusters),
+        "embeddings_saved": len(drop),
+        "text_bytes_saved": sum(len(chunks[i].page_content.encode("utf-8")) for i in drop),
+        "threshold": threshold,
+    }
@@ -0,0 +1,203 @@
+"""
+PDF text extraction with interchangeable backends: pypdfium2 (PDFium, C++,
+fastest), pypdf (pure Python, always installed) and pdfminer.six (pure
+Python, slowest, kept as a last resort). "auto" picks the first installed
+backend in EXTRACTOR_ORDER; a page the chosen backend cannot read is retried
+with the next ones, so one bad page never loses the manual.
+"""
+from __future__ import annotations
+
+import importlib.util
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from .config import PDF_EXTRACTOR
+
+_CRLF = re.compile(r"\r\n?")
+
+
+class PdfExtractor:
+    """One backend: ``open(path)`` returns a document with ``page_count`` and ``text(i)``."""
+
+    name = ""
+    module = ""
+
+    @classmethod
+    def available(cls) -> bool:
+        return importlib.util.find_spec(cls.module) is not None
+
+    def open(self, path: Path):
+        raise NotImplementedError
+
+
+class _PypdfDocument:
+    def __init__(self, path: Path):
+        from pypdf import PdfReader
+
+        self._reader = PdfReader(str(path))
+        self.page_count = len(self._reader.pages)
+
+    def text(self, i: int) -> str:
+        return self._reader.pages[i].extract_text() or ""
+
+    def close(self):
+        pass
+
+
+class PypdfExtractor(PdfExtractor):
+    name = "pypdf"
+    module = "pypdf"
+
+    def open(self, path: Path):
+        return _PypdfDocument(path)
+
+
+class _PdfiumDocument:
+    def __init__(self, path: Path):
+        import pypdfium2
+
+        self._pdf = pypdfium2.PdfDocument(str(path))
+        self.page_count = len(self._pdf)
+
+    def text(self, i: int) -> str:
+        page = self._pdf[i]
+        try:
+            textpage = page.get_textpage()
+            try:
+                return _CRLF.sub("\n", textpage.get_text_range())
+            finally:
+                textpage.close()
+        finally:
+            page.close()
+
+    def close(self):
+        self._pdf.close()
+
+
+class PdfiumExtractor(PdfExtractor):
+    name = "pdfium"
+    module = "pypdfium2"
+
+    def open(self, path: Path):
+        return _PdfiumDocument(path)
+
+
+class _PdfminerDocument:
+    def __init__(self, path: Path):
+        from pdfminer.converter import PDFPageAggregator
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+
+        self._file = open(path, "rb")
+        self._pages = list(PDFPage.get_pages(self._file))
+        self.page_count = len(self._pages)
+        manager = PDFResourceManager(caching=True)
+        self._device = PDFPageAggregator(manager, laparams=LAParams())
+        self._interpreter = PDFPageInterpreter(manager, self._device)
+
+    def text(self, i: int) -> str:
+        from pdfminer.layout import LTTextContainer
+
+        self._interpreter.process_page(self._pages[i])
+        layout = self._device.get_result()
+        return "".join(item.get_text() for item in layout if isinstance(item, LTTextContainer))
+
+    def close(self):
+        self._file.close()
+
+
+class PdfminerExtractor(PdfExtractor):
+    name = "pdfminer"
+    module = "pdfminer"
+
+    def open(self, path: Path):
+        return _PdfminerDocument(path)
+
+
+EXTRACTORS: Dict[str, PdfExtractor] = {
+    e.name: e for e in (PdfiumExtractor(), PypdfExtractor(), PdfminerExtractor())
+}
+EXTRACTOR_ORDER = ("pdfium", "pypdf", "pdfminer")
+
+
+def available_extractors() -> List[str]:
+    return [name for name in EXTRACTOR_ORDER if EXTRACTORS[name].available()]
+
+
+def _backend_chain(backend: str) -> List[str]:
+    """Preferred backend first, then the other installed ones as fallbacks."""
+    installed = available_extractors()
+    if backend in ("", "auto"):
+        return installed
+    if backend not in EXTRACTORS:
+        raise ValueError(f"Unknown PDF extractor '{backend}' (choices: {', '.join(EXTRACTORS)}, auto)")
+    if backend not in installed:
+        print(f"PDF extractor '{backend}' not installed, using {installed[0]}")
+        return installed
+    return [backend] + [name for name in installed if name != backend]
+
+
+def extract_pages(
+    pdf_path: Path,
+    backend: str = PDF_EXTRACTOR,
+    fallback: bool = True,
+) -> Tuple[List[Tuple[int, str]], dict]:
+    """
+    (page number, text) for every page, plus stats: backend used, pages
+    recovered by a fallback backend, unreadable pages and pages/s.
+    """
+    pdf_path = Path(pdf_path)
+    chain = _backend_chain(backend)
+    if not fallback:
+        chain = chain[:1]
+
+    documents = {}
+    broken = set()  # fallback backends that cannot open this file
+    start = time.perf_counter()
+    try:
+        primary = None
+        for name in chain:
+            try:
+                documents[name] = EXTRACTORS[name].open(pdf_path)
+                primary = name
+                break
+            except Exception as exc:
+                print(f"  {name}: cannot open {pdf_path.name} ({exc})")
+        if primary is None:
+            raise ValueError(f"No PDF extractor could open {pdf_path.name}")
+
+        page_count = documents[primary].page_count
+        pages, fallbacks, failed = [], {}, []
+        for i in range(page_count):
+            for name in chain[chain.index(primary):]:
+                if name in broken:
+                    continue
+                try:
+                    if name not in documents:
+                        broken.add(name)
+                        documents[name] = EXTRACTORS[name].open(pdf_path)
+                        broken.discard(name)
+                    pages.append((i + 1, documents[name].text(i)))
+                    if name != primary:
+                        fallbacks[i + 1] = name
+                    break
+                except Exception as exc:
+                    print(f"  {name}: page {i + 1} of {pdf_path.name} failed ({exc})")
+            else:
+                failed.append(i + 1)
+    finally:
+        for document in documents.values():
+            document.close()
+
+    elapsed = time.perf_counter() - start
+    return pages, {
+        "backend": primary,
+        "pages": page_count,
+        "fallback_pages": fallbacks,
+        "failed_pages": failed,
+        "seconds": round(elapsed, 3),
+        "pages_per_s": round(page_count / elapsed, 1) if elapsed > 0 else None,
+    }
@@ -0,0 +1,206 @@
+"""
+Cross-lingual query expansion for the French-indexed manuals.
+English and Korean questions share no words with the French chunks, so BM25
+finds almost nothing and one embedding only partly bridges the gap. With
+QUERY_EXPANSION enabled a question gets extra variants: French keywords from
+a local dictionary of automotive terms ("dict"), plus a French translation
+from the LLM ("llm"). Translations are cached and produced in the background,
+so expansion never adds a round-trip to the request: a question is served
+with the dictionary variant until its translation is ready.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .config import LLM_MODEL, QUERY_EXPANSION
+
+EXPANSION_MODES = ("off", "dict", "llm")
+INDEX_LANG = "fr"  # language of the indexed manuals
+TRANSLATION_CACHE_SIZE = 2048
+
+# Same tokenizer as the BM25 corpus (index_manuals._tokenize): accents kept
+_TOKEN = re.compile(r"[a-zà-ÿ0-9]{2,}")
+_WORD = re.compile(r"[a-z0-9]+")
+
+# English word or phrase -> French terms of the manuals
+ENGLISH_TERMS: Dict[str, str] = {
+    "tire": "pneus pneumatiques", "tyre": "pneus pneumatiques",
+    "pressure": "pression", "inflate": "gonflage", "inflation": "gonflage",
+    "engine": "moteur", "oil": "huile", "oil change": "vidange huile",
+    "brake": "frein freinage", "parking brake": "frein stationnement", "handbrake": "frein stationnement",
+    "wiper": "essuie-glace", "battery": "batterie",
+    "start": "démarrage démarrer", "starting": "démarrage démarrer",
+    "warning light": "voyant témoin alerte", "dashboard": "tableau bord",
+    "light": "feux éclairage", "headlight": "phares projecteurs",
+    "air conditioning": "climatisation", "heating": "chauffage", "heater": "chauffage",
+    "seat belt": "ceinture sécurité", "seatbelt": "ceinture sécurité", "airbag": "airbag coussin gonflable",
+    "seat": "siège", "mirror": "rétroviseur", "indicator": "clignotant", "turn signal": "clignotant",
+    "key": "clé carte", "lock": "verrouillage", "unlock": "déverrouillage",
+    "door": "portière porte", "trunk": "coffre", "boot": "coffre",
+    "tank": "réservoir", "fuel": "carburant", "gasoline": "essence", "petrol": "essence",
+    "diesel": "gazole diesel", "charge": "recharge charge", "charging": "recharge charge",
+    "cable": "câble", "speed": "vitesse", "gear": "vitesse rapport", "gearbox": "boîte vitesses",
+    "transmission": "boîte vitesses", "cruise control": "régulateur vitesse", "speed limiter": "limiteur vitesse",
+    "steering": "direction volant", "steering wheel": "volant", "wheel": "roue",
+    "radio": "radio", "phone": "téléphone", "navigation": "navigation", "gps": "navigation",
+    "screen": "écran", "display": "écran affichage", "fuse": "fusible", "bulb": "ampoule",
+    "coolant": "liquide refroidissement", "washer": "lave-glace", "defrost": "dégivrage",
+    "demist": "désembuage", "fog": "antibrouillard", "tow": "remorquage", "towing": "remorquage",
+    "puncture": "crevaison", "flat tire": "crevaison pneu", "jack": "cric", "spare wheel": "roue secours",
+    "windshield": "pare-brise", "windscreen": "pare-brise", "hood": "capot", "bonnet": "capot",
+    "filter": "filtre", "maintenance": "entretien révision", "service": "entretien révision",
+    "window": "vitre", "camera": "caméra", "alarm": "alarme", "consumption": "consommation",
+    "range": "autonomie", "capacity": "capacité", "hybrid": "hybride", "reset": "réinitialisation",
+    "replace": "remplacement", "change": "remplacement", "check": "vérification contrôle",
+    "level": "niveau", "child seat": "siège enfant", "sunroof": "toit ouvrant", "horn": "avertisseur",
+}
+
+# Korean term (matched inside words: particles are glued to nouns) -> French terms
+KOREAN_TERMS: Dict[str, str] = {
+    "타이어": "pneus pneumatiques", "공기압": "pression gonflage", "압력": "pression",
+    "엔진오일": "huile moteur", "엔진": "moteur", "오일": "huile", "교환": "remplacement vidange",
+    "브레이크": "frein freinage", "주차": "stationnement", "와이퍼": "essuie-glace",
+    "배터리": "batterie", "시동": "démarrage", "경고등": "voyant témoin alerte",
+    "계기판": "tableau bord", "에어컨": "climatisation", "히터": "chauffage", "난방": "chauffage",
+    "안전벨트": "ceinture sécurité", "에어백": "airbag coussin gonflable", "좌석": "siège",
+    "시트": "siège", "미러": "rétroviseur", "전조등": "phares projecteurs", "헤드라이트": "phares",
+    "라이트": "feux éclairage", "방향지시등": "clignotant", "열쇠": "clé", "스마트키": "clé carte",
+    "잠금": "verrouillage", "트렁크": "coffre", "연료": "carburant", "주유": "carburant réservoir",
+    "휘발유": "essence", "디젤": "gazole diesel", "충전": "recharge charge", "속도": "vitesse",
+    "크루즈": "régulateur vitesse", "핸들": "volant direction", "라디오": "radio",
+    "블루투스": "bluetooth", "전화": "téléphone", "내비게이션": "navigation", "화면": "écran",
+    "퓨즈": "fusible", "전구": "ampoule", "냉각수": "liquide refroidissement",
+    "워셔액": "lave-glace", "성에": "dégivrage", "김서림": "désembuage", "안개등": "antibrouillard",
+    "견인": "remorquage", "펑크": "crevaison", "스페어": "roue secours", "앞유리": "pare-brise",
+    "보닛": "capot", "필터": "filtre", "정비": "entretien révision", "점검": "vérification contrôle",
+    "창문": "vitre", "카메라": "caméra", "경보": "alarme", "연비": "consommation",
+    "주행거리": "autonomie", "용량": "capacité", "변속": "boîte vitesses", "기어": "vitesse rapport",
+    "하이브리드": "hybride", "초기화": "réinitialisation", "경적": "avertisseur",
+}
+
+_TRANSLATION_PROMPT = (
+    "Traduis en francais cette question sur un vehicule, avec les termes d'un manuel "
+    "du conducteur. Reponds uniquement par la traduction.\n\nQuestion: {question}"
+)
+
+
+def query_tokens(text: str) -> List[str]:
+    """BM25 query terms, tokenized like the indexed chunks."""
+    return _TOKEN.findall(text.lower())
+
+
+def _english_terms(question: str) -> List[str]:
+    words = _WORD.findall(question.lower())
+    # Plurals: "tires" -> "tire", "brakes" -> "brake"
+    words = [w[:-1] if w.endswith("s") and w[:-1] in ENGLISH_TERMS else w for w in words]
+    text = f" {' '.join(words)} "
+    terms = []
+    for phrase in sorted(ENGLISH_TERMS, key=len, reverse=True):
+        if f" {phrase} " in text:
+            terms.append(ENGLISH_TERMS[phrase])
+            text = text.replace(f" {phrase} ", " | ")  # a word feeds one entry only
+    return terms
+
+
+def _korean_terms(question: str) -> List[str]:
+    terms = []
+    text = question
+    for term in sorted(KOREAN_TERMS, key=len, reverse=True):
+        if term in text:
+            terms.append(KOREAN_TERMS[term])
+            text = text.replace(term, " ")
+    return terms
+
+
+def dictionary_variant(question: str, lang: str) -> Optional[str]:
+    """French keywords for the automotive terms of the question, None when none is known."""
+    terms = _english_terms(question)  # also in Korean questions: "GPS", "ABS"...
+    if lang == "ko":
+        terms = _korean_terms(question) + terms
+    words = list(dict.fromkeys(w for t in terms for w in t.split()))
+    return " ".join(words) or None
+
+
+class TranslationCache:
+    """LRU cache of LLM translations, filled off the request path."""
+
+    def __init__(self, size: int = TRANSLATION_CACHE_SIZE):
+        self.size = size
+        self._cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._pending: set = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-translation")
+        self.stats = {"hits": 0, "misses": 0, "failed": 0, "skipped": 0}
+
+    def lookup(self, question: str, lang: str, slug: str) -> Optional[str]:
+        """Cached translation, or None after scheduling one for the next time."""
+        key = (lang, re.sub(r"\s+", " ", question.strip().lower()))
+        with self._lock:
+            translation = self._cache.get(key)
+            if translation is not None:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return translation
+            self.stats["misses"] += 1
+            if key in self._pending:
+                return None
+            self._pending.add(key)
+        self._pool.submit(self._translate, key, question, slug)
+        return None
+
+    def _translate(self, key, question: str, slug: str):
+        from .admission import llm_admission
+        from .llm_client import get_llm_client
+
+        try:
+            with llm_admission.background_slot(slug) as acquired:
+                if not acquired:  # optional work: dropped under load, retried on a later request
+                    self.stats["skipped"] += 1
+                    return
+                translation = get_llm_client().generate(
+                    _TRANSLATION_PROMPT.format(question=question),
+                    model=LLM_MODEL.replace("models/", "", 1),
+                ).strip()
+            if translation:
+                with self._lock:
+                    self._cache[key] = translation.splitlines()[0]
+                    while len(self._cache) > self.size:
+                        self._cache.popitem(last=False)
+        except Exception as exc:
+            self.stats["failed"] += 1
+            print(f"Query expansion: translation failed ({exc})")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return dict(self.stats, size=len(self._cache), pending=len(self._pending))
+
+
+translations = TranslationCache()
+
+
+def expansion_mode(options: Optional[dict] = None) -> str:
+    """Guide option "query_expansion" first, then QUERY_EXPANSION."""
+    mode = (options or {}).get("query_expansion", QUERY_EXPANSION)
+    return mode if mode in EXPANSION_MODES else "off"
+
+
+def expand_query(question: str, lang: str, mode: str = QUERY_EXPANSION, slug: str = "") -> List[str]:
+    """The question first, then its French variants (none for French questions or mode "off")."""
+    variants = [question]
+    if mode not in ("dict", "llm") or lang == INDEX_LANG:
+        return variants
+    if mode == "llm":
+        translation = translations.lookup(question, lang, slug)
+        if translation:
+            variants.append(translation)
+    keywords = dictionary_variant(question, lang)
+    if keywords:
+        variants.append(keywords)
+    return list(dict.fromkeys(variants))
@@ -0,0 +1,134 @@
+"""
+Query log: one JSON line per answered chat question, the input of the answer
+warming job (python -m warm_answers).
+record() never blocks the request: lines go to a bounded queue and are
+dropped (and counted) when it is full. A background thread per worker
+appends them to data/query_logs/queries-<pid>.jsonl, rotated at
+QUERY_LOG_MAX_MB; the QUERY_LOG_KEEP most recent rotated files are kept.
+"""
+from __future__ import annotations
+
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+from .config import QUERY_LOG_DIR, QUERY_LOG_ENABLED, QUERY_LOG_KEEP, QUERY_LOG_MAX_MB, QUERY_LOG_QUEUE_SIZE
+
+LOG_PREFIX = "queries-"
+WRITE_BATCH = 500
+
+
+def log_files(directory: Path = QUERY_LOG_DIR) -> List[Path]:
+    """Active and rotated query logs of every worker, oldest first."""
+    directory = Path(directory)
+    if not directory.exists():
+        return []
+    return sorted(directory.glob(f"{LOG_PREFIX}*.jsonl"), key=lambda p: p.stat().st_mtime)
+
+
+class QueryLog:
+    """Bounded queue drained by one writer thread per process."""
+
+    def __init__(
+        self,
+        directory: Path = QUERY_LOG_DIR,
+        enabled: bool = QUERY_LOG_ENABLED,
+        queue_size: int = QUERY_LOG_QUEUE_SIZE,
+        max_mb: float = QUERY_LOG_MAX_MB,
+        keep: int = QUERY_LOG_KEEP,
+    ):
+        self.directory = Path(directory)
+        self.enabled = enabled
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.keep = max(1, keep)
+        self._queue: "queue.Queue[str]" = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._pid = None
+        self.stats = {"logged": 0, "dropped": 0, "written": 0, "rotations": 0, "failed": 0}
+
+    def record(self, slug: str, question: str, lang: str, answer_path: str, latency_ms: float):
+        if not self.enabled:
+            return
+        line = json.dumps({
+            "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "guide": slug,
+            "lang": lang,
+            "question": question,
+            "path": answer_path,
+            "ms": round(latency_ms, 1),
+        }, ensure_ascii=False)
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(line)
+            self.stats["logged"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def _ensure_writer(self):
+        # Started lazily, and again in a forked worker (threads do not survive fork)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name="query-log", daemon=True).start()
+
+    @property
+    def path(self) -> Path:
+        return self.directory / f"{LOG_PREFIX}{os.getpid()}.jsonl"
+
+    def _run(self):
+        while True:
+            lines = [self._queue.get()]
+            while len(lines) < WRITE_BATCH:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(lines)
+            except Exception as exc:
+                self.stats["failed"] += len(lines)
+                print(f"QueryLog: {len(lines)} line(s) lost ({exc})")
+            for _ in lines:
+                self._queue.task_done()
+
+    def _write(self, lines: List[str]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+            size = f.tell()
+        self.stats["written"] += len(lines)
+        if size >= self.max_bytes:
+            self._rotate(path)
+
+    def _rotate(self, path: Path):
+        self.stats["rotations"] += 1
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.stats['rotations']}"
+        os.replace(path, path.with_name(f"{path.stem}-{stamp}.jsonl"))
+        rotated = [p for p in log_files(self.directory) if p.stem.count("-") > 1]
+        for old in rotated[:-self.keep]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+    def flush(self, timeout_s: float = 5.0) -> bool:
+        """Wait until every queued line is written (tests, shutdown); False on timeout."""
+        deadline = time.monotonic() + timeout_s
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def metrics(self) -> dict:
+        return dict(self.stats, enabled=self.enabled, pending=self._queue.qsize())
+
+
+query_log = QueryLog()
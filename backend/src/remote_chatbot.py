@@ -0,0 +1,150 @@
+"""
+GuideChatbot of a web worker when RETRIEVAL_SOCKET is set: it loads only the
+guide's spec table and sends its searches to the retrieval service
+(src.retrieval_service), which owns the FAISS, BM25 and chunk indexes.
+Query expansion and embedding still run here, under the request deadline,
+so the service only does index lookups. When the service cannot be reached
+the question gets an error answer: the LLM is never asked without passages.
+"""
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from .config import MIN_LLM_BUDGET_S, SEMANTIC_BUDGET_S, TOP_K_RESULTS
+from .deadline import Deadline
+from .extractive import build_term_weights
+from .guide_bundle import GuideBundle
+from .guide_chatbot import GuideChatbot
+from .llm_client import UpstreamTimeout
+from .retrieval_client import RetrievalClient, RetrievalUnavailable, retrieval_client
+from .retrieval_protocol import Hit, Query
+from .spec_tables import SpecIndex
+from .vector_store import embed_queries
+
+
+def _document(hit: Hit) -> Tuple[Document, float]:
+    score, source_file, page, chunk_index, chunk_id, text = hit
+    metadata = {"source_file": source_file, "page": page}
+    if chunk_index >= 0:
+        metadata["chunk_index"] = chunk_index
+    if chunk_id >= 0:
+        metadata["chunk_id"] = chunk_id
+    return Document(page_content=text, metadata=metadata), score
+
+
+class RemoteGuideChatbot(GuideChatbot):
+    """Same answers as GuideChatbot, index searches delegated to the retrieval service."""
+
+    def __init__(self, guide, client: RetrievalClient = retrieval_client):
+        self.client = client
+        super().__init__(guide)
+
+    def _load_indexes(self):
+        # Raises RetrievalUnavailable: the registry retries the load on the next request
+        self._has_vectors, self._has_lexical, self.remote_fingerprint = self.client.info(self.guide.slug)
+        self.shards = []
+        specs = []
+        for location in self.guide.shards:
+            if location.has_bundle:
+                spec_index = GuideBundle(location.bundle_path).spec_index()
+            else:
+                spec_index = SpecIndex.load(location.vector_store_dir)
+            if spec_index is not None:
+                specs.append(spec_index)
+        self.spec_index = SpecIndex.merge(specs)
+
+    @property
+    def has_vectors(self) -> bool:
+        return self._has_vectors
+
+    @property
+    def has_lexical(self) -> bool:
+        return self._has_lexical
+
+    def _query_vectors(self, variants: List[str], deadline: Optional[Deadline]) -> Optional[List[List[float]]]:
+        """Variant embeddings within the semantic budget, None to search lexical only."""
+        if deadline is None:
+            return self._embed_queries(variants)
+        budget = deadline.cap(SEMANTIC_BUDGET_S, reserve_s=MIN_LLM_BUDGET_S)
+        if budget <= 0:
+            deadline.degrade("semantic_skipped_budget")
+            return None
+        try:
+            return embed_queries(variants, timeout_s=budget)
+        except UpstreamTimeout:
+            deadline.degrade("semantic_timeout")
+        except Exception as exc:
+            print(f"GuideChatbot: query embedding failed for {self.guide.slug} ({exc}), lexical only")
+            deadline.degrade("semantic_failed")
+        return None
+
+    def _remote_search(
+        self, queries: List[Query], deadline: Optional[Deadline] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        timeout_s = deadline.remaining() if deadline is not None else None
+        try:
+            results = self.client.search(self.guide.slug, queries, timeout_s)
+        except RetrievalUnavailable:
+            if deadline is not None:
+                deadline.degrade("retrieval_unavailable")
+            raise
+        return [[_document(hit) for hit in hits] for hits in results]
+
+    def _compute_answer(
+        self, question: str, lang: str, deadline: Deadline, refine: bool = True
+    ) -> Tuple[dict, List[Document]]:
+        try:
+            return super()._compute_answer(question, lang, deadline, refine)
+        except RetrievalUnavailable as exc:
+            print(f"GuideChatbot: retrieval service unavailable for {self.guide.slug} ({exc}), error answer")
+            return self._error_response(exc), []
+
+    def search(
+        self,
+        question: str,
+        k: int = TOP_K_RESULTS,
+        query_vector: Optional[List[float]] = None,
+        semantic: bool = True,
+        deadline: Optional[Deadline] = None,
+        lang: Optional[str] = None,
+        expand_tokens: int = 0,
+    ) -> List[Tuple[Document, float]]:
+        """GuideChatbot.search in one service request, sent once the variants are embedded."""
+        variants = self.query_variants(question, lang)
+        vectors = None
+        if self.has_vectors and semantic:
+            vectors = [query_vector] if query_vector is not None else self._query_vectors(variants, deadline)
+        return self._remote_search([(variants, vectors, k, expand_tokens)], deadline)[0]
+
+    def search_batch(
+        self,
+        questions: List[str],
+        k: int = TOP_K_RESULTS,
+        query_vectors: Optional[List[List[float]]] = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """All the questions in one service request."""
+        vectors = query_vectors if self.has_vectors and query_vectors is not None else [None] * len(questions)
+        queries = [
+            (self.query_variants(question), None if vector is None else [vector], k, 0)
+            for question, vector in zip(questions, vectors)
+        ]
+        return self._remote_search(queries) if queries else []
+
+    def search_prepared(self, queries: List[Query]) -> List[List[Tuple[Document, float]]]:
+        return self._remote_search(queries)
+
+    @property
+    def term_weights(self) -> dict:
+        if self._term_weights is None:
+            try:
+                idf = self.client.idf(self.guide.slug)
+            except RetrievalUnavailable as exc:
+                print(f"GuideChatbot: no term weights for {self.guide.slug} ({exc})")
+                return {}
+            self._term_weights = build_term_weights(idf)
+        return self._term_weights
+
+    def _merged_idf(self) -> dict:
+        return self.client.idf(self.guide.slug)
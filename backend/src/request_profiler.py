@@ -0,0 +1,195 @@
+"""
+Sampled statistical profiling of live requests.
+A fraction of requests (PROFILE_SAMPLE_RATE), or any admin request sent with
+"X-Profile: 1", gets its thread's stack sampled every PROFILE_INTERVAL_MS by
+one background thread. Finished profiles go to a ring buffer served at
+/api/debug/profiles, as a call tree or as collapsed stacks
+("frame;frame;frame count" lines, the input of flamegraph.pl / speedscope).
+Requests that are not profiled only pay one random() call.
+"""
+from __future__ import annotations
+
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .config import PROFILE_BUFFER_SIZE, PROFILE_INTERVAL_MS, PROFILE_SAMPLE_RATE
+
+MAX_STACK_DEPTH = 128
+TOP_FRAMES = 8
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).name}:{code.co_name}"
+
+
+def collapse(frame) -> str:
+    """Root-first 'file:function;...' string of a frame's stack."""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """One daemon thread sampling the stacks of the threads being profiled."""
+
+    def __init__(self, interval_s: float):
+        self.interval_s = interval_s
+        self._active: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, thread_id: int):
+        with self._lock:
+            self._active[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, thread_id: int) -> Counter:
+        with self._lock:
+            return self._active.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval_s)
+            with self._lock:
+                if not self._active:
+                    self._thread = None  # restarted by the next start()
+                    return
+                thread_ids = list(self._active)
+            frames = sys._current_frames()
+            stacks = {tid: collapse(frames[tid]) for tid in thread_ids if tid in frames}
+            del frames
+            with self._lock:
+                for tid, stack in stacks.items():
+                    if tid in self._active:
+                        self._active[tid][stack] += 1
+
+
+class RequestProfiler:
+    """Decides which requests to profile and keeps the last PROFILE_BUFFER_SIZE profiles."""
+
+    def __init__(
+        self,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        interval_ms: float = PROFILE_INTERVAL_MS,
+        buffer_size: int = PROFILE_BUFFER_SIZE,
+    ):
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.interval_ms = max(1.0, interval_ms)
+        self.sampler = StackSampler(self.interval_ms / 1000.0)
+        self.profiles: "deque[dict]" = deque(maxlen=max(1, buffer_size))
+        self._lock = threading.Lock()
+        self.stats = {"sampled": 0, "requested": 0}
+
+    def should_profile(self, requested: bool = False) -> bool:
+        return requested or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def begin(self, method: str, path: str, reason: str) -> dict:
+        """Start sampling the calling thread; returns the handle for end()."""
+        handle = {
+            "id": uuid.uuid4().hex[:12],
+            "method": method,
+            "path": path,
+            "reason": reason,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "thread_id": threading.get_ident(),
+            "start": time.perf_counter(),
+        }
+        self.sampler.start(handle["thread_id"])
+        return handle
+
+    def end(self, handle: dict, status: Optional[int] = None) -> dict:
+        stacks = self.sampler.stop(handle["thread_id"])
+        profile = {
+            "id": handle["id"],
+            "method": handle["method"],
+            "path": handle["path"],
+            "reason": handle["reason"],
+            "status": status,
+            "started_at": handle["started_at"],
+            "duration_ms": round((time.perf_counter() - handle["start"]) * 1000, 1),
+            "interval_ms": self.interval_ms,
+            "samples": sum(stacks.values()),
+            "stacks": dict(stacks),
+        }
+        with self._lock:
+            self.profiles.append(profile)
+            self.stats["requested" if handle["reason"] == "header" else "sampled"] += 1
+        return profile
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        with self._lock:
+            return next((p for p in self.profiles if p["id"] == profile_id), None)
+
+    def summaries(self) -> List[dict]:
+        """Most recent first, without the stacks; ``top`` = frames with the most own samples."""
+        with self._lock:
+            profiles = list(self.profiles)
+        return [
+            dict({k: v for k, v in p.items() if k != "stacks"}, top=self_time(p["stacks"])[:TOP_FRAMES])
+            for p in reversed(profiles)
+        ]
+
+    def all_stacks(self) -> Counter:
+        """Stacks of every buffered profile added up (one flame graph for the whole buffer)."""
+        total = Counter()
+        with self._lock:
+            for profile in self.profiles:
+                total.update(profile["stacks"])
+        return total
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return dict(
+                self.stats,
+                buffered=len(self.profiles),
+                sample_rate=self.sample_rate,
+                interval_ms=self.interval_ms,
+            )
+
+
+def self_time(stacks: Dict[str, int]) -> List[dict]:
+    """Leaf frames ranked by samples (where the time was actually spent)."""
+    leaves = Counter()
+    for stack, count in stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    total = sum(leaves.values()) or 1
+    return [
+        {"frame": frame, "samples": count, "share": round(count / total, 3)}
+        for frame, count in leaves.most_common()
+    ]
+
+
+def collapsed_text(stacks: Dict[str, int]) -> str:
+    """flamegraph.pl input: one 'root;...;leaf count' line per distinct stack."""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items()))
+
+
+def call_tree(stacks: Dict[str, int]) -> dict:
+    """Nested {"name", "samples", "children"} tree, children sorted by samples."""
+    root = {"name": "all", "samples": 0, "children": {}}
+    for stack, count in stacks.items():
+        root["samples"] += count
+        node = root
+        for label in stack.split(";"):
+            node = node["children"].setdefault(label, {"name": label, "samples": 0, "children": {}})
+            node["samples"] += count
+
+    def finish(node: dict) -> dict:
+        children = sorted(node["children"].values(), key=lambda c: c["samples"], reverse=True)
+        return {"name": node["name"], "samples": node["samples"], "children": [finish(c) for c in children]}
+
+    return finish(root)
+
+
+request_profiler = RequestProfiler()
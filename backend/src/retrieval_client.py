@@ -0,0 +1,167 @@
+"""
+Client of the retrieval service (RETRIEVAL_SOCKET, see src.retrieval_service):
+a small pool of persistent UNIX socket connections per web worker, one
+request in flight per connection. A pooled connection found broken (service
+restarted) is replaced and the request sent once more; a timeout is not
+retried. Failures raise RetrievalUnavailable.
+"""
+from __future__ import annotations
+
+import os
+import queue
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .config import RETRIEVAL_POOL_SIZE, RETRIEVAL_SOCKET, RETRIEVAL_TIMEOUT_S
+from .retrieval_protocol import (
+    OP_IDF,
+    OP_INFO,
+    OP_PING,
+    OP_SEARCH,
+    Hit,
+    ProtocolError,
+    Query,
+    RemoteError,
+    decode_hits,
+    decode_idf,
+    decode_info,
+    decode_response,
+    encode_request,
+    recv_frame,
+    send_frame,
+)
+
+
+class RetrievalUnavailable(Exception):
+    """The retrieval service cannot be reached or failed the request."""
+
+
+class RetrievalClient:
+    """Pooled connections to the retrieval service of this host."""
+
+    def __init__(
+        self,
+        path: str = RETRIEVAL_SOCKET,
+        pool_size: int = RETRIEVAL_POOL_SIZE,
+        timeout_s: float = RETRIEVAL_TIMEOUT_S,
+    ):
+        self.path = path
+        self.pool_size = max(1, pool_size)
+        self.timeout_s = timeout_s
+        self._idle: "queue.LifoQueue[socket.socket]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self.stats = {"requests": 0, "connects": 0, "retries": 0, "failures": 0, "timeouts": 0}
+        self._latency_ms_total = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _reset_after_fork(self):
+        # Connections inherited from the parent are shared with it: never reuse them
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._idle = queue.LifoQueue()
+                self._pid = os.getpid()
+
+    def _acquire(self) -> Tuple[socket.socket, bool]:
+        """An idle connection (reused=True) or a new one."""
+        self._reset_after_fork()
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            pass
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout_s)
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        self.stats["connects"] += 1
+        return sock, False
+
+    def _release(self, sock: socket.socket):
+        if self._idle.qsize() < self.pool_size:
+            self._idle.put(sock)
+        else:
+            sock.close()
+
+    def call(self, payload: bytes, timeout_s: Optional[float] = None) -> bytes:
+        """Send one request frame and return the response frame."""
+        if not self.enabled:
+            raise RetrievalUnavailable("RETRIEVAL_SOCKET is not set")
+        timeout_s = self.timeout_s if timeout_s is None else max(0.05, min(timeout_s, self.timeout_s))
+        self.stats["requests"] += 1
+        start = time.perf_counter()
+        for attempt in range(2):
+            try:
+                sock, reused = self._acquire()
+            except OSError as exc:
+                self.stats["failures"] += 1
+                raise RetrievalUnavailable(f"cannot connect to {self.path} ({exc})") from exc
+            try:
+                sock.settimeout(timeout_s)
+                send_frame(sock, payload)
+                response = recv_frame(sock)
+                if response is None:
+                    raise ConnectionError("closed by the service")
+            except socket.timeout as exc:
+                sock.close()
+                self.stats["timeouts"] += 1
+                raise RetrievalUnavailable(f"no response within {timeout_s:.2f}s") from exc
+            except (OSError, ProtocolError) as exc:
+                sock.close()
+                if reused and attempt == 0:
+                    self.stats["retries"] += 1
+                    continue
+                self.stats["failures"] += 1
+                raise RetrievalUnavailable(f"request failed ({exc})") from exc
+            self._release(sock)
+            self._latency_ms_total += (time.perf_counter() - start) * 1000
+            return response
+        raise RetrievalUnavailable("request failed")
+
+    def _request(self, decode, payload: bytes, timeout_s: Optional[float] = None):
+        response = self.call(payload, timeout_s)
+        try:
+            return decode(response)
+        except (RemoteError, ProtocolError) as exc:
+            self.stats["failures"] += 1
+            raise RetrievalUnavailable(str(exc)) from exc
+
+    def ping(self) -> bool:
+        try:
+            self._request(decode_response, encode_request(OP_PING))
+            return True
+        except RetrievalUnavailable:
+            return False
+
+    def info(self, slug: str) -> Tuple[bool, bool, str]:
+        """(has_vectors, has_lexical, index fingerprint) of a guide; loads it in the service."""
+        return self._request(decode_info, encode_request(OP_INFO, slug))
+
+    def idf(self, slug: str) -> Dict[str, float]:
+        return self._request(decode_idf, encode_request(OP_IDF, slug))
+
+    def search(self, slug: str, queries: List[Query], timeout_s: Optional[float] = None) -> List[List[Hit]]:
+        """One hit list per query, best first."""
+        return self._request(decode_hits, encode_request(OP_SEARCH, slug, queries), timeout_s)
+
+    def metrics(self) -> dict:
+        served = self.stats["requests"] - self.stats["failures"] - self.stats["timeouts"]
+        return dict(
+            self.stats,
+            enabled=self.enabled,
+            socket=self.path or None,
+            idle_connections=self._idle.qsize(),
+            avg_ms=round(self._latency_ms_total / served, 2) if served > 0 else None,
+        )
+
+
+retrieval_client = RetrievalClient()
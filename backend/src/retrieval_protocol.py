@@ -0,0 +1,234 @@
+"""
+Binary protocol of the retrieval service (src.retrieval_service) over a UNIX
+socket. Every message is a frame: a 4-byte length, then the payload.
+Requests start with an op byte, responses with a status byte (an error
+carries its message). All integers and floats are little-endian; strings
+are UTF-8 with a length prefix; query vectors travel as raw float32 arrays.
+
+    PING    ->  (empty)
+    INFO    slug  ->  flags (vectors, lexical), index fingerprint
+    IDF     slug  ->  merged BM25 idf as (term, idf) pairs
+    SEARCH  slug, queries  ->  one hit list per query
+
+A SEARCH query is (k, expand_tokens, variants, vectors of the variants or
+none); a hit is (score, source_file, page, chunk_index, chunk_id, text).
+"""
+from __future__ import annotations
+
+import socket
+import struct
+from typing import Dict, List, Optional, Tuple
+
+OP_PING, OP_INFO, OP_IDF, OP_SEARCH = 1, 2, 3, 4
+STATUS_OK, STATUS_ERROR = 0, 1
+FLAG_VECTORS, FLAG_LEXICAL = 1, 2
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+_LEN = struct.Struct("<I")
+_SHORT = struct.Struct("<H")
+_QUERY = struct.Struct("<HIH")     # k, expand_tokens, variants
+_VECTORS = struct.Struct("<HH")    # rows, dim
+_HIT = struct.Struct("<fii")       # score, chunk_index, chunk_id
+_IDF = struct.Struct("<d")
+
+# (variants, vectors or None, k, expand_tokens)
+Query = Tuple[List[str], Optional[List[List[float]]], int, int]
+# (score, source_file, page, chunk_index, chunk_id, text)
+Hit = Tuple[float, str, str, int, int, str]
+
+
+class ProtocolError(ValueError):
+    """Malformed or oversized frame."""
+
+
+class RemoteError(RuntimeError):
+    """Error response of the service (unknown guide, failed search...)."""
+
+
+# -- framing -------------------------------------------------------------
+
+def send_frame(sock: socket.socket, payload: bytes):
+    sock.sendall(_LEN.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_frame(sock: socket.socket) -> Optional[bytes]:
+    """Next payload, None when the peer closed the connection between frames."""
+    header = sock.recv(_LEN.size, socket.MSG_WAITALL)
+    if not header:
+        return None
+    if len(header) < _LEN.size:
+        header += _recv_exact(sock, _LEN.size - len(header))
+    (size,) = _LEN.unpack(header)
+    if size > MAX_FRAME_BYTES:
+        raise ProtocolError(f"frame of {size} bytes")
+    return _recv_exact(sock, size)
+
+
+# -- primitives ----------------------------------------------------------
+
+def _pack_str(out: bytearray, text: str, long: bool = False):
+    data = text.encode("utf-8")
+    out += (_LEN if long else _SHORT).pack(len(data)) + data
+
+
+class _Reader:
+    def __init__(self, payload: bytes, offset: int = 0):
+        self.payload = memoryview(payload)
+        self.offset = offset
+
+    def unpack(self, fmt: struct.Struct) -> tuple:
+        values = fmt.unpack_from(self.payload, self.offset)
+        self.offset += fmt.size
+        return values
+
+    def raw(self, size: int) -> memoryview:
+        data = self.payload[self.offset:self.offset + size]
+        if len(data) != size:
+            raise ProtocolError("truncated payload")
+        self.offset += size
+        return data
+
+    def string(self, long: bool = False) -> str:
+        (size,) = self.unpack(_LEN if long else _SHORT)
+        return str(self.raw(size), "utf-8")
+
+
+# -- requests ------------------------------------------------------------
+
+def encode_request(op: int, slug: str = "", queries: Optional[List[Query]] = None) -> bytes:
+    out = bytearray([op])
+    if op == OP_PING:
+        return bytes(out)
+    _pack_str(out, slug)
+    if op != OP_SEARCH:
+        return bytes(out)
+    import numpy as np  # not at import time: api.py imports the client at startup
+
+    out += _SHORT.pack(len(queries))
+    for variants, vectors, k, expand_tokens in queries:
+        out += _QUERY.pack(k, expand_tokens, len(variants))
+        for variant in variants:
+            _pack_str(out, variant)
+        matrix = np.asarray(vectors if vectors else [], dtype="<f4")
+        rows, dim = (matrix.shape if matrix.ndim == 2 else (0, 0))
+        out += _VECTORS.pack(rows, dim) + matrix.tobytes()
+    return bytes(out)
+
+
+def decode_request(payload: bytes) -> Tuple[int, str, List[Query]]:
+    if not payload:
+        raise ProtocolError("empty request")
+    op = payload[0]
+    if op == OP_PING:
+        return op, "", []
+    reader = _Reader(payload, 1)
+    slug = reader.string()
+    queries: List[Query] = []
+    if op == OP_SEARCH:
+        import numpy as np
+
+        (count,) = reader.unpack(_SHORT)
+        for _ in range(count):
+            k, expand_tokens, n_variants = reader.unpack(_QUERY)
+            variants = [reader.string() for _ in range(n_variants)]
+            rows, dim = reader.unpack(_VECTORS)
+            vectors = None
+            if rows:
+                matrix = np.frombuffer(reader.raw(rows * dim * 4), dtype="<f4").reshape(rows, dim)
+                vectors = matrix.astype(np.float32)  # writable copy
+            queries.append((variants, vectors, k, expand_tokens))
+    elif op not in (OP_INFO, OP_IDF):
+        raise ProtocolError(f"unknown op {op}")
+    return op, slug, queries
+
+
+# -- responses -----------------------------------------------------------
+
+def encode_ok() -> bytes:
+    return bytes([STATUS_OK])
+
+
+def encode_error(message: str) -> bytes:
+    out = bytearray([STATUS_ERROR])
+    _pack_str(out, message[:1000])
+    return bytes(out)
+
+
+def encode_info(has_vectors: bool, has_lexical: bool, fingerprint: str) -> bytes:
+    out = bytearray([STATUS_OK, (FLAG_VECTORS if has_vectors else 0) | (FLAG_LEXICAL if has_lexical else 0)])
+    _pack_str(out, fingerprint)
+    return bytes(out)
+
+
+def encode_idf(idf: Dict[str, float]) -> bytes:
+    out = bytearray([STATUS_OK])
+    out += _LEN.pack(len(idf))
+    for term, value in idf.items():
+        _pack_str(out, term)
+        out += _IDF.pack(value)
+    return bytes(out)
+
+
+def encode_hits(results: List[List[Hit]]) -> bytes:
+    out = bytearray([STATUS_OK])
+    out += _SHORT.pack(len(results))
+    for hits in results:
+        out += _SHORT.pack(len(hits))
+        for score, source_file, page, chunk_index, chunk_id, text in hits:
+            out += _HIT.pack(score, chunk_index, chunk_id)
+            _pack_str(out, source_file)
+            _pack_str(out, page)
+            _pack_str(out, text, long=True)
+    return bytes(out)
+
+
+def decode_response(payload: bytes) -> _Reader:
+    """Reader positioned after the status byte; raises RemoteError on an error response."""
+    if not payload:
+        raise ProtocolError("empty response")
+    reader = _Reader(payload, 1)
+    if payload[0] == STATUS_ERROR:
+        raise RemoteError(reader.string())
+    return reader
+
+
+def decode_info(payload: bytes) -> Tuple[bool, bool, str]:
+    reader = decode_response(payload)
+    (flags,) = reader.raw(1)
+    return bool(flags & FLAG_VECTORS), bool(flags & FLAG_LEXICAL), reader.string()
+
+
+def decode_idf(payload: bytes) -> Dict[str, float]:
+    reader = decode_response(payload)
+    (count,) = reader.unpack(_LEN)
+    idf = {}
+    for _ in range(count):
+        term = reader.string()
+        idf[term] = reader.unpack(_IDF)[0]
+    return idf
+
+
+def decode_hits(payload: bytes) -> List[List[Hit]]:
+    reader = decode_response(payload)
+    (count,) = reader.unpack(_SHORT)
+    results = []
+    for _ in range(count):
+        (n_hits,) = reader.unpack(_SHORT)
+        hits = []
+        for _ in range(n_hits):
+            score, chunk_index, chunk_id = reader.unpack(_HIT)
+            source_file = reader.string()
+            page = reader.string()
+            hits.append((score, source_file, page, chunk_index, chunk_id, reader.string(long=True)))
+        results.append(hits)
+    return results
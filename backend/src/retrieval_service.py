@@ -0,0 +1,208 @@
+"""
+Retrieval service: one long-lived process (python -m retrieval_server) owns
+the indexes of every guide and serves the searches of all web workers over a
+UNIX socket (protocol: src.retrieval_protocol), so the indexes are loaded
+once per host instead of once per gunicorn worker, and BM25 scoring no
+longer holds the GIL of the web threads.
+Each connection has its own thread; searches are queued to a micro-batcher
+that waits RETRIEVAL_BATCH_WINDOW_MS after the first one and runs all the
+queries of a guide received meanwhile together (GuideChatbot.search_prepared:
+one FAISS matrix per shard, shared BM25 scoring for identical terms).
+Query expansion and embedding stay in the web workers, under their request
+deadlines.
+"""
+from __future__ import annotations
+
+import os
+import queue
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import List
+
+from .config import RETRIEVAL_BATCH_MAX, RETRIEVAL_BATCH_WINDOW_MS, RETRIEVAL_SOCKET
+from .guide_manager import guide_manager
+from .guide_registry import guide_registry
+from .retrieval_protocol import (
+    OP_IDF,
+    OP_INFO,
+    OP_PING,
+    ProtocolError,
+    Query,
+    decode_request,
+    encode_error,
+    encode_hits,
+    encode_idf,
+    encode_info,
+    encode_ok,
+    recv_frame,
+    send_frame,
+)
+
+
+class _Pending:
+    __slots__ = ("chatbot", "queries", "future")
+
+    def __init__(self, chatbot, queries: List[Query]):
+        self.chatbot = chatbot
+        self.queries = queries
+        self.future: Future = Future()
+
+
+class MicroBatcher:
+    """Collects the searches of all connections for a few milliseconds and runs them per guide."""
+
+    def __init__(self, window_ms: float = RETRIEVAL_BATCH_WINDOW_MS, max_queries: int = RETRIEVAL_BATCH_MAX):
+        self.window_s = max(0.0, window_ms / 1000)
+        self.max_queries = max(1, max_queries)
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self.stats = {"batches": 0, "queries": 0, "largest_batch": 0, "failed": 0}
+        threading.Thread(target=self._run, name="retrieval-batcher", daemon=True).start()
+
+    def submit(self, chatbot, queries: List[Query]) -> Future:
+        pending = _Pending(chatbot, queries)
+        self._queue.put(pending)
+        return pending.future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            count = len(batch[0].queries)
+            close_at = time.monotonic() + self.window_s
+            while count < self.max_queries:
+                remaining = close_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(pending)
+                count += len(pending.queries)
+            self._execute(batch)
+
+    def _execute(self, batch: List[_Pending]):
+        self.stats["batches"] += 1
+        self.stats["queries"] += sum(len(p.queries) for p in batch)
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        by_guide = {}
+        for pending in batch:
+            by_guide.setdefault(id(pending.chatbot), []).append(pending)
+        for group in by_guide.values():
+            try:
+                results = group[0].chatbot.search_prepared([q for p in group for q in p.queries])
+            except Exception as exc:
+                self.stats["failed"] += len(group)
+                for pending in group:
+                    pending.future.set_exception(exc)
+                continue
+            start = 0
+            for pending in group:
+                pending.future.set_result(results[start:start + len(pending.queries)])
+                start += len(pending.queries)
+
+
+def _hit(doc, score: float) -> tuple:
+    meta = doc.metadata
+    chunk_index, chunk_id = meta.get("chunk_index"), meta.get("chunk_id")
+    return (
+        float(score),
+        str(meta.get("source_file", "manuel.pdf")),
+        str(meta.get("page", "?")),
+        -1 if chunk_index is None else int(chunk_index),
+        -1 if chunk_id is None else int(chunk_id),
+        doc.page_content,
+    )
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """One persistent client connection: request frames answered in order."""
+
+    def handle(self):
+        service = self.server.service
+        while True:
+            try:
+                payload = recv_frame(self.request)
+            except (OSError, ProtocolError):
+                return
+            if payload is None:
+                return
+            try:
+                send_frame(self.request, service.handle(payload))
+            except OSError:
+                return
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128  # connects of all workers at once (default 5: EAGAIN)
+
+
+class RetrievalService:
+    def __init__(
+        self,
+        path: str = RETRIEVAL_SOCKET,
+        window_ms: float = RETRIEVAL_BATCH_WINDOW_MS,
+        batch_max: int = RETRIEVAL_BATCH_MAX,
+    ):
+        if not path:
+            raise ValueError("RETRIEVAL_SOCKET (or --socket) is required")
+        self.path = path
+        # This process owns the indexes: its registry must load them locally
+        guide_registry.remote_retrieval = False
+        self.batcher = MicroBatcher(window_ms, batch_max)
+        self.stats = {"requests": 0, "errors": 0}
+        self._server = None
+
+    def _chatbot(self, slug: str):
+        # get_guide() notices a re-indexed guide (manifest mtime) and unloads the old indexes
+        if guide_manager.get_guide(slug) is None:
+            raise ValueError(f"Guide '{slug}' not found")
+        return guide_registry.get(slug)
+
+    def handle(self, payload: bytes) -> bytes:
+        self.stats["requests"] += 1
+        try:
+            op, slug, queries = decode_request(payload)
+            if op == OP_PING:
+                return encode_ok()
+            chatbot = self._chatbot(slug)
+            if op == OP_INFO:
+                from .answer_warming import index_fingerprint
+
+                return encode_info(chatbot.has_vectors, chatbot.has_lexical, index_fingerprint(chatbot))
+            if op == OP_IDF:
+                return encode_idf(chatbot._merged_idf())
+            results = self.batcher.submit(chatbot, queries).result()
+            return encode_hits([[_hit(doc, score) for doc, score in hits] for hits in results])
+        except Exception as exc:
+            self.stats["errors"] += 1
+            print(f"RetrievalService: request failed ({exc})")
+            return encode_error(str(exc) or exc.__class__.__name__)
+
+    def serve_forever(self):
+        path = Path(self.path)
+        if path.exists():
+            path.unlink()  # left by a previous run
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._server = _Server(str(path), _Handler)
+        self._server.service = self
+        os.chmod(path, 0o660)
+        print(f"RetrievalService: listening on {path} (pid {os.getpid()})")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+    def metrics(self) -> dict:
+        return dict(self.stats, batching=dict(self.batcher.stats), guides=guide_registry.report())
@@ -0,0 +1,279 @@
+"""
+Structured spec lookup: tyre pressures, capacities, torques, fuses and bulbs
+extracted from the label/value rows of the manual's tables at index time
+(one page of text at a time, never from chunks: overlapping chunks cut words
+and blur page numbers), stored per guide in a compact keyed JSON file and
+answered without retrieval or LLM when a value question matches a row label.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from .extractive import fold, is_factual_question, query_terms
+
+SPEC_INDEX_FILENAME = "specs.json"
+SPEC_INDEX_VERSION = 2  # 1: extracted from chunks, ignored
+MAX_LABEL_CHARS = 90
+MAX_LABEL_WORDS = 12
+MAX_VALUE_CHARS = 60
+MIN_LOOKUP_SCORE = 0.6
+MAX_LOOKUP_RESULTS = 3
+
+_VALUE = r"\d+(?:[.,]\d+)?(?:\s*(?:-|à|a|to)\s*\d+(?:[.,]\d+)?)?"
+
+# category -> (label keywords, value pattern). Questions take the first
+# category whose keywords they contain: the most specific ones come first
+# ("couple de serrage des ecrous de roue" is a torque, not a tyre question)
+SPEC_CATEGORIES = {
+    "torque": (
+        r"couple|serrage|ecrou|torque|lug nut",
+        rf"{_VALUE}\s*(?:nm|n\.m|lb[./\s]?(?:pi|ft))\b",
+    ),
+    "fuse": (
+        r"fusible|fuse",
+        rf"{_VALUE}\s*a\b",
+    ),
+    "bulb": (
+        r"ampoule|lampe|feu|clignotant|bulb|lamp",
+        r"\b(?:h\d{1,2}|hb\d|p21(?:/5)?w|py21w|w\d{1,2}w|wy\d{1,2}w|r5w|c5w|d\ds)\b",
+    ),
+    "capacity": (
+        r"capacite|contenance|quantite|reservoir|huile|liquide|refroidissement|"
+        r"lave-glace|lave-vitre|capacity|tank|fluid|oil|coolant",
+        rf"{_VALUE}\s*(?:l|litres?|liters?|kwh)\b",
+    ),
+    "tyre_pressure": (
+        r"pneu|pneumatique|gonflage|roue|tire|tyre|wheel|inflation",
+        rf"{_VALUE}\s*(?:bars?|kpa|psi)\b",
+    ),
+}
+
+# A label ending like this is the start of a sentence ("Augmentez la pression
+# des pneus de 20 kPa"), not a table row
+_PROSE_ENDINGS = {
+    "de", "du", "des", "d'", "a", "au", "aux", "par", "pour", "environ", "jusqu'a",
+    "soit", "est", "sont", "le", "la", "les", "un", "une", "of", "to", "by", "at", "is", "be", "the",
+}
+# Trip computer read-outs and the like, which carry a unit but are not specs
+_NOISE = re.compile(r"consomm|depuis|trajet|moyenne|autonomie|parcour|since|trip|average|range\b")
+# Spare wheel rows only answer questions that mention it
+_SPARE = re.compile(r"secours|temporaire|galette|spare|temporary")
+_PRIVATE_USE = re.compile(r"[\ue000-\uf8ff]")
+
+_CATEGORY_PATTERNS = {
+    name: (re.compile(rf"\b(?:{words})"), re.compile(value, re.IGNORECASE))
+    for name, (words, value) in SPEC_CATEGORIES.items()
+}
+
+ANSWER_TEMPLATES = {
+    "fr": "Valeurs relevees dans le manuel :\n{lines}",
+    "en": "Values listed in the manual (original labels):\n{lines}",
+    "ko": "매뉴얼에 기재된 값 (원문 항목명):\n{lines}",
+}
+
+
+def _categorise(text: str) -> Optional[str]:
+    folded = fold(text)
+    for name, (words, _) in _CATEGORY_PATTERNS.items():
+        if words.search(folded):
+            return name
+    return None
+
+
+def _clean(text: str) -> str:
+    text = _PRIVATE_USE.sub(" ", text)  # symbol-font glyphs (arrows, bullets)
+    text = re.sub(r"(?:\.\s?){3,}", " ", text)  # dot leaders in tables
+    return re.sub(r"\s{2,}", " ", text).strip(" :-–•●■◦\t")
+
+
+def _entry(category: str, label: str, value: str, doc: Document) -> dict:
+    return {
+        "c": category,
+        "l": _clean(label)[:MAX_LABEL_CHARS],
+        "v": _clean(value),
+        "p": doc.metadata.get("page", "?"),
+        "f": doc.metadata.get("source_file", "manuel.pdf"),
+    }
+
+
+def is_spec_row(label: str, value: str) -> bool:
+    """A short table label and value, not a sentence, a cut word or a read-out."""
+    label, value = _clean(label), _clean(value)
+    words = re.findall(r"[^\W\d_][\w'’-]*", label)
+    if len(words) < 2 or len(words) > MAX_LABEL_WORDS or len(label) > MAX_LABEL_CHARS:
+        return False
+    if not label[0].isupper() and not label[0] == "(":
+        return False  # continuation of a cut line or word ("sion soit de 34 psi")
+    folded = fold(label)
+    if fold(words[-1]).replace("’", "'") in _PROSE_ENDINGS or _NOISE.search(folded):
+        return False
+    return 0 < len(value) <= MAX_VALUE_CHARS
+
+
+def _table_rows(doc: Document) -> List[dict]:
+    """
+    Label/value rows, where the label may sit on the previous line. Rows
+    whose label lacks the category keywords ("Avant 2,2 bar") take them from
+    the table heading above ("Pressions de gonflage des pneumatiques").
+    """
+    entries = []
+    previous = ""
+    heading = ""
+    for raw_line in (doc.page_content or "").split("\n"):
+        line = raw_line.strip()
+        if not line:
+            continue
+        matched = False
+        for category, (words, value_re) in _CATEGORY_PATTERNS.items():
+            value = value_re.search(line)
+            if not value:
+                continue
+            label = line[:value.start()]
+            if len(re.findall(r"[^\W\d_]{3,}", label)) < 2 and previous:
+                label = f"{previous} {label}"
+            if not words.search(fold(label)) and heading and words.search(fold(heading)):
+                label = f"{heading} - {label}"
+            tail = line[value.start():]
+            if words.search(fold(label)) and is_spec_row(label, tail):
+                entries.append(_entry(category, label, tail, doc))
+                matched = True
+                break
+        previous = "" if matched else (line if len(line) <= 80 else "")
+        if not matched and len(line) <= 80 and not re.search(r"\d", line):
+            heading = line
+    return entries
+
+
+def extract_specs(pages: List[Document]) -> List[dict]:
+    """Detect spec rows in page documents (one page of PDF text each)."""
+    entries: List[dict] = []
+    seen = set()
+    for doc in pages:
+        for entry in _table_rows(doc):
+            key = (entry["c"], entry["l"].lower(), entry["v"].lower(), str(entry["p"]))
+            if key in seen:
+                continue
+            seen.add(key)
+            entries.append(entry)
+    return entries
+
+
+def build_spec_index(entries: List[dict]) -> dict:
+    """Attach an inverted index (stemmed label term -> entry ids)."""
+    terms: Dict[str, List[int]] = {}
+    for entry_id, entry in enumerate(entries):
+        for term in query_terms(entry["l"]):
+            terms.setdefault(term, []).append(entry_id)
+    return {"version": SPEC_INDEX_VERSION, "entries": entries, "terms": terms}
+
+
+def save_spec_index(entries: List[dict], directory: Path) -> Path:
+    """Write specs.json atomically next to the other indexes."""
+    path = Path(directory) / SPEC_INDEX_FILENAME
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(build_spec_index(entries), f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path
+
+
+class SpecIndex:
+    """In-memory spec lookup for one guide."""
+
+    def __init__(self, data: dict):
+        self.entries: List[dict] = data.get("entries", [])
+        self.terms: Dict[str, List[int]] = data.get("terms", {})
+
+    @classmethod
+    def from_data(cls, data: Optional[dict]) -> Optional["SpecIndex"]:
+        """None for tables of another version (rebuild: python -m index_manuals --specs-only)."""
+        if not data or data.get("version") != SPEC_INDEX_VERSION:
+            return None
+        return cls(data)
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["SpecIndex"]:
+        path = Path(directory) / SPEC_INDEX_FILENAME
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        return cls.from_data(data)
+
+    @classmethod
+    def merge(cls, indexes: List["SpecIndex"]) -> Optional["SpecIndex"]:
+        """One index over the entries of several documents (None when there is none)."""
+        if len(indexes) <= 1:
+            return indexes[0] if indexes else None
+        entries: List[dict] = []
+        terms: Dict[str, List[int]] = {}
+        for index in indexes:
+            offset = len(entries)
+            entries.extend(index.entries)
+            for term, ids in index.terms.items():
+                terms.setdefault(term, []).extend(i + offset for i in ids)
+        return cls({"entries": entries, "terms": terms})
+
+    def lookup(self, question: str, limit: int = MAX_LOOKUP_RESULTS) -> List[dict]:
+        """Rows of the question's category whose label shares most of its terms.
+
+        Only for questions asking for a value (see is_factual_question):
+        "Comment changer l'huile ?" is about a procedure, not a capacity.
+        """
+        if not is_factual_question(question):
+            return []
+        category = _categorise(question)
+        if category is None:
+            return []
+
+        terms = query_terms(question)
+        if not terms:
+            return []
+
+        spare = bool(_SPARE.search(fold(question)))
+        hits: Dict[int, int] = {}
+        for term in terms:
+            for entry_id in self.terms.get(term, ()):
+                entry = self.entries[entry_id]
+                if entry["c"] != category or not is_spec_row(entry["l"], entry["v"]):
+                    continue
+                if bool(_SPARE.search(fold(entry["l"]))) == spare:
+                    hits[entry_id] = hits.get(entry_id, 0) + 1
+
+        ranked = sorted(hits.items(), key=lambda item: item[1], reverse=True)
+        results = []
+        seen_values = set()
+        for entry_id, matched in ranked:
+            if matched / len(terms) < MIN_LOOKUP_SCORE:
+                break
+            entry = self.entries[entry_id]
+            if entry["v"] in seen_values:
+                continue
+            seen_values.add(entry["v"])
+            results.append(entry)
+            if len(results) >= limit:
+                break
+        return results
+
+
+def format_spec_answer(entries: List[dict], lang: str) -> str:
+    lines = [f"- {entry['l']} : {entry['v']} (page {entry['p']})" for entry in entries]
+    template = ANSWER_TEMPLATES.get(lang, ANSWER_TEMPLATES["fr"])
+    return template.format(lines="\n".join(lines))
+
+
+def spec_source_documents(entries: List[dict]) -> List[Document]:
+    """Lightweight Documents so format_sources can cite spec entries."""
+    return [
+        Document(page_content="", metadata={"source_file": e["f"], "page": e["p"]})
+        for e in entries
+    ]
@@ -0,0 +1,170 @@
+"""
+Cold-start helpers: background warm-up of the heavy chatbot stack and a
+startup profiler (import-time tree + time to first healthy response).
+"""
+from __future__ import annotations
+
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+from typing import List, Optional
+
+from .config import WARMUP
+
+BACKEND_DIR = Path(__file__).parent.parent
+MIN_IMPORT_TREE_MS = 5.0
+HEALTH_TIMEOUT_S = 120.0
+
+_warmup_state = {"status": "idle", "loaded": [], "error": None, "took_s": None}
+_warmup_lock = threading.Lock()
+
+
+def _warmup_targets(setting: str) -> Optional[List[str]]:
+    """None = modules only, [] = nothing, else the guide slugs to load."""
+    if setting in ("", "off", "0", "none"):
+        return []
+    if setting == "modules":
+        return None
+    if setting == "popular":
+        from .guide_registry import guide_registry
+
+        return guide_registry.popular_slugs()
+    if setting == "all":
+        from .guide_manager import guide_manager
+
+        return [g["slug"] for g in guide_manager.list_guides()]
+    return [slug.strip() for slug in setting.split(",") if slug.strip()]
+
+
+def _warmup(targets: Optional[List[str]]):
+    start = time.perf_counter()
+    try:
+        # Heavy imports (google.genai, langchain, faiss) happen here, off the request path
+        from .guide_registry import guide_registry
+        from . import guide_chatbot, guide_search, batch_qa  # noqa: F401
+
+        for slug in targets or []:
+            guide_registry.get(slug, count_hit=False)
+            _warmup_state["loaded"].append(slug)
+        _warmup_state["status"] = "done"
+    except Exception as exc:
+        _warmup_state["status"] = "failed"
+        _warmup_state["error"] = str(exc)
+        print(f"Warm-up failed: {exc}")
+    finally:
+        _warmup_state["took_s"] = round(time.perf_counter() - start, 2)
+
+
+def start_warmup(setting: str = WARMUP) -> bool:
+    """Start the background warm-up thread once per process."""
+    with _warmup_lock:
+        if _warmup_state["status"] != "idle":
+            return False
+        targets = _warmup_targets(setting)
+        if targets == []:
+            _warmup_state["status"] = "disabled"
+            return False
+        _warmup_state["status"] = "running"
+
+    thread = threading.Thread(target=_warmup, args=(targets,), name="warmup", daemon=True)
+    thread.start()
+    return True
+
+
+def warmup_status() -> dict:
+    return dict(_warmup_state, loaded=list(_warmup_state["loaded"]))
+
+
+# ============================================
+# STARTUP PROFILING
+# ============================================
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_time_tree(module: str = "api") -> List[tuple]:
+    """
+    Run ``python -X importtime -c "import <module>"`` and return
+    (depth, cumulative_ms, self_ms, name) rows in import order.
+    """
+    env = dict(os.environ, WARMUP="off")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(BACKEND_DIR),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        depth = (len(indent) - 1) // 2
+        rows.append((depth, int(cumulative_us) / 1000, int(self_us) / 1000, name))
+
+    # importtime prints children before their parent; reverse to read top-down
+    rows.reverse()
+    return rows
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_healthy(timeout: float = HEALTH_TIMEOUT_S) -> Optional[float]:
+    """Start ``api.py`` in a subprocess and time until /api/health answers 200."""
+    port = _free_port()
+    env = dict(os.environ, PORT=str(port))
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "api.py"],
+        cwd=str(BACKEND_DIR),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}/api/health"
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                return None
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.02)
+        return None
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def profile_startup(module: str = "api", min_ms: float = MIN_IMPORT_TREE_MS):
+    """Print the import-time tree of the serving module and the time to first healthy response."""
+    print(f"\n Import-time tree for '{module}' (>= {min_ms:.0f} ms cumulative)")
+    print(f" {'cumul ms':>9} {'self ms':>8}  module")
+    rows = import_time_tree(module)
+    for depth, cumulative_ms, self_ms, name in rows:
+        if cumulative_ms >= min_ms:
+            print(f" {cumulative_ms:9.1f} {self_ms:8.1f}  {'  ' * depth}{name}")
+    print(f"\n Total import time: {sum(r[1] for r in rows if r[0] == 0):.1f} ms")
+
+    elapsed = time_to_first_healthy()
+    if elapsed is None:
+        print(" Time to first healthy response: server did not become healthy")
+    else:
+        print(f" Time to first healthy response: {elapsed * 1000:.0f} ms\n")
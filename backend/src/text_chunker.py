@@ -47,6 +47,11 @@ def is_junk_page(text: str) -> bool:
     return False
 
 
+def starts_section(text: str) -> bool:
+    """True when a chunk opens with a section heading (chunks without ``section`` metadata)."""
+    return _HEADING_PATTERNS.match(text.lstrip()) is not None
+
+
 def _find_section_breaks(text: str) -> List[int]:
     """Return character offsets where section headings start."""
     breaks = []
@@ -66,6 +71,8 @@ def split_documents(
     2. Detect section headings and split at boundaries.
     3. If a section is bigger than chunk_size, sub-split with overlap.
     4. Map each chunk back to exact source pages via character offsets.
+    Chunks carry ``chunk_index`` (order in the PDF) and ``section`` (heading
+    section number in the PDF), from which the chunk adjacency is built.
     """
     if chunk_size <= 0:
         raise ValueError("chunk_size must be > 0")
@@ -115,7 +122,7 @@ def split_documents(
 
         # Sub-split and map pages
         chunk_index = 0
-        for section_text, sec_start, sec_end in sections:
+        for section_no, (section_text, sec_start, sec_end) in enumerate(sections):
             sub_chunks = _subsplit(section_text, chunk_size, chunk_overlap)
             # Track offset within the section
             offset_in_section = 0
@@ -139,6 +146,7 @@ def split_documents(
                     "source_file": source_file,
                     "page": _format_pages(chunk_pages),
                     "chunk_index": chunk_index,
+                    "section": section_no,
                 }
                 chunks.append(Document(page_content=sc, metadata=metadata))
                 chunk_index += 1
@@ -0,0 +1,269 @@
+"""
+Lean FAISS wrapper: reads index.faiss directly (mmap when supported) and maps
+FAISS rows to chunk ids through a NumPy array. No LangChain docstore, no
+pickle, and no embeddings client needed to load: callers pass query vectors.
+
+Indexes can store reduced embeddings (Matryoshka truncation or PCA); the
+reduction is recorded in index.meta.json (+ index.pca.npy) and applied to the
+full-width query vectors at search time.
+"""
+from __future__ import annotations
+
+import importlib.util
+import json
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+INDEX_FILENAME = "index.faiss"
+IDS_FILENAME = "index.ids.npy"
+LEGACY_DOCSTORE_FILENAME = "index.pkl"
+META_FILENAME = "index.meta.json"
+PCA_FILENAME = "index.pca.npy"
+REDUCTION_METHODS = ("none", "truncate", "pca")
+
+
+def faiss_available() -> bool:
+    return importlib.util.find_spec("faiss") is not None
+
+
+def _read_index(path: Path, use_mmap: bool):
+    import faiss
+
+    if use_mmap:
+        try:
+            return faiss.read_index(str(path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            pass  # index type without mmap support in this FAISS build
+    return faiss.read_index(str(path))
+
+
+def _as_matrix(vectors) -> np.ndarray:
+    matrix = np.ascontiguousarray(np.asarray(vectors, dtype=np.float32))
+    return matrix.reshape(1, -1) if matrix.ndim == 1 else matrix
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class EmbeddingReducer:
+    """
+    Maps full-width embeddings to the stored dimension.
+    "truncate" keeps the first ``dim`` components (Matryoshka embeddings such as
+    gemini-embedding-001) and re-normalizes them; "pca" projects the centered
+    vectors on the top ``dim`` principal axes fitted on the guide's chunks.
+    """
+
+    def __init__(self, method: str, source_dim: int, dim: int, pca: Optional[np.ndarray] = None):
+        if method not in REDUCTION_METHODS:
+            raise ValueError(f"Unknown embedding reduction '{method}'")
+        self.method = method
+        self.source_dim = source_dim
+        self.dim = dim
+        # PCA parameters: row 0 = mean, rows 1..dim = principal axes
+        self.pca = pca
+
+    @classmethod
+    def fit(cls, vectors, method: str = "none", dim: Optional[int] = None) -> "EmbeddingReducer":
+        matrix = _as_matrix(vectors)
+        source_dim = matrix.shape[1]
+        if method == "none" or not dim or dim >= source_dim:
+            return cls("none", source_dim, source_dim)
+        if method == "pca":
+            if dim > len(matrix):
+                raise ValueError(f"PCA to {dim} dimensions needs at least {dim} vectors, got {len(matrix)}")
+            mean = matrix.mean(axis=0)
+            _, _, axes = np.linalg.svd(matrix - mean, full_matrices=False)
+            return cls("pca", source_dim, dim, np.vstack([mean, axes[:dim]]).astype(np.float32))
+        return cls(method, source_dim, dim)
+
+    def apply(self, vectors) -> np.ndarray:
+        matrix = _as_matrix(vectors)
+        if self.method == "none" or matrix.shape[1] == self.dim:
+            return matrix
+        if matrix.shape[1] != self.source_dim:
+            raise ValueError(f"Expected {self.source_dim}-d vectors, got {matrix.shape[1]}-d")
+        if self.method == "truncate":
+            return np.ascontiguousarray(_normalize(matrix[:, :self.dim]))
+        return np.ascontiguousarray((matrix - self.pca[0]) @ self.pca[1:].T, dtype=np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return 0 if self.pca is None else self.pca.nbytes
+
+    def to_meta(self) -> dict:
+        return {"reduction": self.method, "source_dim": self.source_dim, "dim": self.dim}
+
+    @classmethod
+    def from_meta(cls, meta: Optional[dict], pca: Optional[np.ndarray], index_dim: int) -> "EmbeddingReducer":
+        if not meta:
+            return cls("none", index_dim, index_dim)
+        reducer = cls(meta.get("reduction", "none"), int(meta["source_dim"]), int(meta["dim"]), pca)
+        if reducer.dim != index_dim:
+            raise ValueError(f"{META_FILENAME} says {reducer.dim} dimensions, index has {index_dim}")
+        if reducer.method == "pca" and (pca is None or pca.shape != (reducer.dim + 1, reducer.source_dim)):
+            raise ValueError(f"{PCA_FILENAME} missing or inconsistent with {META_FILENAME}")
+        return reducer
+
+    def stage(self, directory: Path) -> List[Tuple[Optional[Path], Path]]:
+        """Write index.meta.json (+ index.pca.npy) as temp files, see _replace_staged."""
+        directory = Path(directory)
+        pca_path = directory / PCA_FILENAME
+        staged: List[Tuple[Optional[Path], Path]] = [(None, pca_path)]
+        if self.pca is not None:
+            staged = [(_stage_npy(pca_path, self.pca), pca_path)]
+
+        tmp_meta = directory / (META_FILENAME + ".tmp")
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(self.to_meta(), f)
+        return staged + [(tmp_meta, directory / META_FILENAME)]
+
+    @classmethod
+    def load(cls, directory: Path, index_dim: int) -> "EmbeddingReducer":
+        directory = Path(directory)
+        meta_path = directory / META_FILENAME
+        if not meta_path.exists():
+            return cls("none", index_dim, index_dim)
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        pca_path = directory / PCA_FILENAME
+        pca = np.load(pca_path) if pca_path.exists() else None
+        return cls.from_meta(meta, pca, index_dim)
+
+
+class VectorIndex:
+    """Raw FAISS index plus a row -> chunk id array."""
+
+    def __init__(self, index, row_to_chunk: np.ndarray, reducer: Optional[EmbeddingReducer] = None):
+        self.index = index
+        self.row_to_chunk = row_to_chunk
+        self.reducer = reducer or EmbeddingReducer("none", index.d, index.d)
+
+    @classmethod
+    def load(cls, directory: Path, use_mmap: bool = True) -> Optional["VectorIndex"]:
+        directory = Path(directory)
+        index_path = directory / INDEX_FILENAME
+        if not index_path.exists() or not faiss_available():
+            return None
+
+        index = _read_index(index_path, use_mmap)
+        ids_path = directory / IDS_FILENAME
+        if ids_path.exists():
+            row_to_chunk = np.load(ids_path, mmap_mode="r")
+        elif (directory / LEGACY_DOCSTORE_FILENAME).exists():
+            # LangChain save: its rows follow the docstore, not the chunk store
+            raise ValueError(
+                f"{LEGACY_DOCSTORE_FILENAME} without {IDS_FILENAME}: run 'python -m migrate_indexes'"
+            )
+        else:
+            # Indexes built by index_manuals add chunks in order: row == chunk id
+            row_to_chunk = np.arange(index.ntotal, dtype=np.int64)
+
+        if len(row_to_chunk) != index.ntotal:
+            raise ValueError(
+                f"{ids_path.name} has {len(row_to_chunk)} ids for {index.ntotal} vectors"
+            )
+        return cls(index, row_to_chunk, EmbeddingReducer.load(directory, index.d))
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    @property
+    def dim(self) -> int:
+        return self.index.d
+
+    def search(
+        self, query_vectors, k: int
+    ) -> List[List[Tuple[int, float]]]:
+        """(chunk id, L2 distance) hits for each row of the (full-width) query matrix."""
+        matrix = self.reducer.apply(query_vectors)
+        distances, rows = self.index.search(matrix, k)
+        return [
+            [
+                (int(self.row_to_chunk[row]), float(distance))
+                for distance, row in zip(row_distances, row_ids)
+                if row != -1
+            ]
+            for row_distances, row_ids in zip(distances, rows)
+        ]
+
+
+def _stage_npy(path: Path, array) -> Path:
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    return tmp_path
+
+
+def _replace_staged(staged: List[Tuple[Optional[Path], Path]]):
+    """
+    Move temp files over their targets (None: remove the target), back to
+    back once every file is written: a failed write leaves the previous
+    index whole. The ids go first and index.faiss last, so a reader loading
+    in between sees a count mismatch (VectorIndex.load raises) rather than a
+    new index with old files.
+    """
+    for tmp_path, path in staged:
+        if tmp_path is not None:
+            os.replace(tmp_path, path)
+        elif path.exists():
+            path.unlink()
+
+
+def _drop_legacy_docstore(directory: Path):
+    legacy = directory / LEGACY_DOCSTORE_FILENAME
+    if legacy.exists():
+        legacy.unlink()
+
+
+def write_vector_index(
+    vectors,
+    directory: Path,
+    chunk_ids: Optional[List[int]] = None,
+    reduction: str = "none",
+    dim: Optional[int] = None,
+) -> Path:
+    """
+    Write a flat L2 index, its reduction and its row -> chunk id array as one
+    group, storing the vectors reduced to ``dim`` dimensions with
+    ``reduction`` when requested.
+    """
+    import faiss
+
+    directory = Path(directory)
+    reducer = EmbeddingReducer.fit(vectors, reduction, dim)
+    matrix = reducer.apply(vectors)
+    index = faiss.IndexFlatL2(matrix.shape[1])
+    index.add(matrix)
+
+    ids = np.asarray(list(chunk_ids if chunk_ids is not None else range(len(matrix))), dtype=np.int64)
+    index_path = directory / INDEX_FILENAME
+    ids_path = directory / IDS_FILENAME
+    staged = [(_stage_npy(ids_path, ids), ids_path)]
+    try:
+        staged += reducer.stage(directory)
+        tmp_index = directory / (INDEX_FILENAME + ".tmp")
+        faiss.write_index(index, str(tmp_index))
+        staged.append((tmp_index, index_path))
+    except BaseException:
+        for tmp_path, _ in staged:
+            if tmp_path is not None:
+                tmp_path.unlink(missing_ok=True)
+        raise
+    _replace_staged(staged)
+    _drop_legacy_docstore(directory)
+    return index_path
+
+
+def write_row_ids(directory: Path, chunk_ids) -> Path:
+    """Write the row -> chunk id array and drop the obsolete LangChain docstore."""
+    directory = Path(directory)
+    ids_path = directory / IDS_FILENAME
+    _replace_staged([(_stage_npy(ids_path, np.asarray(list(chunk_ids), dtype=np.int64)), ids_path)])
+    _drop_legacy_docstore(directory)
+    return ids_path
@@ -1,19 +1,55 @@
 """
 Vector store module using FAISS for the RAG pipeline.
+Guide indexes are served by src.vector_index; the LangChain FAISS helpers
+below are kept for standalone use and are imported lazily.
 """
-from typing import List, Optional
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List, Optional
 import importlib.util
+import threading
 
-from langchain_community.vectorstores import FAISS
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_core.documents import Document
 
-from .config import VECTOR_STORE_DIR, TOP_K_RESULTS, EMBEDDING_MODEL
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+
+from .config import (
+    VECTOR_STORE_DIR,
+    TOP_K_RESULTS,
+    EMBEDDING_MODEL,
+    LLM_BASE_URL,
+    ensure_data_dirs,
+    require_google_api_key,
+)
+
+
+_embeddings: Optional[GoogleGenerativeAIEmbeddings] = None
+_embeddings_lock = threading.Lock()
 
 
 def get_embeddings() -> GoogleGenerativeAIEmbeddings:
-    """Initialise le modele d'embeddings Google."""
-    return GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
+    """Modele d'embeddings Google (instance unique, utilisee pour l'indexation)."""
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                _embeddings = GoogleGenerativeAIEmbeddings(
+                    model=EMBEDDING_MODEL,
+                    google_api_key=require_google_api_key(),
+                    base_url=LLM_BASE_URL,
+                )
+    return _embeddings
+
+
+def embed_queries(texts: List[str], timeout_s: Optional[float] = None) -> List[List[float]]:
+    """Embed several search queries in one batched call on the shared client."""
+    if not texts:
+        return []
+    from .llm_client import get_llm_client
+
+    return get_llm_client().embed(texts, task_type="RETRIEVAL_QUERY", timeout_s=timeout_s)
 
 
 def _faiss_available() -> bool:
@@ -32,9 +68,13 @@ def create_vector_store(
             "Utilisez Python 3.12 + faiss-cpu, ou activez le mode BM25 uniquement."
         )
 
+    from langchain_community.vectorstores import FAISS
+
     embeddings = get_embeddings()
     vector_store = FAISS.from_documents(documents=documents, embedding=embeddings)
 
+    if persist_directory is None:
+        ensure_data_dirs()
     save_dir = persist_directory or str(VECTOR_STORE_DIR)
     vector_store.save_local(save_dir)
     print(f"Vector store created and saved to {save_dir}")
@@ -54,6 +94,8 @@ def load_vector_store(persist_directory: Optional[str] = None) -> Optional[FAISS
     if not index_path.exists():
         return None
 
+    from langchain_community.vectorstores import FAISS
+
     embeddings = get_embeddings()
     try:
         vector_store = FAISS.load_local(
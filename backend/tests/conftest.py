@@ -0,0 +1,73 @@
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# Tests import the backend modules as the CLIs do (src.*), without a real API key
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+
+
+class FakeGemini:
+    """Local server speaking the Gemini REST API (generateContent, embedContent)."""
+
+    def __init__(self):
+        self.delay_s = 0.0
+        self.slow_first = 0      # the next N requests take slow_delay_s
+        self.slow_delay_s = 3.0
+        self.fail = False
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+                with fake._lock:
+                    fake.calls += 1
+                    delay = fake.delay_s
+                    if fake.slow_first > 0:
+                        fake.slow_first -= 1
+                        delay = fake.slow_delay_s
+                time.sleep(delay)
+                if fake.fail:
+                    code, out = 503, {"error": {"code": 503, "message": "unavailable", "status": "UNAVAILABLE"}}
+                elif "embed" in self.path.lower():
+                    code, out = 200, {"embeddings": [{"values": [0.1] * 8} for _ in body.get("requests") or [body]]}
+                else:
+                    code, out = 200, {"candidates": [{"content": {"role": "model", "parts": [{"text": "Reponse."}]}}]}
+                data = json.dumps(out).encode()
+                try:
+                    self.send_response(code)
+                    self.send_header("content-type", "application/json")
+                    self.send_header("content-length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except OSError:
+                    pass  # the client gave up (timeout)
+
+        return Handler
+
+
+@pytest.fixture
+def fake_gemini():
+    fake = FakeGemini()
+    threading.Thread(target=fake.server.serve_forever, daemon=True).start()
+    yield fake
+    fake.server.shutdown()
+    fake.server.server_close()
@@ -0,0 +1,167 @@
+import threading
+import time
+
+import pytest
+
+from src.admission import AdmissionController, Overloaded, TokenBucketLimiter
+
+
+def _hold(controller, slug, started, release):
+    with controller.slot(slug):
+        started.set()
+        release.wait(5)
+
+
+def _occupy(controller, slug="clio-4"):
+    started, release = threading.Event(), threading.Event()
+    thread = threading.Thread(target=_hold, args=(controller, slug, started, release))
+    thread.start()
+    assert started.wait(5)
+    return release, thread
+
+
+def test_queued_request_admitted_when_a_slot_frees():
+    controller = AdmissionController(max_concurrent=1, max_per_guide=1, max_queue=4, queue_slo_s=5)
+    release, holder = _occupy(controller)
+    threading.Timer(0.1, release.set).start()
+
+    start = time.monotonic()
+    with controller.slot("clio-4"):
+        waited = time.monotonic() - start
+    holder.join()
+    assert 0.05 < waited < 2
+    metrics = controller.metrics()
+    assert (metrics["admitted"], metrics["waited"], metrics["running"], metrics["queue_depth"]) == (2, 1, 0, 0)
+
+
+def test_full_queue_is_shed():
+    controller = AdmissionController(max_concurrent=1, max_per_guide=1, max_queue=0, queue_slo_s=5)
+    release, holder = _occupy(controller)
+    try:
+        with pytest.raises(Overloaded) as info:
+            with controller.slot("clio-4"):
+                pass
+        assert info.value.retry_after >= 1
+        assert controller.metrics()["rejected_queue_full"] == 1
+    finally:
+        release.set()
+        holder.join()
+
+
+def test_estimated_wait_over_slo_is_shed_at_once():
+    controller = AdmissionController(max_concurrent=1, max_per_guide=1, max_queue=10, queue_slo_s=1)
+    controller.service_s = 5.0  # mean LLM call: one queued request already exceeds the SLO
+    release, holder = _occupy(controller)
+    try:
+        start = time.monotonic()
+        with pytest.raises(Overloaded):
+            with controller.slot("clio-4"):
+                pass
+        assert time.monotonic() - start < 0.5
+        assert controller.metrics()["rejected_slo"] == 1
+    finally:
+        release.set()
+        holder.join()
+
+
+def test_wait_bounded_by_max_wait():
+    controller = AdmissionController(max_concurrent=1, max_per_guide=1, max_queue=10, queue_slo_s=30)
+    controller.service_s = 0.1
+    release, holder = _occupy(controller)
+    try:
+        start = time.monotonic()
+        with pytest.raises(Overloaded):
+            with controller.slot("clio-4", max_wait_s=0.2):
+                pass
+        assert time.monotonic() - start < 1
+        assert controller.metrics()["timed_out"] == 1
+    finally:
+        release.set()
+        holder.join()
+
+
+def test_per_guide_limit_leaves_other_guides_running():
+    controller = AdmissionController(max_concurrent=2, max_per_guide=1, max_queue=0, queue_slo_s=5)
+    release, holder = _occupy(controller, "clio-4")
+    try:
+        with controller.slot("tesla-model-y"):
+            pass
+        with pytest.raises(Overloaded):
+            with controller.slot("clio-4"):
+                pass
+    finally:
+        release.set()
+        holder.join()
+
+
+def test_freed_slot_goes_to_the_queued_waiter_not_a_new_arrival():
+    controller = AdmissionController(max_concurrent=1, max_per_guide=1, max_queue=4, queue_slo_s=5)
+    controller._take("clio-4")
+    admitted = threading.Event()
+
+    def wait_in_queue():
+        with controller.slot("clio-4"):
+            admitted.set()
+
+    waiter = threading.Thread(target=wait_in_queue)
+    waiter.start()
+    while controller.metrics()["queue_depth"] < 1:
+        time.sleep(0.01)
+
+    with controller._cond:  # the waiter cannot run before the arrival below
+        controller._leave("clio-4")
+        with pytest.raises(Overloaded):
+            with controller.slot("tesla-model-y", max_wait_s=0):
+                pass
+    waiter.join(5)
+    assert admitted.is_set()
+
+
+def test_waiters_admitted_in_arrival_order():
+    controller = AdmissionController(max_concurrent=1, max_per_guide=1, max_queue=4, queue_slo_s=30)
+    release, holder = _occupy(controller)
+    order = []
+
+    def queued(name):
+        with controller.slot("clio-4"):
+            order.append(name)
+
+    threads = []
+    for depth, name in enumerate(["first", "second", "third"], 1):
+        threads.append(threading.Thread(target=queued, args=(name,)))
+        threads[-1].start()
+        while controller.metrics()["queue_depth"] < depth:
+            time.sleep(0.01)
+    release.set()
+    for thread in [holder] + threads:
+        thread.join(5)
+    assert order == ["first", "second", "third"]
+
+
+def test_only_completed_llm_calls_update_the_service_time():
+    controller = AdmissionController(max_concurrent=2, max_per_guide=2, max_queue=4, queue_slo_s=5)
+    with controller.slot("clio-4"):
+        pass  # gave up before calling the LLM
+    with controller.background_slot("clio-4"):
+        pass
+    assert controller.service_s == 3.0
+    controller.record_service(8.0)
+    assert controller.service_s == pytest.approx(4.0)
+
+
+def test_background_slot_never_waits():
+    controller = AdmissionController(max_concurrent=1, max_per_guide=1, max_queue=4, queue_slo_s=5)
+    with controller.background_slot("clio-4") as acquired:
+        assert acquired
+        with controller.background_slot("clio-4") as second:
+            assert not second
+    assert controller.metrics()["skipped_background"] == 1
+
+
+def test_token_bucket_limits_bursts():
+    limiter = TokenBucketLimiter(rate_per_min=60, burst=2)
+    assert limiter.allow("1.2.3.4")[0]
+    assert limiter.allow("1.2.3.4")[0]
+    allowed, wait_s = limiter.allow("1.2.3.4")
+    assert not allowed and 0 < wait_s <= 1
+    assert limiter.allow("5.6.7.8")[0]
@@ -0,0 +1,126 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src import batch_qa
+from src.llm_client import CircuitOpenError, UpstreamError
+
+GUIDES = {
+    "clio-4": SimpleNamespace(slug="clio-4", is_indexed=True),
+    "tesla-model-y": SimpleNamespace(slug="tesla-model-y", is_indexed=True),
+    "draft": SimpleNamespace(slug="draft", is_indexed=False),
+}
+
+
+class FakeChatbot:
+    has_vectors = False
+
+    def __init__(self, slug):
+        self.guide = GUIDES[slug]
+
+    def canned_answer(self, question, lang):
+        return None
+
+    def search_batch(self, questions, k, query_vectors=None):
+        return [[] for _ in questions]
+
+    def generate(self, question, docs, lang):
+        return f"Reponse: {question}"
+
+
+@pytest.fixture
+def guides(monkeypatch):
+    monkeypatch.setattr(batch_qa.guide_manager, "get_guide", GUIDES.get)
+    monkeypatch.setattr(batch_qa, "RETRY_BACKOFF_SECONDS", 0)
+
+
+def test_prepare_items_dedupes_and_rejects(guides):
+    items, rejected = batch_qa.prepare_items([
+        {"guide": "clio-4", "question": "Pression des pneus ?", "lang": "fr"},
+        {"slug": "clio-4", "question": "  pression des PNEUS ?  ", "lang": "fr"},
+        {"guide": "clio-4", "question": "Pression des pneus ?", "lang": "en"},
+        {"guide": "draft", "question": "Pression ?"},
+        {"guide": "nope", "question": "Pression ?"},
+        {"guide": "clio-4", "question": "  "},
+    ])
+
+    assert [(i["lang"], i["count"]) for i in items] == [("fr", 2), ("en", 1)]
+    assert [(r["position"], r["error"]) for r in rejected] == [
+        (3, "Guide introuvable"), (4, "Guide introuvable"), (5, "Question vide"),
+    ]
+
+
+def test_completed_ids_skip_only_successes(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text(
+        json.dumps({"id": "a", "status": "ok"}) + "\n"
+        + json.dumps({"id": "b", "status": "error"}) + "\n"
+        + '{"id": "c", "sta',  # interrupted while writing
+        encoding="utf-8",
+    )
+    assert batch_qa.load_completed_ids(output) == {"a"}
+    assert batch_qa.load_completed_ids(tmp_path / "missing.jsonl") == set()
+
+
+def test_resumed_run_answers_only_missing_items(guides, monkeypatch, tmp_path):
+    monkeypatch.setattr(batch_qa, "get_guide_chatbot", FakeChatbot)
+    monkeypatch.setattr(batch_qa, "_generate_in_slot", lambda chatbot, item, docs: "ok")
+    output = tmp_path / "results.jsonl"
+    raw = [{"guide": "clio-4", "question": q, "lang": "fr"} for q in ("Pneus ?", "Huile ?")]
+
+    first = batch_qa.run_batch(raw[:1], output_path=output)
+    second = batch_qa.run_batch(raw, output_path=output)
+
+    assert first["summary"]["answered"] == 1
+    assert (second["summary"]["answered"], second["summary"]["skipped"]) == (1, 1)
+    assert len(output.read_text(encoding="utf-8").splitlines()) == 2
+
+
+def test_retries_transient_errors(monkeypatch):
+    monkeypatch.setattr(batch_qa, "RETRY_BACKOFF_SECONDS", 0)
+    failures = [UpstreamError("503"), UpstreamError("503")]
+
+    def flaky(chatbot, item, docs):
+        if failures:
+            raise failures.pop()
+        return "Reponse"
+
+    monkeypatch.setattr(batch_qa, "_generate_in_slot", flaky)
+    record = batch_qa._generate_with_retries(None, {"id": "a"}, [], retries=3)
+    assert (record["status"], record["attempts"]) == ("ok", 3)
+
+    failures.extend([UpstreamError("503")] * 5)
+    record = batch_qa._generate_with_retries(None, {"id": "a"}, [], retries=2)
+    assert (record["status"], record["attempts"]) == ("error", 3)
+
+
+def test_open_circuit_stops_retrying(monkeypatch):
+    calls = []
+
+    def circuit_open(chatbot, item, docs):
+        calls.append(1)
+        raise CircuitOpenError("circuit open")
+
+    monkeypatch.setattr(batch_qa, "_generate_in_slot", circuit_open)
+    record = batch_qa._generate_with_retries(None, {"id": "a"}, [], retries=3)
+    assert (record["status"], record["error"], len(calls)) == ("error", "circuit open", 1)
+
+
+def test_unloadable_guide_does_not_abort_the_batch(guides, monkeypatch):
+    def get_chatbot(slug):
+        if slug == "tesla-model-y":
+            raise ValueError("Guide 'tesla-model-y' is not indexed yet")
+        return FakeChatbot(slug)
+
+    monkeypatch.setattr(batch_qa, "get_guide_chatbot", get_chatbot)
+    monkeypatch.setattr(batch_qa, "_generate_in_slot", lambda chatbot, item, docs: "ok")
+    result = batch_qa.run_batch([
+        {"guide": "tesla-model-y", "question": "Recharge ?", "lang": "fr"},
+        {"guide": "clio-4", "question": "Pneus ?", "lang": "fr"},
+    ])
+
+    by_guide = {r["guide"]: r for r in result["results"]}
+    assert by_guide["clio-4"]["status"] == "ok"
+    assert by_guide["tesla-model-y"]["status"] == "error"
+    assert "not indexed" in by_guide["tesla-model-y"]["error"]
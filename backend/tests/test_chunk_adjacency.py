@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+
+from src import guide_chatbot
+from src.chunk_adjacency import ChunkAdjacency, adjacency_from_chunks
+from src.chunk_store import InMemoryChunks
+
+
+def _chunks(spec):
+    """spec: (source, section, tokens) per chunk, in PDF order."""
+    return [
+        Document(page_content="x" * (4 * tokens), metadata={"source_file": source, "section": section, "chunk_index": i})
+        for i, (source, section, tokens) in enumerate(spec)
+    ]
+
+
+# Two PDFs; the first has sections 1 (chunks 0-2) and 2 (chunks 3-4)
+MANUAL = _chunks([
+    ("clio.pdf", 1, 100), ("clio.pdf", 1, 100), ("clio.pdf", 1, 100),
+    ("clio.pdf", 2, 100), ("clio.pdf", 2, 100),
+    ("annexe.pdf", 1, 100), ("annexe.pdf", 1, 100),
+])
+
+
+def _adjacency(chunks=MANUAL):
+    return ChunkAdjacency(adjacency_from_chunks(chunks))
+
+
+def test_neighbours_within_the_token_budget():
+    adjacency = _adjacency()
+    assert adjacency.expand(1, hops=1, budget=1000) == ([0], [2], 200)
+    # Budget for one neighbour: the next chunk first (procedures continue forward)
+    assert adjacency.expand(1, hops=1, budget=150) == ([], [2], 100)
+    assert adjacency.expand(1, hops=1, budget=50) == ([], [], 0)
+
+
+def test_expansion_stops_at_the_end_of_the_document():
+    adjacency = _adjacency()
+    # Chunk 4 ends clio.pdf, chunk 5 starts annexe.pdf
+    assert adjacency.expand(4, hops=2, budget=1000, same_section=False) == ([3, 2], [], 200)
+    assert adjacency.expand(5, hops=2, budget=1000, same_section=False) == ([], [6], 100)
+
+
+def test_section_scope():
+    adjacency = _adjacency()
+    assert adjacency.expand(2, hops=1, budget=1000, same_section=True) == ([1], [], 100)
+    assert adjacency.expand(2, hops=1, budget=1000, same_section=False) == ([1], [3], 200)
+
+
+def test_chunks_already_in_context_are_not_repeated():
+    assert _adjacency().expand(1, hops=2, budget=1000, skip={2}) == ([0], [], 100)
+
+
+def test_neighbours_never_cross_shards(monkeypatch):
+    monkeypatch.setattr(guide_chatbot, "CONTEXT_EXPAND_HOPS", 2)
+    monkeypatch.setattr(guide_chatbot, "CONTEXT_EXPAND_SCOPE", "document")
+    first = _chunks([("clio.pdf", 1, 100)] * 3)
+    second = _chunks([("annexe.pdf", 1, 100)] * 3)
+    chatbot = guide_chatbot.GuideChatbot.__new__(guide_chatbot.GuideChatbot)
+    chatbot.shards = [
+        SimpleNamespace(chunks=InMemoryChunks(first), adjacency=_adjacency(first)),
+        SimpleNamespace(chunks=InMemoryChunks(second), adjacency=_adjacency(second)),
+    ]
+
+    # Hits: last chunk of shard 0 and first chunk of shard 1
+    expanded = chatbot._with_neighbours([((0, 2), first[2], 0.9), ((1, 0), second[0], 0.8)], budget=1000)
+
+    assert [(d.metadata["source_file"], d.metadata["chunk_index"], s) for d, s in expanded] == [
+        ("clio.pdf", 0, 0.9), ("clio.pdf", 1, 0.9), ("clio.pdf", 2, 0.9),
+        ("annexe.pdf", 0, 0.8), ("annexe.pdf", 1, 0.8), ("annexe.pdf", 2, 0.8),
+    ]
+
+
+def test_budget_shared_by_the_hits_best_first():
+    chatbot = guide_chatbot.GuideChatbot.__new__(guide_chatbot.GuideChatbot)
+    chatbot.shards = [SimpleNamespace(chunks=InMemoryChunks(MANUAL), adjacency=_adjacency())]
+    expanded = chatbot._with_neighbours([((0, 1), MANUAL[1], 0.9), ((0, 6), MANUAL[6], 0.5)], budget=250)
+    assert [d.metadata["chunk_index"] for d, _ in expanded] == [0, 1, 2, 6]
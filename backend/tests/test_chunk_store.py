@@ -0,0 +1,80 @@
+import json
+import shutil
+
+import pytest
+from langchain_core.documents import Document
+
+from src import chunk_store
+from src.chunk_store import BLOB_FILENAME, META_FILENAME, ChunkStore, InMemoryChunks, load_chunks
+
+CHUNKS = [
+    Document(page_content="Pression des pneus: 2,2 bar a l'avant.", metadata={"source_file": "clio.pdf", "page": 12, "chunk_index": 0}),
+    Document(page_content="Vidange tous les 30 000 km. Huile 5W-30, 4,5 l.", metadata={"source_file": "clio.pdf", "page": 80, "chunk_index": 1}),
+    Document(page_content="타이어 공기압 확인", metadata={"source_file": "annexe.pdf", "page": 3, "chunk_index": 0}),
+]
+
+
+@pytest.fixture(params=["zstd", "zlib"])
+def codec(request, monkeypatch):
+    if request.param == "zstd":
+        pytest.importorskip("zstandard")
+    else:
+        monkeypatch.setattr(chunk_store, "_zstd_available", lambda: False)
+    return request.param
+
+
+def test_round_trip(tmp_path, codec):
+    stats = chunk_store.write_chunk_store(CHUNKS, tmp_path)
+    assert (stats["chunks"], stats["codec"]) == (3, codec)
+
+    store = ChunkStore.load(tmp_path)
+    try:
+        assert len(store) == 3
+        assert [doc.page_content for doc in store.iter_documents()] == [doc.page_content for doc in CHUNKS]
+        assert store.metadata(2) == {"source_file": "annexe.pdf", "page": "3", "chunk_index": 0, "chunk_id": 2}
+        assert [doc.metadata["page"] for doc in store.documents([1, 0])] == ["80", "12"]
+    finally:
+        store.close()
+
+
+def test_store_half_replaced_by_a_crash_is_refused(tmp_path, codec):
+    chunk_store.write_chunk_store(CHUNKS, tmp_path)
+    old_meta = (tmp_path / META_FILENAME).read_bytes()
+    chunk_store.write_chunk_store(CHUNKS[:2], tmp_path)
+    (tmp_path / META_FILENAME).write_bytes(old_meta)  # crashed before the metadata was replaced
+
+    with pytest.raises(ValueError, match="re-run index_manuals"):
+        ChunkStore.load(tmp_path)
+
+
+def test_blob_from_another_write_is_refused(tmp_path, codec):
+    other = tmp_path / "other"
+    other.mkdir()
+    chunk_store.write_chunk_store(CHUNKS, tmp_path)
+    chunk_store.write_chunk_store(CHUNKS[::-1] + CHUNKS[:1], other)
+    shutil.copy(other / BLOB_FILENAME, tmp_path / BLOB_FILENAME)
+
+    with pytest.raises(ValueError):
+        ChunkStore.load(tmp_path)
+
+
+def test_store_without_size_fields_still_loads(tmp_path, codec):
+    chunk_store.write_chunk_store(CHUNKS, tmp_path)
+    meta = json.loads((tmp_path / META_FILENAME).read_text(encoding="utf-8"))
+    del meta["blob_bytes"], meta["offsets_crc32"]
+    (tmp_path / META_FILENAME).write_text(json.dumps(meta), encoding="utf-8")
+
+    store = ChunkStore.load(tmp_path)
+    assert store.text(1) == CHUNKS[1].page_content
+    store.close()
+
+
+def test_legacy_chunks_without_a_store(tmp_path):
+    assert ChunkStore.load(tmp_path) is None
+
+    chunks = load_chunks(tmp_path, CHUNKS)
+    assert isinstance(chunks, InMemoryChunks)
+    assert len(chunks) == 3
+    assert chunks.text(0) == CHUNKS[0].page_content
+    assert chunks.documents([2])[0].metadata["source_file"] == "annexe.pdf"
+    assert len(load_chunks(tmp_path)) == 0
@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from src.coalescing import SingleFlight
+
+
+def _concurrent(n, target):
+    results = [None] * n
+    errors = [None] * n
+
+    def run(i):
+        try:
+            results[i] = target()
+        except Exception as exc:
+            errors[i] = exc
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_identical_calls_run_once():
+    flights = SingleFlight(shared_dir=None, wait_s=5)
+    calls = []
+
+    def answer():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"response": "ok"}
+
+    results, _ = _concurrent(5, lambda: flights.do(("clio-4", "fr", "q"), answer))
+
+    assert len(calls) == 1
+    assert all(result == {"response": "ok"} for result, _ in results)
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert flights.metrics()["followers"] == 4
+
+
+def test_leader_error_reaches_followers_and_is_not_kept():
+    flights = SingleFlight(shared_dir=None, wait_s=5)
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError("upstream down")
+
+    _, errors = _concurrent(3, lambda: flights.do(("k",), failing))
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert flights.do(("k",), lambda: {"response": "ok"}) == ({"response": "ok"}, False)
+
+
+def test_follower_answers_itself_when_the_leader_is_stuck():
+    flights = SingleFlight(shared_dir=None, wait_s=0.1)
+    release = threading.Event()
+    leader = threading.Thread(target=flights.do, args=(("k",), lambda: release.wait(5) and {"response": "slow"}))
+    leader.start()
+    time.sleep(0.05)
+    try:
+        assert flights.do(("k",), lambda: {"response": "own"}) == ({"response": "own"}, False)
+    finally:
+        release.set()
+        leader.join()
+
+
+def test_cross_worker_result_reused_within_ttl(tmp_path):
+    pytest.importorskip("fcntl")
+    worker_a = SingleFlight(shared_dir=str(tmp_path), wait_s=5, result_ttl_s=0.3)
+    worker_b = SingleFlight(shared_dir=str(tmp_path), wait_s=5, result_ttl_s=0.3)
+    key = ("clio-4", "fr", "q")
+
+    assert worker_a.do(key, lambda: {"response": "a"}) == ({"response": "a"}, False)
+    assert worker_b.do(key, lambda: {"response": "b"}) == ({"response": "a"}, True)
+    assert worker_b.metrics()["cross_worker"] == 1
+
+    time.sleep(0.35)
+    assert worker_b.do(key, lambda: {"response": "b"}) == ({"response": "b"}, False)
+
+
+def test_unshareable_result_not_published(tmp_path):
+    pytest.importorskip("fcntl")
+    worker_a = SingleFlight(shared_dir=str(tmp_path), wait_s=5)
+    worker_b = SingleFlight(shared_dir=str(tmp_path), wait_s=5)
+    not_errors = lambda r: r["answer_path"] != "error"  # noqa: E731
+
+    worker_a.do(("k",), lambda: {"answer_path": "error"}, not_errors)
+    assert worker_b.do(("k",), lambda: {"answer_path": "llm"}, not_errors) == ({"answer_path": "llm"}, False)
+
+
+def test_shared_answer_keeps_the_leaders_degraded_stages(monkeypatch):
+    from types import SimpleNamespace
+
+    from src import guide_chatbot
+
+    monkeypatch.setattr(guide_chatbot, "get_conversations", lambda: SimpleNamespace(append=lambda *a: None))
+    chatbot = guide_chatbot.GuideChatbot.__new__(guide_chatbot.GuideChatbot)
+    chatbot.guide = SimpleNamespace(slug="clio-4")
+
+    def fallback(question, lang, deadline):
+        time.sleep(0.2)
+        return {"response": "passages", "answer_path": "retrieval", "degraded": ["llm_timeout"]}
+
+    chatbot._respond = fallback
+    results, _ = _concurrent(2, lambda: chatbot.respond("pression des pneus ?", "fr"))
+
+    assert sorted(r["coalesced"] for r in results) == [False, True]
+    assert all(r["degraded"] == ["llm_timeout"] for r in results)
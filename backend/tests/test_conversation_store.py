@@ -0,0 +1,41 @@
+import sqlite3
+
+from src import conversation_store
+from src.conversation_store import SqliteConversationStore, new_session_id, session_id
+
+
+class FlakyStore(SqliteConversationStore):
+    def __init__(self, failures, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+
+    def _write(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        super()._write(batch)
+
+
+def test_failed_batch_is_retried_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(conversation_store, "FLUSH_RETRY_S", 0)
+    store = FlakyStore(1, path=tmp_path / "c.db", compact_s=0)
+    store._queue.extend([("clio-4", "s1", "user", "Bonjour", 1.0)])
+    assert store.flush() == 1
+    assert [m["content"] for m in store.history("clio-4", "s1")["messages"]] == ["Bonjour"]
+    assert store.metrics()["retried"] == 1 and store.metrics()["failed"] == 0
+
+
+def test_batch_dropped_after_the_retry_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(conversation_store, "FLUSH_RETRY_S", 0)
+    store = FlakyStore(2, path=tmp_path / "c.db", compact_s=0)
+    store._queue.extend([("clio-4", "s1", "user", "Bonjour", 1.0)])
+    assert store.flush() == 0
+    assert store.metrics()["failed"] == 1
+
+
+def test_session_ids():
+    issued = new_session_id()
+    assert session_id(issued) == issued
+    assert session_id(None) is None and session_id("") is None
+    assert session_id("a b") is None and session_id("x" * 65) is None
+    assert new_session_id() != issued
@@ -0,0 +1,45 @@
+import pytest
+
+from src.extractive import _measure_pattern, format_extractive_answer, is_factual_question
+
+
+@pytest.mark.parametrize("question", [
+    "Comment faire le chargement du coffre ?",
+    "Comment charger mon telephone ?",
+    "Ou se trouve le chargeur sans fil ?",
+    "Comment fonctionne la recharge rapide ?",
+    "Comment regler les retroviseurs en taillant la haie ?",
+    "Comment changer un pneu ?",
+])
+def test_no_value_intent_in_longer_words(question):
+    assert not is_factual_question(question)
+
+
+@pytest.mark.parametrize("question", [
+    "Quelle est la charge maximale sur le toit ?",
+    "Quelles sont les pressions de gonflage ?",
+    "Quelle est la capacite du reservoir ?",
+    "What is the tire pressure?",
+    "Combien de places ?",
+])
+def test_value_intent(question):
+    assert is_factual_question(question)
+
+
+def test_units_end_on_a_word_boundary():
+    pressure = _measure_pattern("Quelle est la pression des pneus ?")
+    assert pressure.search("Avant : 2,3 bar (230 kPa)")
+    assert not pressure.search("valeur 2 barres de toit")
+    assert not pressure.search("12 psia")
+
+    weight = _measure_pattern("Quel est le poids du vehicule ?")
+    assert weight.search("Poids a vide : 1 280 kg")
+    assert not weight.search("3 tours de cle")
+
+    percent = _measure_pattern("Combien de batterie au depart ?")
+    assert percent.search("charge de 80 % en 30 minutes")
+
+
+def test_answer_header_in_the_question_language():
+    assert format_extractive_answer("2,2 bar.", "ko") == "매뉴얼 원문 내용:\n2,2 bar."
+    assert format_extractive_answer("2,2 bar.", "de").startswith("D'apres le manuel")
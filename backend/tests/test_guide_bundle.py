@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from src.guide_bundle import BundleError, GuideBundle, read_section_table, write_bundle
+
+
+def _bundle(tmp_path):
+    sections = {
+        "specs": json.dumps({"version": 2, "entries": []}).encode(),
+        "meta": json.dumps({"source_pdf": "manuel.pdf"}).encode(),
+        "chunks_blob": b"x" * 1000,
+    }
+    return write_bundle(sections, tmp_path / "guide.bundle")
+
+
+def _flip(path, offset):
+    data = bytearray(path.read_bytes())
+    data[offset] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+
+def test_valid_bundle_opens_verified(tmp_path):
+    bundle = GuideBundle(_bundle(tmp_path), verify=True)
+    assert bundle.meta == {"source_pdf": "manuel.pdf"}
+    assert bytes(bundle.section("chunks_blob")) == b"x" * 1000
+
+
+def test_corrupted_section_is_refused_on_verified_load(tmp_path):
+    path = _bundle(tmp_path)
+    offset, _, _ = read_section_table(path)["chunks_blob"]
+    _flip(path, offset + 10)
+
+    assert GuideBundle(path).verify() == ["section 'chunks_blob' (1000 bytes): checksum mismatch"]
+    with pytest.raises(BundleError, match="chunks_blob"):
+        GuideBundle(path, verify=True)
+
+
+def test_corrupted_section_table_is_refused_on_any_load(tmp_path):
+    path = _bundle(tmp_path)
+    _flip(path, 70)  # inside the section table, which follows the 40-byte header
+    with pytest.raises(BundleError, match="Section table checksum mismatch"):
+        GuideBundle(path)
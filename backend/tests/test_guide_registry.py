@@ -0,0 +1,60 @@
+import threading
+import time
+
+from src.guide_registry import GuideRegistry
+
+
+def _get_concurrently(registry, n):
+    results = [None] * n
+    errors = [None] * n
+
+    def run(i):
+        try:
+            results[i] = registry.get("clio-4", count_hit=False)
+        except Exception as exc:
+            errors[i] = exc
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_requests_load_a_guide_once():
+    registry = GuideRegistry()
+    loads = []
+    chatbot = object()
+
+    def load(slug):
+        loads.append(slug)
+        time.sleep(0.2)
+        return chatbot
+
+    registry._load = load
+    results, errors = _get_concurrently(registry, 4)
+
+    assert loads == ["clio-4"]
+    assert errors == [None] * 4
+    assert all(result is chatbot for result in results)
+    assert registry.stats["load_waits"] == 3
+    assert registry.report()["loading"] == []
+
+
+def test_failed_load_reaches_waiters_and_is_retried():
+    registry = GuideRegistry()
+    attempts = []
+
+    def failing(slug):
+        attempts.append(slug)
+        time.sleep(0.2)
+        raise ValueError("index unreadable")
+
+    registry._load = failing
+    _, errors = _get_concurrently(registry, 3)
+    assert len(attempts) == 1
+    assert all(isinstance(error, ValueError) for error in errors)
+
+    registry._load = lambda slug: "loaded"
+    assert registry.get("clio-4", count_hit=False) == "loaded"
@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+
+from src import guide_search
+
+GUIDES = {
+    "clio-4": SimpleNamespace(name="Renault Clio 4", is_indexed=True, has_vector_index=False),
+    "tesla-model-y": SimpleNamespace(name="Tesla Model Y", is_indexed=True, has_vector_index=False),
+    "draft": SimpleNamespace(name="Brouillon", is_indexed=False, has_vector_index=False),
+}
+
+HITS = {
+    "clio-4": [("pression des pneus 2,2 bar", 8.0), ("roue de secours", 2.0)],
+    "tesla-model-y": [("pression des pneus 2,9 bar", 0.5), ("recharge", 0.25)],
+}
+
+
+class FakeChatbot:
+    def __init__(self, slug):
+        self.slug = slug
+
+    def search(self, query, k, query_vector=None, semantic=True):
+        if self.slug == "broken":
+            raise RuntimeError("index unreadable")
+        return [
+            (Document(page_content=text, metadata={"source_file": f"{self.slug}.pdf", "page": i + 1}), score)
+            for i, (text, score) in enumerate(HITS[self.slug][:k])
+        ]
+
+
+@pytest.fixture
+def guides(monkeypatch):
+    monkeypatch.setattr(guide_search.guide_manager, "get_guide", GUIDES.get)
+    monkeypatch.setattr(guide_search, "get_guide_chatbot", FakeChatbot)
+
+
+def test_scores_normalised_per_guide_and_merged(guides):
+    result = guide_search.federated_search("pression pneus", slugs=["clio-4", "tesla-model-y"], k=2)
+
+    assert result["guides"] == ["clio-4", "tesla-model-y"]
+    assert result["errors"] == {}
+    ranked = [(p["slug"], p["score"]) for p in result["results"]]
+    # Each guide's best passage scores 1.0 whatever its raw scale
+    assert ranked == [("clio-4", 1.0), ("tesla-model-y", 1.0), ("tesla-model-y", 0.5), ("clio-4", 0.25)]
+    assert result["results"][0]["vehicle_name"] == "Renault Clio 4"
+    assert result["results"][0]["page"] == 1
+
+
+def test_unindexed_and_duplicate_slugs_skipped(guides):
+    result = guide_search.federated_search("pneus", slugs=["clio-4", "draft", "clio-4"], k=1)
+    assert result["guides"] == ["clio-4"]
+    assert len(result["results"]) == 1
+
+
+def test_failing_guide_reported_without_losing_the_others(guides, monkeypatch):
+    monkeypatch.setitem(GUIDES, "broken", GUIDES["clio-4"])
+    result = guide_search.federated_search("pneus", slugs=["broken", "tesla-model-y"], k=1)
+    assert result["errors"] == {"broken": "index unreadable"}
+    assert [p["slug"] for p in result["results"]] == ["tesla-model-y"]
+
+
+@pytest.fixture
+def client(guides, monkeypatch):
+    import api
+
+    monkeypatch.setattr(api.guide_manager, "get_guide", GUIDES.get)
+    return api.app.test_client()
+
+
+def test_api_caps_the_number_of_guides(client):
+    from src.config import SEARCH_MAX_GUIDES
+
+    guides = [f"guide-{i}" for i in range(SEARCH_MAX_GUIDES + 1)]
+    response = client.post("/api/search", json={"query": "pneus", "guides": guides})
+    assert response.status_code == 400
+
+
+def test_api_rejects_unknown_guides(client):
+    response = client.post("/api/search", json={"query": "pneus", "guides": ["clio-4", "nope"]})
+    assert response.status_code == 404
+    assert "nope" in response.get_json()["error"]
+
+
+def test_api_hides_internal_errors(client, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("secret path /srv/index")
+
+    monkeypatch.setattr(guide_search, "federated_search", fail)
+    response = client.post("/api/search", json={"query": "pneus", "guides": ["clio-4"]})
+    assert response.status_code == 500
+    assert response.get_json()["error"] == "Erreur interne lors de la recherche"
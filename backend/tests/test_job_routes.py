@@ -0,0 +1,38 @@
+import pytest
+
+import api
+
+JOB = {"id": "job1", "status": "running", "slug": "clio-4", "filename": "manuel.pdf"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(api, "read_job", lambda job_id: dict(JOB) if job_id == "job1" else None)
+    monkeypatch.setattr(api, "list_jobs", lambda: [dict(JOB)])
+    return api.app.test_client()
+
+
+@pytest.mark.parametrize("path", ["/api/jobs", "/api/jobs/job1", "/api/jobs/job1/events"])
+def test_job_routes_are_admin_only(client, path):
+    assert client.get(path).status_code == 403
+    assert client.get(path, headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+
+def test_admin_reads_jobs(client):
+    response = client.get("/api/jobs/job1", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.get_json()["job"]["filename"] == "manuel.pdf"
+
+
+def test_event_streams_are_capped_and_released(client):
+    admin = {"X-Admin-Token": "secret"}
+    streams = [client.get("/api/jobs/job1/events", headers=admin, buffered=False) for _ in range(api.JOB_EVENTS_MAX_STREAMS)]
+    assert all(r.status_code == 200 for r in streams)
+    assert client.get("/api/jobs/job1/events", headers=admin, buffered=False).status_code == 429
+
+    streams.pop().close()  # stream contexts are nested in the test client: close in reverse order
+    reopened = client.get("/api/jobs/job1/events", headers=admin, buffered=False)
+    assert reopened.status_code == 200
+    for response in [reopened] + streams[::-1]:
+        response.close()
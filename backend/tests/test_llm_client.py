@@ -0,0 +1,118 @@
+import time
+
+import pytest
+
+from src import llm_client
+from src.llm_client import CircuitBreaker, CircuitOpenError, GeminiClient, UpstreamError, UpstreamTimeout
+
+MODEL = "gemini-2.5-flash"
+
+
+def make_client(fake, timeout_s=1.0, hedge=False):
+    client = GeminiClient(api_key="test", base_url=fake.url, timeout_s=timeout_s, embed_timeout_s=timeout_s, hedge=hedge)
+    client.breakers["generate"] = CircuitBreaker("generate", error_rate=0.5, min_calls=3, window_s=30, cooldown_s=0.3)
+    return client
+
+
+def test_generate_and_embed(fake_gemini):
+    client = make_client(fake_gemini)
+    assert client.generate("Bonjour", model=MODEL) == "Reponse."
+    assert client.embed(["a", "b"]) == [[0.1] * 8, [0.1] * 8]
+
+
+def test_breaker_opens_on_failures_and_closes_after_cooldown(fake_gemini):
+    client = make_client(fake_gemini)
+    fake_gemini.fail = True
+    for _ in range(3):
+        with pytest.raises(UpstreamError):
+            client.generate("q", model=MODEL)
+    assert client.breakers["generate"].state == "open"
+
+    calls = fake_gemini.calls
+    with pytest.raises(CircuitOpenError):
+        client.generate("q", model=MODEL)
+    assert fake_gemini.calls == calls  # rejected without reaching the server
+    assert client.status()["generate"]["rejected"] == 1
+
+    fake_gemini.fail = False
+    time.sleep(0.35)
+    assert client.generate("q", model=MODEL) == "Reponse."  # half-open trial
+    assert client.breakers["generate"].state == "closed"
+
+
+def test_failed_trial_reopens(fake_gemini):
+    client = make_client(fake_gemini)
+    fake_gemini.fail = True
+    for _ in range(3):
+        with pytest.raises(UpstreamError):
+            client.generate("q", model=MODEL)
+    time.sleep(0.35)
+    with pytest.raises(UpstreamError):
+        client.generate("q", model=MODEL)
+    assert client.breakers["generate"].state == "open"
+
+
+def test_timeout_is_reported(fake_gemini):
+    client = make_client(fake_gemini, timeout_s=0.3)
+    fake_gemini.delay_s = 1.0
+    with pytest.raises(UpstreamTimeout):
+        client.generate("q", model=MODEL)
+
+
+def _warm_latency(client, seconds=0.05):
+    for _ in range(llm_client.MIN_HEDGE_SAMPLES):
+        client.latency["generate"].add(seconds)
+
+
+def test_hedged_request_wins_over_slow_primary(fake_gemini, monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_HEDGE_MIN_DELAY_S", 0.1)
+    client = make_client(fake_gemini, timeout_s=2.0, hedge=True)
+    _warm_latency(client)
+    fake_gemini.slow_first = 1
+
+    start = time.monotonic()
+    assert client.generate("q", model=MODEL) == "Reponse."
+    assert time.monotonic() - start < 1.0
+    assert client.stats["generate"]["hedged"] == 1
+    assert client.stats["generate"]["hedge_wins"] == 1
+
+
+def test_backup_gets_only_the_primary_time_left(monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_HEDGE_MIN_DELAY_S", 0.2)
+    client = GeminiClient(api_key="test", base_url="http://127.0.0.1:9", hedge=True)
+    _warm_latency(client)
+    timeouts = []
+
+    def call(timeout_s):
+        timeouts.append(timeout_s)
+        time.sleep(0.5 if len(timeouts) == 1 else 0.0)
+        return "ok"
+
+    assert client._hedged("generate", call, 1.0) == "ok"
+    assert timeouts[0] == 1.0
+    assert 0.7 < timeouts[1] <= 0.8
+
+
+def test_hedged_call_ends_at_the_primary_deadline(fake_gemini, monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_HEDGE_MIN_DELAY_S", 0.5)
+    client = make_client(fake_gemini, timeout_s=1.0, hedge=True)
+    _warm_latency(client)
+    fake_gemini.delay_s = 3.0
+
+    start = time.monotonic()
+    with pytest.raises(UpstreamTimeout):
+        client.generate("q", model=MODEL)
+    assert time.monotonic() - start < 1.4  # not 0.5 s + a full second timeout
+
+
+def test_embed_batches_share_one_deadline(fake_gemini, monkeypatch):
+    monkeypatch.setattr(llm_client, "EMBED_BATCH_SIZE", 2)
+    client = make_client(fake_gemini, timeout_s=1.0)
+    fake_gemini.delay_s = 0.4
+
+    start = time.monotonic()
+    with pytest.raises(UpstreamTimeout):
+        client.embed(["a", "b", "c", "d", "e", "f", "g", "h"])
+    # Four batches of 0.4 s each, but the whole call stops at its 1 s deadline
+    assert time.monotonic() - start < 1.3
+    assert fake_gemini.calls <= 3
@@ -0,0 +1,62 @@
+import pickle
+
+import numpy as np
+import pytest
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+import migrate_indexes
+from src.vector_index import IDS_FILENAME, INDEX_FILENAME, LEGACY_DOCSTORE_FILENAME, VectorIndex
+
+
+CHUNKS = [
+    Document(page_content=f"chunk {i}", metadata={"source_file": "a.pdf", "chunk_index": i, "page": 1})
+    for i in range(3)
+]
+
+
+def _legacy_guide(tmp_path, faiss_docs):
+    """Pre-migration layout: chunks inside bm25_index.pkl, LangChain docstore in index.pkl."""
+    with open(tmp_path / "bm25_index.pkl", "wb") as f:
+        pickle.dump({"bm25": {"k1": 1.5}, "chunks": CHUNKS}, f)
+    (tmp_path / INDEX_FILENAME).write_bytes(b"faiss")  # only checked for existence
+    docstore = InMemoryDocstore({str(i): doc for i, doc in enumerate(faiss_docs)})
+    with open(tmp_path / LEGACY_DOCSTORE_FILENAME, "wb") as f:
+        pickle.dump((docstore, {i: str(i) for i in range(len(faiss_docs))}), f)
+
+
+def _migrate(vs_dir):
+    backup_dir = migrate_indexes.backup_files(vs_dir)
+    try:
+        migrate_indexes.migrate_chunk_store(vs_dir)
+        migrate_indexes.migrate_vector_index(vs_dir)
+    except Exception:
+        migrate_indexes.restore_files(vs_dir, backup_dir)
+        raise
+
+
+def test_rows_mapped_to_chunk_ids(tmp_path):
+    _legacy_guide(tmp_path, [CHUNKS[2], CHUNKS[0]])
+    _migrate(tmp_path)
+    assert np.load(tmp_path / IDS_FILENAME).tolist() == [2, 0]
+    assert not (tmp_path / LEGACY_DOCSTORE_FILENAME).exists()
+
+
+def test_mismatch_restores_the_previous_store(tmp_path):
+    stray = Document(page_content="x", metadata={"source_file": "b.pdf", "chunk_index": 9})
+    _legacy_guide(tmp_path, [stray])
+    before = {p.name: p.read_bytes() for p in tmp_path.iterdir()}
+
+    with pytest.raises(migrate_indexes.MigrationError):
+        _migrate(tmp_path)
+    assert {p.name: p.read_bytes() for p in tmp_path.iterdir()} == before
+
+
+def test_loader_refuses_legacy_docstore_without_ids(tmp_path, monkeypatch):
+    import src.vector_index as vector_index
+
+    _legacy_guide(tmp_path, [])
+    monkeypatch.setattr(vector_index, "faiss_available", lambda: True)
+    monkeypatch.setattr(vector_index, "_read_index", lambda path, use_mmap: type("I", (), {"ntotal": 3, "d": 4})())
+    with pytest.raises(ValueError, match="migrate_indexes"):
+        VectorIndex.load(tmp_path)
@@ -0,0 +1,73 @@
+from langchain_core.documents import Document
+
+from src.near_dup import dedup_chunks, find_clusters, parse_pages
+
+WARNING = (
+    "AVERTISSEMENT Ne roulez jamais avec des pneumatiques sous-gonfles ou endommages. "
+    "Un pneumatique sous-gonfle s'echauffe, s'use prematurement et peut eclater, "
+    "entrainant une perte de controle du vehicule et des blessures graves. "
+    "Controlez la pression a froid au moins une fois par mois et avant un long trajet."
+)
+
+
+def _chunk(text, page, source="clio.pdf", index=0):
+    return Document(page_content=text, metadata={"source_file": source, "page": page, "chunk_index": index})
+
+
+def _spec_row(engine, front, rear, oil):
+    return (
+        f"Caracteristiques moteur {engine} : pression des pneumatiques a froid, charge normale, "
+        f"avant {front} bar, arriere {rear} bar. Capacite d'huile moteur avec filtre {oil} litres, "
+        "viscosite recommandee selon le carnet d'entretien du vehicule et la temperature exterieure. "
+        "Controlez la pression a froid au moins une fois par mois et avant un long trajet."
+    )
+
+
+def test_threshold_decides_merging():
+    variant = WARNING.replace("au moins une fois par mois", "chaque mois")
+    assert find_clusters([WARNING, WARNING.upper()]) == [[0, 1]]
+    assert find_clusters([WARNING, variant], threshold=0.99) == []
+    assert find_clusters([WARNING, variant], threshold=0.6) == [[0, 1]]
+
+
+def test_merged_chunk_keeps_every_page_of_its_source():
+    chunks = [
+        _chunk(WARNING, 12, index=0),
+        _chunk("Reglage des retroviseurs exterieurs et interieur.", 14, index=1),
+        _chunk(WARNING + " Voir aussi la page suivante.", "40-41", index=2),
+        _chunk(WARNING, 88, index=3),
+    ]
+    kept, stats = dedup_chunks(chunks, threshold=0.8)
+
+    assert [c.metadata["chunk_index"] for c in kept] == [1, 2]  # longest copy, original order
+    assert kept[1].metadata["page"] == "12, 40, 41, 88"
+    assert kept[1].metadata["source_file"] == "clio.pdf"
+    assert (stats["clusters"], stats["embeddings_saved"]) == (1, 2)
+
+
+def test_copies_in_different_documents_are_kept():
+    chunks = [_chunk(WARNING, 12, "clio.pdf"), _chunk(WARNING, 3, "annexe.pdf")]
+    kept, stats = dedup_chunks(chunks)
+    assert len(kept) == 2
+    assert stats["clusters"] == 0
+
+
+def test_spec_rows_with_different_values_are_not_merged():
+    rows = [
+        _chunk(_spec_row("1.2 TCe", "2,2", "2,0", "4,5"), 120, index=0),
+        _chunk(_spec_row("1.2 TCe", "2,3", "2,0", "4,5"), 121, index=1),
+        _chunk(_spec_row("1.5 dCi", "2,2", "2,0", "4,8"), 122, index=2),
+    ]
+    kept, stats = dedup_chunks(rows, threshold=0.5)
+    assert len(kept) == 3
+    assert stats["clusters"] == 0
+
+    repeated = rows + [_chunk(_spec_row("1.2 TCe", "2,2", "2,0", "4,5"), 200, index=3)]
+    kept, _ = dedup_chunks(repeated, threshold=0.5)
+    assert [c.metadata["page"] for c in kept] == ["120, 200", 121, 122]
+
+
+def test_parse_pages():
+    assert parse_pages(12) == [12]
+    assert parse_pages("12-14, 18") == [12, 13, 14, 18]
+    assert parse_pages("?") == []
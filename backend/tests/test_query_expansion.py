@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from src import llm_client, query_expansion
+from src.query_expansion import TranslationCache, dictionary_variant, expand_query
+
+
+def test_dict_variant_for_english_questions():
+    variants = expand_query("How do I check the tires pressure?", "en", mode="dict")
+    assert variants[0] == "How do I check the tires pressure?"
+    assert set(variants[1].split()) == {"vérification", "contrôle", "pneus", "pneumatiques", "pression"}
+
+
+def test_english_phrases_win_over_their_words():
+    # "oil change" -> vidange, not "huile" + "remplacement" from "oil" and "change"
+    assert dictionary_variant("When is the next oil change?", "en") == "vidange huile"
+
+
+def test_korean_terms_matched_inside_words():
+    # Particles are glued to the nouns: 공기압은, 엔진오일을
+    assert dictionary_variant("타이어 공기압은 얼마인가요?", "ko") == "pneus pneumatiques pression gonflage"
+    assert dictionary_variant("엔진오일을 교환하려면?", "ko") == "huile moteur remplacement vidange"
+    assert dictionary_variant("GPS 화면이 꺼졌어요", "ko") == "écran navigation"
+
+
+def test_unknown_terms_add_no_variant():
+    assert expand_query("What a nice day", "en", mode="dict") == ["What a nice day"]
+
+
+@pytest.mark.parametrize("mode, lang", [("off", "en"), ("off", "ko"), ("dict", "fr"), ("llm", "fr"), ("bogus", "en")])
+def test_question_unchanged_when_off_or_french(mode, lang):
+    assert expand_query("tire pressure 타이어", lang, mode=mode) == ["tire pressure 타이어"]
+
+
+def test_expansion_mode_prefers_the_guide_option():
+    assert query_expansion.expansion_mode({"query_expansion": "dict"}) == "dict"
+    assert query_expansion.expansion_mode({"query_expansion": "bogus"}) == "off"
+
+
+class SlowTranslator:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def generate(self, prompt, model=None):
+        self.release.wait(5)
+        return "Quelle est la pression des pneus ?\nExplication superflue"
+
+
+def test_translation_miss_never_blocks_the_request(monkeypatch):
+    translator = SlowTranslator()
+    monkeypatch.setattr(llm_client, "get_llm_client", lambda: translator)
+    monkeypatch.setattr(query_expansion, "translations", TranslationCache())
+
+    keywords = dictionary_variant("What is the tire pressure?", "en")
+    start = time.monotonic()
+    first = expand_query("What is the tire pressure?", "en", mode="llm", slug="clio-4")
+    assert time.monotonic() - start < 0.5
+    assert first == ["What is the tire pressure?", keywords]
+    # Asked again while the translation is pending: still no wait, no second call
+    assert expand_query("What is the tire pressure?", "en", mode="llm", slug="clio-4") == first
+    assert query_expansion.translations.metrics()["pending"] == 1
+
+    translator.release.set()
+    for _ in range(100):
+        if query_expansion.translations.metrics()["size"]:
+            break
+        time.sleep(0.02)
+    assert expand_query("what is the  tire pressure?", "en", mode="llm", slug="clio-4") == [
+        "what is the  tire pressure?",
+        "Quelle est la pression des pneus ?",
+        keywords,
+    ]
@@ -0,0 +1,84 @@
+import socket
+
+import numpy as np
+import pytest
+
+from src.retrieval_protocol import (
+    OP_IDF,
+    OP_INFO,
+    OP_PING,
+    OP_SEARCH,
+    ProtocolError,
+    RemoteError,
+    decode_hits,
+    decode_idf,
+    decode_info,
+    decode_request,
+    decode_response,
+    encode_error,
+    encode_hits,
+    encode_idf,
+    encode_info,
+    encode_ok,
+    encode_request,
+    recv_frame,
+    send_frame,
+)
+
+
+def test_search_request_round_trip():
+    queries = [
+        (["pression des pneus", "pneus pression"], [[0.5, -1.25, 3.0], [1.0, 0.0, 2.5]], 5, 120),
+        (["vidange é 한국어"], None, 3, 0),
+    ]
+    op, slug, decoded = decode_request(encode_request(OP_SEARCH, "clio-4", queries))
+
+    assert (op, slug, len(decoded)) == (OP_SEARCH, "clio-4", 2)
+    variants, vectors, k, expand_tokens = decoded[0]
+    assert (variants, k, expand_tokens) == (queries[0][0], 5, 120)
+    assert vectors.dtype == np.float32 and vectors.flags.writeable
+    np.testing.assert_array_equal(vectors, np.array(queries[0][1], dtype=np.float32))
+    assert decoded[1] == (["vidange é 한국어"], None, 3, 0)
+
+
+@pytest.mark.parametrize("op", [OP_INFO, OP_IDF])
+def test_slug_requests_round_trip(op):
+    assert decode_request(encode_request(op, "tesla-model-y")) == (op, "tesla-model-y", [])
+
+
+def test_ping_and_unknown_op():
+    assert decode_request(encode_request(OP_PING)) == (OP_PING, "", [])
+    with pytest.raises(ProtocolError):
+        decode_request(bytes([99, 0, 0]))
+    with pytest.raises(ProtocolError):
+        decode_request(b"")
+
+
+def test_responses_round_trip():
+    hits = [
+        [(0.75, "manuel.pdf", "12", 4, 40, "Pression de gonflage : 230 kPa"), (0.5, "b.pdf", "?", -1, -1, "x" * 70000)],
+        [],
+    ]
+    decoded = decode_hits(encode_hits(hits))
+    assert [[h[1:] for h in group] for group in decoded] == [[h[1:] for h in group] for group in hits]
+    assert decoded[0][0][0] == pytest.approx(0.75)
+
+    assert decode_info(encode_info(True, False, "d8294582")) == (True, False, "d8294582")
+    assert decode_idf(encode_idf({"pneu": 1.5, "huile": 0.25})) == {"pneu": 1.5, "huile": 0.25}
+    decode_response(encode_ok())
+    with pytest.raises(RemoteError, match="Guide 'x' not found"):
+        decode_response(encode_error("Guide 'x' not found"))
+
+
+def test_frames_over_a_socket():
+    left, right = socket.socketpair()
+    try:
+        payload = encode_request(OP_SEARCH, "clio-4", [(["q"], [[1.0] * 768], 5, 0)])
+        send_frame(left, payload)
+        send_frame(left, b"")
+        assert recv_frame(right) == payload
+        assert recv_frame(right) == b""
+        left.close()
+        assert recv_frame(right) is None
+    finally:
+        right.close()
@@ -0,0 +1,106 @@
+import pytest
+from langchain_core.documents import Document
+
+from src.spec_tables import (
+    SpecIndex,
+    build_spec_index,
+    extract_specs,
+    format_spec_answer,
+    is_spec_row,
+    save_spec_index,
+)
+
+# Text of a manual page as the PDF extractor returns it (one line per table row)
+PAGE = """Caractéristiques techniques
+Pressions de gonflage des pneumatiques
+Pression avant (charge normale) 2,2 bar
+Pression arrière (charge normale) 2,0 bar
+Roue de secours temporaire 4,2 bar
+Augmentez la pression des pneus de 20 kPa avant un long trajet.
+Capacité du réservoir de carburant 45 l
+Huile moteur avec filtre
+4,5 litres
+Couple de serrage des écrous de roue 110 Nm
+Fusible de l'allume-cigare 15 A
+Feux de position W5W
+Consommation moyenne depuis le départ 5,4 l
+sion soit de 34 psi"""
+
+
+@pytest.fixture(scope="module")
+def entries():
+    return extract_specs([Document(page_content=PAGE, metadata={"page": 210, "source_file": "clio.pdf"})])
+
+
+@pytest.fixture(scope="module")
+def index(entries):
+    return SpecIndex(build_spec_index(entries))
+
+
+def test_rows_parsed_into_label_value_and_unit(entries):
+    rows = {(e["c"], e["l"], e["v"]) for e in entries}
+    assert rows == {
+        ("tyre_pressure", "Pressions de gonflage des pneumatiques - Pression avant (charge normale)", "2,2 bar"),
+        ("tyre_pressure", "Pressions de gonflage des pneumatiques - Pression arrière (charge normale)", "2,0 bar"),
+        ("tyre_pressure", "Roue de secours temporaire", "4,2 bar"),
+        ("capacity", "Capacité du réservoir de carburant", "45 l"),
+        ("capacity", "Huile moteur avec filtre", "4,5 litres"),  # label on the line above
+        ("torque", "Couple de serrage des écrous de roue", "110 Nm"),
+        ("fuse", "Fusible de l'allume-cigare", "15 A"),
+        ("bulb", "Feux de position", "W5W"),
+    }
+    assert all((e["p"], e["f"]) == (210, "clio.pdf") for e in entries)
+
+
+@pytest.mark.parametrize("label, value", [
+    ("Augmentez la pression des pneus de ", "20 kPa"),  # sentence, not a row
+    ("sion soit de ", "34 psi"),                        # cut word
+    ("Consommation moyenne depuis le départ", "5,4 l"),  # trip computer read-out
+    ("Pneus", "2,2 bar"),                               # one word
+])
+def test_prose_and_noise_are_not_rows(label, value):
+    assert not is_spec_row(label, value)
+
+
+@pytest.mark.parametrize("question, value", [
+    ("Quelle est la pression des pneus avant ?", "2,2 bar"),
+    ("Quelle pression pour la roue de secours ?", "4,2 bar"),
+    ("Quelle est la capacité du réservoir ?", "45 l"),
+    ("Combien d'huile moteur avec filtre ?", "4,5 litres"),
+    ("Quel est le couple de serrage des écrous de roue ?", "110 Nm"),
+])
+def test_lookup_finds_the_row(index, question, value):
+    assert [e["v"] for e in index.lookup(question)][:1] == [value]
+
+
+@pytest.mark.parametrize("question", [
+    "Comment changer l'huile ?",           # a procedure, not a value
+    "Comment régler les rétroviseurs ?",   # no spec category
+])
+def test_lookup_ignores_other_questions(index, question):
+    assert index.lookup(question) == []
+
+
+def test_spare_wheel_rows_only_for_spare_wheel_questions(index):
+    values = [e["v"] for e in index.lookup("Quelle est la pression des pneus arrière ?")]
+    assert "4,2 bar" not in values
+
+
+def test_saved_index_round_trip_and_merge(tmp_path, entries):
+    save_spec_index(entries, tmp_path)
+    loaded = SpecIndex.load(tmp_path)
+    other = SpecIndex(build_spec_index([dict(entries[0], l="Pression pneus Zoe avant", v="2,5 bar", f="zoe.pdf")]))
+
+    merged = SpecIndex.merge([loaded, other])
+    assert len(merged.entries) == len(entries) + 1
+    assert merged.lookup("Quelle est la pression des pneus Zoe avant ?")[0]["f"] == "zoe.pdf"
+
+
+def test_answer_cites_the_page(index):
+    answer = format_spec_answer(index.lookup("Quelle est la capacité du réservoir ?"), "fr")
+    assert "Capacité du réservoir de carburant : 45 l (page 210)" in answer
+
+
+def test_korean_answer_header(index):
+    answer = format_spec_answer(index.lookup("Quelle est la capacité du réservoir ?"), "ko")
+    assert answer.startswith("매뉴얼에 기재된 값 (원문 항목명):\n- Capacité du réservoir")
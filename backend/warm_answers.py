@@ -0,0 +1,88 @@
+"""
+Precompute the answers of the most asked questions (query logs written by the
+API to data/query_logs/, plus the /api/suggestions questions) and save them
+to data/warm_answers/<slug>.json. The API loads them into the answer cache of
+each guide it loads, so they are served without retrieval or LLM call.
+Guides are processed in parallel, one process per guide. Re-run after
+re-indexing a guide: answers computed for an older index are ignored.
+
+Usage:
+    cd backend
+    python -m warm_answers                                  # every indexed guide
+    python -m warm_answers clio-4 --top 100 --min-count 2 [--workers 2] [--no-suggestions]
+    python -m warm_answers --dry-run                        # list the questions only
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.config import QUERY_LOG_DIR, WARM_MIN_COUNT, WARM_TOP_N, WARM_WORKERS
+from src.guide_manager import guide_manager
+from src.answer_warming import mine_questions, warm_guide, with_suggestions
+from src.query_log import log_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute answers for frequent questions")
+    parser.add_argument("slugs", nargs="*", help="guides to warm (default: all indexed)")
+    parser.add_argument("--top", type=int, default=WARM_TOP_N, help="questions per guide and language")
+    parser.add_argument("--min-count", type=int, default=WARM_MIN_COUNT, help="minimum times asked")
+    parser.add_argument("--workers", type=int, default=WARM_WORKERS, help="worker processes")
+    parser.add_argument("--logs", type=Path, default=QUERY_LOG_DIR, help="query log directory")
+    parser.add_argument("--no-suggestions", action="store_true", help="skip the /api/suggestions questions")
+    parser.add_argument("--dry-run", action="store_true", help="print the questions without answering")
+    args = parser.parse_args()
+
+    indexed = [g["slug"] for g in guide_manager.list_guides() if guide_manager.get_guide(g["slug"]).is_indexed]
+    slugs = args.slugs or indexed
+    unknown = [slug for slug in slugs if slug not in indexed]
+    if unknown:
+        print(f"ERROR: unknown or unindexed guide(s): {', '.join(unknown)}")
+        sys.exit(1)
+
+    files = log_files(args.logs)
+    mined = mine_questions(files, top_n=args.top, min_count=args.min_count, slugs=slugs)
+    print(f"\n{len(files)} query log file(s) in {args.logs}")
+
+    work = {}
+    for slug in slugs:
+        questions = mined.get(slug, [])
+        if not args.no_suggestions:
+            questions = with_suggestions(slug, questions)
+        if questions:
+            work[slug] = questions
+        print(f"  {slug}: {len(mined.get(slug, []))} frequent question(s), {len(questions)} to precompute")
+
+    if args.dry_run:
+        for slug, questions in work.items():
+            print(f"\n{slug}")
+            for q in questions:
+                print(f"  {q['count']:>6}  [{q['lang']}] {q['question']}")
+        print()
+        return
+    if not work:
+        print("\nNothing to precompute\n")
+        return
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(work)))) as pool:
+        futures = {pool.submit(warm_guide, slug, questions): slug for slug, questions in work.items()}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as exc:
+                print(f"  {futures[future]}: FAILED ({exc})")
+                continue
+            print(
+                f"  {result['slug']}: {result['answered']} answer(s) saved, "
+                f"{result['failed']} skipped, {result['took_s']}s"
+            )
+    print(f"\nDone in {time.perf_counter() - start:.1f}s\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -154,6 +154,8 @@ function ChatPage() {
   const [langOpen, setLangOpen] = useState(false)
   const chatContainerRef = useRef(null)
   const inputRef = useRef(null)
+  // Issued by the API on the first message of the page (response "session_id")
+  const sessionIdRef = useRef(null)
   const t = UI_TEXT[lang] || UI_TEXT.fr
 
   const quickQuestions = useMemo(() => {
@@ -176,6 +178,7 @@ function ChatPage() {
   }, [])
 
   useEffect(() => {
+    sessionIdRef.current = null
     const loadGuide = async () => {
       try {
         const res = await fetch(`${API_URL}/guides/${slug}`)
@@ -211,9 +214,12 @@ function ChatPage() {
       const response = await fetch(`${API_URL}/guides/${slug}/chat`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ message: text, lang }),
+        body: JSON.stringify({ message: text, lang, session_id: sessionIdRef.current }),
       })
       const data = await response.json()
+      if (data.session_id) {
+        sessionIdRef.current = data.session_id
+      }
 
       if (data.success) {
         const cleaned = limitAssistantText(normalizeAssistantText(data.response || ''))